@@ -0,0 +1,149 @@
+"""
+Contention benchmark for slot holds and booking confirmation.
+
+Simulated callers spread over several worker processes arrive within a short ramp
+and ask for a day, most of them for the same popular next morning. Each takes the
+first offered slot after a "thinking" pause and books it; a caller whose slot was
+taken retries once with the alternatives it was given. Reports latencies, first-try
+success and double bookings (must be 0):
+
+    python -m benchmarks.booking_contention --calls 400 --workers 4
+    python -m benchmarks.booking_contention --calls 400 --workers 4 --no-holds
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List
+
+import db
+from config import Config
+from services import BookingService
+
+
+def open_days(count: int) -> List[str]:
+    days = []
+    day = date.today() + timedelta(days=1)
+    while len(days) < count:
+        if day.weekday() in Config.CLINIC_OPEN_DAYS:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+async def caller(service: BookingService, holder: str, day: str, arrival: float, think: float,
+                 use_holds: bool) -> Dict:
+    record = {"outcome": "no_offer", "attempts": 0}
+    await asyncio.sleep(arrival)
+    started = time.perf_counter()
+    offered = await service.get_availability(day, holder=holder if use_holds else None)
+    if offered:
+        offered = [f"{day} {t}" for t in offered]
+    else:
+        offered = await service.get_next_available(None, holder=holder if use_holds else None)
+    record["offer_ms"] = (time.perf_counter() - started) * 1000
+
+    for attempt in range(2):
+        if not offered:
+            break
+        await asyncio.sleep(random.uniform(0, think))
+        record["attempts"] += 1
+        started = time.perf_counter()
+        result = await service.book_appointment(holder, offered[0], "benchmark",
+                                                holder=holder if use_holds else None)
+        record.setdefault("confirm_ms", (time.perf_counter() - started) * 1000)
+        record["outcome"] = "failed"
+        if result.get("status") == "confirmed":
+            record["outcome"] = "first_try" if attempt == 0 else "retry"
+            break
+        offered = result.get("next_available") or []
+    if use_holds:
+        # End of the call
+        await service.release_holds(holder)
+    return record
+
+
+async def run_worker(worker: int, calls: int, db_path: str, days: List[str], popular: float,
+                     ramp: float, think: float, use_holds: bool) -> List[Dict]:
+    service = BookingService(db_path)
+    rng = random.Random(worker)
+    try:
+        return await asyncio.gather(*(
+            caller(service, f"w{worker}-c{i}", days[0] if rng.random() < popular else rng.choice(days),
+                   rng.uniform(0, ramp), think, use_holds)
+            for i in range(calls)
+        ))
+    finally:
+        service.close()
+
+
+def worker_main(args) -> List[Dict]:
+    # BookingService logs every booking and conflict
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(run_worker(*args))
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slot hold / booking contention benchmark")
+    parser.add_argument("--calls", type=int, default=400, help="Concurrent callers in total")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes sharing the database")
+    parser.add_argument("--days", type=int, default=10, help="Open days callers ask for")
+    parser.add_argument("--popular", type=float, default=0.5, help="Share of callers asking for the first day")
+    parser.add_argument("--ramp-ms", type=float, default=2000, help="Callers arrive within this window")
+    parser.add_argument("--think-ms", type=float, default=200, help="Max pause between offer and booking")
+    parser.add_argument("--no-holds", action="store_true", help="Offer without holding (conflict guard only)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bookings.db")
+        conn = db.connect(db_path)
+        db.init_db(conn)
+        conn.close()
+
+        days = open_days(args.days)
+        per_worker = [args.calls // args.workers + (1 if w < args.calls % args.workers else 0)
+                      for w in range(args.workers)]
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            jobs = [(w, n, db_path, days, args.popular, args.ramp_ms / 1000, args.think_ms / 1000, not args.no_holds)
+                    for w, n in enumerate(per_worker)]
+            records = [r for batch in pool.map(worker_main, jobs) for r in batch]
+        elapsed = time.perf_counter() - started
+
+        conn = db.connect(db_path)
+        doubles = conn.execute(
+            "SELECT datetime, COUNT(*) AS n FROM bookings WHERE status = 'confirmed' "
+            "GROUP BY datetime HAVING n > 1"
+        ).fetchall()
+        booked = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+        conn.close()
+
+    outcomes = {k: sum(1 for r in records if r["outcome"] == k) for k in ("first_try", "retry", "failed", "no_offer")}
+    offer_ms = [r["offer_ms"] for r in records]
+    confirm_ms = [r["confirm_ms"] for r in records if "confirm_ms" in r]
+    mode = "conflict guard only" if args.no_holds else f"holds ({Config.SLOT_HOLD_SECONDS:.0f}s TTL)"
+    print(f"{args.calls} callers on {args.workers} workers, {mode}, {elapsed:.2f}s")
+    print(f"booked first try {outcomes['first_try']}, after retry {outcomes['retry']}, "
+          f"failed {outcomes['failed']}, nothing to offer {outcomes['no_offer']}, rows {booked}")
+    print(f"offer   p50 {percentile(offer_ms, 0.5):6.1f} ms  p95 {percentile(offer_ms, 0.95):6.1f} ms")
+    print(f"confirm p50 {percentile(confirm_ms, 0.5):6.1f} ms  p95 {percentile(confirm_ms, 0.95):6.1f} ms")
+    print(f"double bookings: {len(doubles)}")
+    sys.exit(1 if doubles else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Micro-benchmark of reply segmentation on recorded LLM token streams.
+
+Compares the incremental SentenceSegmenter with the previous approach (re-split the
+whole buffer on every token) and checks that numbers, abbreviations and German
+ordinals are never cut:
+
+    python -m benchmarks.segmenter_bench --repeat 2000
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, List
+
+from segmenter import SentenceSegmenter
+
+STREAMS_FILE = os.path.join(os.path.dirname(__file__), "token_streams.json")
+
+# Fragments that must never be split across two segments
+MUST_NOT_SPLIT = ["10.30", "2.15", "Dr. Smith", "Dr. Jones", "Dr. Schmidt", "Dr. Martin", "e.g. chest",
+                  "z.B. bei", "5. Januar", "4. März", "10. März", "M. Dupont", "env. 20"]
+
+
+def legacy_segments(tokens: List[str]) -> List[str]:
+    """
+    The previous per-token logic from process_ai_response.
+    """
+    segments = []
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        if any(punct in buffer for punct in [".", "!", "?", "\n"]):
+            sentences = re.split(r'(?<=[.!?\n])\s*', buffer)
+            for sentence in sentences[:-1]:
+                if sentence.strip():
+                    segments.append(sentence.strip())
+            buffer = sentences[-1]
+    if buffer.strip():
+        segments.append(buffer.strip())
+    return segments
+
+
+def incremental_segments(tokens: List[str], language: str) -> List[str]:
+    segmenter = SentenceSegmenter(language)
+    segments = []
+    for token in tokens:
+        segments.extend(segmenter.push(token))
+    segments.extend(segmenter.flush())
+    return segments
+
+
+def first_segment_token(tokens: List[str], language: str) -> int:
+    """
+    Number of tokens received before the first segment is ready.
+    """
+    segmenter = SentenceSegmenter(language)
+    for index, token in enumerate(tokens, 1):
+        if segmenter.push(token):
+            return index
+    return len(tokens)
+
+
+def bench(fn: Callable[[], None], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return time.perf_counter() - started
+
+
+def check(streams: List[Dict]) -> List[str]:
+    failures = []
+    for stream in streams:
+        text = "".join(stream["tokens"])
+        segments = incremental_segments(stream["tokens"], stream["language"])
+        if " ".join(segments) != " ".join(text.split()):
+            failures.append(f"text changed: {segments}")
+        for fragment in MUST_NOT_SPLIT:
+            if fragment in text and not any(fragment in s for s in segments):
+                failures.append(f"split {fragment!r}: {segments}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Segmenter micro-benchmark")
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--streams", default=STREAMS_FILE)
+    args = parser.parse_args()
+
+    with open(args.streams, encoding="utf-8") as f:
+        streams = json.load(f)["streams"]
+
+    failures = check(streams)
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    tokens = sum(len(s["tokens"]) for s in streams)
+    legacy_time = bench(lambda: [legacy_segments(s["tokens"]) for s in streams], args.repeat)
+    new_time = bench(lambda: [incremental_segments(s["tokens"], s["language"]) for s in streams], args.repeat)
+    legacy_count = sum(len(legacy_segments(s["tokens"])) for s in streams)
+    new_count = sum(len(incremental_segments(s["tokens"], s["language"])) for s in streams)
+    legacy_tiny = sum(1 for s in streams for seg in legacy_segments(s["tokens"]) if len(seg) < 6)
+    new_tiny = sum(1 for s in streams for seg in incremental_segments(s["tokens"], s["language"]) if len(seg) < 6)
+    first_tokens = [first_segment_token(s["tokens"], s["language"]) for s in streams]
+
+    print(f"{len(streams)} streams, {tokens} tokens, {args.repeat} repetitions")
+    print(f"{'':12} {'us/token':>9} {'segments':>9} {'tiny':>5}")
+    print(f"{'legacy':12} {legacy_time / (tokens * args.repeat) * 1e6:9.2f} {legacy_count:9d} {legacy_tiny:5d}")
+    print(f"{'incremental':12} {new_time / (tokens * args.repeat) * 1e6:9.2f} {new_count:9d} {new_tiny:5d}")
+    print(f"First segment ready after {sum(first_tokens) / len(first_tokens):.1f} tokens on average")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
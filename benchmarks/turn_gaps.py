@@ -0,0 +1,102 @@
+"""
+Offline evaluation of adaptive end-of-turn detection on scripted dialogues.
+
+Each turn is a list of spoken fragments with the pause after each one. The fixed
+policy ends a turn after TURN_BASELINE_GAP_MS of silence; the adaptive policy gets
+speech_final after STT_ENDPOINTING_MS and asks the TurnDetector how much longer to
+wait. Reports the silence before each commit, the savings against the fixed policy
+and cut-offs (a commit while the caller still had more to say):
+
+    python -m benchmarks.turn_gaps
+"""
+import argparse
+import json
+import os
+import sys
+from statistics import median
+from typing import Dict, List
+
+from config import Config
+from turns import TurnDetector
+
+DIALOGUES_FILE = os.path.join(os.path.dirname(__file__), "turn_dialogues.json")
+# Assumed speaking time per fragment; only pauses matter to the policies
+FRAGMENT_SECONDS = 1.0
+
+
+def simulate(call: Dict, detector: TurnDetector) -> Dict:
+    """
+    Plays one call through the detector. A pause shorter than the endpointing never
+    yields a speech_final; a longer one is absorbed if the detector waits longer than
+    it, otherwise the turn is cut off there.
+    """
+    gaps: List[float] = []
+    cut_offs = 0
+    clock = 0.0
+    for turn in call["turns"]:
+        text = ""
+        for index, fragment in enumerate(turn["said"]):
+            text = f"{text} {fragment['text']}".strip()
+            clock += FRAGMENT_SECONDS
+            speech_end = clock
+            last = index == len(turn["said"]) - 1
+            pause = fragment.get("pause_ms", 0) / 1000
+            if not last and pause < detector.endpointing:
+                continue
+            decision = detector.decide(text, turn.get("question"))
+            gap = detector.endpointing + decision.wait
+            if last:
+                detector.committed(decision, speech_end)
+                gaps.append(gap)
+            elif pause < gap:
+                detector.speech_resumed(speech_end + pause, pending=True, speech_end=speech_end)
+            else:
+                detector.committed(decision, speech_end)
+                detector.speech_resumed(speech_end + pause, pending=False)
+                cut_offs += 1
+                text = ""
+            clock += pause
+        clock += 3.0
+    return {"gaps": gaps, "cut_offs": cut_offs}
+
+
+def fixed_cut_offs(call: Dict, baseline: float) -> int:
+    return sum(1 for turn in call["turns"] for fragment in turn["said"][:-1]
+               if fragment.get("pause_ms", 0) / 1000 >= baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive end-of-turn evaluation")
+    parser.add_argument("--dialogues", default=DIALOGUES_FILE)
+    parser.add_argument("--endpointing-ms", type=int, default=Config.STT_ENDPOINTING_MS)
+    parser.add_argument("--baseline-ms", type=int, default=Config.TURN_BASELINE_GAP_MS)
+    parser.add_argument("--max-gap-ms", type=int, default=Config.TURN_MAX_GAP_MS)
+    args = parser.parse_args()
+
+    with open(args.dialogues, encoding="utf-8") as f:
+        calls = json.load(f)["calls"]
+
+    baseline = args.baseline_ms / 1000
+    all_gaps: List[float] = []
+    adaptive_cut_offs = fixed_total = 0
+    print(f"{'call':<22} {'turns':>5} {'median gap':>10} {'saving':>7} {'cut-offs':>8} {'fixed':>5}  reasons")
+    for call in calls:
+        detector = TurnDetector(args.endpointing_ms / 1000, baseline, args.max_gap_ms / 1000, enabled=True)
+        result = simulate(call, detector)
+        fixed = fixed_cut_offs(call, baseline)
+        all_gaps += result["gaps"]
+        adaptive_cut_offs += result["cut_offs"]
+        fixed_total += fixed
+        reasons = ", ".join(f"{r} {n}" for r, n in sorted(detector.reasons.items()))
+        print(f"{call['name']:<22} {len(result['gaps']):5d} {median(result['gaps']) * 1000:8.0f} ms "
+              f"{(baseline - median(result['gaps'])) * 1000:4.0f} ms {result['cut_offs']:8d} {fixed:5d}  {reasons}")
+
+    savings = [baseline - g for g in all_gaps]
+    print(f"\n{len(all_gaps)} turns: median gap {median(all_gaps) * 1000:.0f} ms vs {args.baseline_ms} ms fixed, "
+          f"median saving {median(savings) * 1000:.0f} ms, mean saving {sum(savings) / len(savings) * 1000:.0f} ms")
+    print(f"cut-offs: adaptive {adaptive_cut_offs}, fixed {fixed_total}")
+    sys.exit(1 if adaptive_cut_offs > fixed_total else 0)
+
+
+if __name__ == "__main__":
+    main()
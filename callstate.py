@@ -0,0 +1,197 @@
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from config import Config
+import db
+
+# Shared call-state tables (SQLite backend)
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS call_state (
+        key TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS pending_hangups (
+        call_sid TEXT PRIMARY KEY,
+        due_at REAL NOT NULL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_call_state_expires ON call_state (expires_at)",
+]
+
+
+class CallStateStore(ABC):
+    """
+    Where per-call state lives between turns: the serialized CallSession (history,
+    summary, language, flags) and pending hangups. Entries expire after `ttl` seconds
+    without a save, so calls whose socket died before `stop` do not leak.
+
+    Pending hangups are claimed atomically, so exactly one worker hangs up a call:
+    normally the one owning the media stream, otherwise any worker's sweeper once
+    the hangup is overdue.
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    @abstractmethod
+    async def load(self, key: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def save(self, key: str, state: Dict):
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    async def schedule_hangup(self, call_sid: str, due_at: float):
+        ...
+
+    @abstractmethod
+    async def claim_hangup(self, call_sid: str) -> bool:
+        """
+        Removes a pending hangup. True if this caller now owns it.
+        """
+
+    @abstractmethod
+    async def claim_due_hangups(self, now: float) -> List[str]:
+        ...
+
+    @abstractmethod
+    async def purge_expired(self, now: float) -> int:
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemoryCallStateStore(CallStateStore):
+    """
+    Process-local backend (single worker).
+    """
+    def __init__(self, ttl: float):
+        super().__init__(ttl)
+        self._states: Dict[str, Tuple[Dict, float]] = {}
+        self._hangups: Dict[str, float] = {}
+
+    async def load(self, key: str) -> Optional[Dict]:
+        entry = self._states.get(key)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry[0]
+
+    async def save(self, key: str, state: Dict):
+        self._states[key] = (state, time.time() + self.ttl)
+
+    async def delete(self, key: str):
+        self._states.pop(key, None)
+
+    async def schedule_hangup(self, call_sid: str, due_at: float):
+        self._hangups[call_sid] = due_at
+
+    async def claim_hangup(self, call_sid: str) -> bool:
+        return self._hangups.pop(call_sid, None) is not None
+
+    async def claim_due_hangups(self, now: float) -> List[str]:
+        due = [sid for sid, due_at in self._hangups.items() if due_at <= now]
+        for sid in due:
+            del self._hangups[sid]
+        return due
+
+    async def purge_expired(self, now: float) -> int:
+        expired = [key for key, (_, expires_at) in self._states.items() if expires_at < now]
+        for key in expired:
+            del self._states[key]
+        return len(expired)
+
+
+class SQLiteCallStateStore(CallStateStore):
+    """
+    Shared backend: a SQLite database in WAL mode that every worker (or node, on a
+    shared volume) opens. All statements run on a single-thread executor owning
+    the connection, so the event loop never waits on disk I/O.
+    """
+    def __init__(self, path: str, ttl: float):
+        super().__init__(ttl)
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="call-state-db")
+        self._conn = self._executor.submit(self._open).result()
+
+    def _open(self):
+        conn = db.connect(self.path)
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        return conn
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        with self._conn:
+            return self._conn.execute(sql, params).rowcount
+
+    async def load(self, key: str) -> Optional[Dict]:
+        row = await self._run(self._fetch_state, key, time.time())
+        return json.loads(row["state"]) if row else None
+
+    def _fetch_state(self, key: str, now: float):
+        return self._conn.execute(
+            "SELECT state FROM call_state WHERE key = ? AND expires_at >= ?", (key, now)
+        ).fetchone()
+
+    async def save(self, key: str, state: Dict):
+        await self._run(
+            self._execute,
+            "INSERT INTO call_state (key, state, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET state = excluded.state, expires_at = excluded.expires_at",
+            (key, json.dumps(state), time.time() + self.ttl)
+        )
+
+    async def delete(self, key: str):
+        await self._run(self._execute, "DELETE FROM call_state WHERE key = ?", (key,))
+
+    async def schedule_hangup(self, call_sid: str, due_at: float):
+        await self._run(
+            self._execute,
+            "INSERT OR REPLACE INTO pending_hangups (call_sid, due_at) VALUES (?, ?)",
+            (call_sid, due_at)
+        )
+
+    async def claim_hangup(self, call_sid: str) -> bool:
+        deleted = await self._run(self._execute, "DELETE FROM pending_hangups WHERE call_sid = ?", (call_sid,))
+        return deleted == 1
+
+    async def claim_due_hangups(self, now: float) -> List[str]:
+        return await self._run(self._claim_due, now)
+
+    def _claim_due(self, now: float) -> List[str]:
+        due = [row["call_sid"] for row in self._conn.execute(
+            "SELECT call_sid FROM pending_hangups WHERE due_at <= ?", (now,)
+        )]
+        # A row deleted by another worker in between is simply not ours
+        return [sid for sid in due if self._execute("DELETE FROM pending_hangups WHERE call_sid = ?", (sid,)) == 1]
+
+    async def purge_expired(self, now: float) -> int:
+        return await self._run(self._execute, "DELETE FROM call_state WHERE expires_at < ?", (now,))
+
+    async def close(self):
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
+
+
+def create_call_state_store() -> CallStateStore:
+    if Config.CALL_STATE_BACKEND == "sqlite":
+        return SQLiteCallStateStore(Config.CALL_STATE_DB, Config.CALL_STATE_TTL)
+    if Config.CALL_STATE_BACKEND != "memory":
+        raise ValueError(f"Unknown CALL_STATE_BACKEND: {Config.CALL_STATE_BACKEND}")
+    return MemoryCallStateStore(Config.CALL_STATE_TTL)
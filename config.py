@@ -9,7 +9,132 @@ class Config:
     TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
     TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
     PORT = int(os.getenv("PORT", 5000))
-    
+
+    # Vendor endpoints (override to point the service at local stand-ins, see loadtest/)
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+    DEEPGRAM_API_URL = os.getenv("DEEPGRAM_API_URL", "https://api.deepgram.com")
+    DEEPGRAM_WS_URL = os.getenv("DEEPGRAM_WS_URL", "wss://api.deepgram.com")
+    TWILIO_API_URL = os.getenv("TWILIO_API_URL", "https://api.twilio.com")
+
+    # Twilio call control (hangup/redirect): per-request timeout in seconds and retry count
+    CALL_CONTROL_TIMEOUT = float(os.getenv("CALL_CONTROL_TIMEOUT", 5.0))
+    CALL_CONTROL_RETRIES = int(os.getenv("CALL_CONTROL_RETRIES", 2))
+
+    # STT sessions are opened when the webhook answers; a warm pool covers the rest.
+    # The pool is sized from the expected call arrival rate (0 disables it), capped at STT_POOL_MAX
+    STT_CALLS_PER_MINUTE = float(os.getenv("STT_CALLS_PER_MINUTE", 6))
+    STT_POOL_MAX = int(os.getenv("STT_POOL_MAX", 4))
+    STT_POOL_MAX_AGE = float(os.getenv("STT_POOL_MAX_AGE", 300))
+    # Deepgram closes idle sessions after ~10 s without audio
+    STT_KEEPALIVE_SECONDS = float(os.getenv("STT_KEEPALIVE_SECONDS", 5))
+    # Prepared sessions whose media stream never arrives are closed after this many seconds
+    STT_PREPARED_TTL = float(os.getenv("STT_PREPARED_TTL", 30))
+
+    # Reply segmentation for TTS: an early first clause of at least SEGMENT_FIRST_MIN_CHARS,
+    # then sentences grouped up to SEGMENT_MIN_CHARS, never more than SEGMENT_MAX_CHARS
+    SEGMENT_FIRST_MIN_CHARS = int(os.getenv("SEGMENT_FIRST_MIN_CHARS", 20))
+    SEGMENT_MIN_CHARS = int(os.getenv("SEGMENT_MIN_CHARS", 60))
+    SEGMENT_MAX_CHARS = int(os.getenv("SEGMENT_MAX_CHARS", 240))
+
+    # Adaptive end of turn: Deepgram reports speech_final after STT_ENDPOINTING_MS of silence,
+    # then the turn detector (turns.py) commits at once or waits up to TURN_MAX_GAP_MS in total.
+    # TURN_BASELINE_GAP_MS is the fixed endpointing it replaces (and the reported savings' reference)
+    TURN_ADAPTIVE = os.getenv("TURN_ADAPTIVE", "true").lower() == "true"
+    TURN_BASELINE_GAP_MS = int(os.getenv("TURN_BASELINE_GAP_MS", 800))
+    STT_ENDPOINTING_MS = int(os.getenv("STT_ENDPOINTING_MS", 300 if TURN_ADAPTIVE else TURN_BASELINE_GAP_MS))
+    TURN_MAX_GAP_MS = int(os.getenv("TURN_MAX_GAP_MS", 1600))
+    # Early commits are turned off for a caller after this many cut-offs
+    TURN_MAX_CUT_OFFS = int(os.getenv("TURN_MAX_CUT_OFFS", 2))
+
+    # Inbound audio is forwarded to STT in chunks of this many ms (40-100; Twilio frames are 20 ms)
+    INGEST_CHUNK_MS = int(os.getenv("INGEST_CHUNK_MS", 60))
+    # Chunks queued for the STT socket before the media reader waits (backpressure)
+    INGEST_MAX_QUEUED_CHUNKS = int(os.getenv("INGEST_MAX_QUEUED_CHUNKS", 16))
+
+    # Maximum number of TTS requests in flight per call
+    TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", 3))
+    # Connection pool size of the shared LLM client (shared by all calls on the worker)
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 100))
+
+    # Start the LLM on final-but-not-speech-final transcripts and commit on speech_final
+    SPECULATIVE_ENABLED = os.getenv("SPECULATIVE_ENABLED", "true").lower() == "true"
+    SPECULATIVE_MIN_WORDS = int(os.getenv("SPECULATIVE_MIN_WORDS", 1))
+
+    # Speak templated responses for deterministic tool results instead of a second completion
+    TOOL_FAST_PATH = os.getenv("TOOL_FAST_PATH", "true").lower() == "true"
+
+    # Local emergency/farewell detection on final transcripts: confident matches are
+    # answered from cached audio without the LLM, the rest falls back to the model
+    INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "true").lower() == "true"
+    INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", 0.8))
+
+    # Conversation history token budget; older turns are folded into a running summary
+    HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 3000))
+    HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", 4))
+
+    # Directory for optional per-call JSON latency traces (disabled when unset)
+    TRACE_DIR = os.getenv("TRACE_DIR") or None
+
+    # Directory for call recordings replayed by loadtest/replay.py (disabled when unset);
+    # inbound audio can be left out to keep the files small
+    RECORD_DIR = os.getenv("RECORD_DIR") or None
+    RECORD_AUDIO = os.getenv("RECORD_AUDIO", "true").lower() == "true"
+    RECORD_FLUSH_SECONDS = float(os.getenv("RECORD_FLUSH_SECONDS", 1.0))
+
+    # SQLite bookings store and the size of its connection/thread pool
+    BOOKINGS_DB = os.getenv("BOOKINGS_DB", "bookings.db")
+    BOOKINGS_DB_POOL_SIZE = int(os.getenv("BOOKINGS_DB_POOL_SIZE", 4))
+    # How often the in-memory slot index picks up bookings made by other workers
+    SLOT_INDEX_REFRESH_SECONDS = float(os.getenv("SLOT_INDEX_REFRESH_SECONDS", 1.0))
+    # Slots offered to a caller are held this long (and only this many per offer),
+    # so concurrent callers are not told the same slot is free
+    SLOT_HOLD_SECONDS = float(os.getenv("SLOT_HOLD_SECONDS", 120))
+    SLOT_HOLD_OFFERED = int(os.getenv("SLOT_HOLD_OFFERED", 4))
+
+    # Call state (history, flags, pending hangups): "memory" for a single worker,
+    # "sqlite" to share it between workers/nodes through CALL_STATE_DB
+    CALL_STATE_BACKEND = os.getenv("CALL_STATE_BACKEND", "memory").lower()
+    CALL_STATE_DB = os.getenv("CALL_STATE_DB", "call_state.db")
+    # Seconds without a save after which a call's state expires
+    CALL_STATE_TTL = float(os.getenv("CALL_STATE_TTL", 3600))
+    # Sweeper interval; it purges expired state and takes over overdue hangups
+    CALL_STATE_SWEEP_SECONDS = float(os.getenv("CALL_STATE_SWEEP_SECONDS", 15))
+
+    # Keep-alive connections opened to each vendor at startup, before GET /ready reports ready
+    WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", 2))
+    # On shutdown active calls get this long to finish. Calls still running are then moved
+    # to another worker by redirecting them to HANDOFF_STREAM_URL (wss://<host>/ws/call)
+    # when set; with a shared call state (CALL_STATE_BACKEND=sqlite) they resume there
+    SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", 25))
+    HANDOFF_STREAM_URL = os.getenv("HANDOFF_STREAM_URL") or None
+
+    # Clinic opening hours (Mon-Fri 8am-6pm) and appointment slot length
+    CLINIC_OPEN_DAYS = [int(d) for d in os.getenv("CLINIC_OPEN_DAYS", "0,1,2,3,4").split(",")]
+    CLINIC_OPEN_TIME = os.getenv("CLINIC_OPEN_TIME", "08:00")
+    CLINIC_CLOSE_TIME = os.getenv("CLINIC_CLOSE_TIME", "18:00")
+    SLOT_MINUTES = int(os.getenv("SLOT_MINUTES", 30))
+    # Forward Deepgram Speak bytes to Twilio as they arrive instead of waiting for the full clip
+    TTS_STREAMING = os.getenv("TTS_STREAMING", "true").lower() == "true"
+
+    # Deepgram Speak voice settings (also part of the phrase cache key)
+    TTS_MODEL = os.getenv("TTS_MODEL", "aura-asteria-en")
+    TTS_ENCODING = os.getenv("TTS_ENCODING", "mulaw")
+    TTS_SAMPLE_RATE = int(os.getenv("TTS_SAMPLE_RATE", 8000))
+
+    # Phrase audio cache: in-memory LRU with a byte budget plus a persistent disk tier
+    TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+    TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))
+    # Only pre-warmed phrases are written to disk (never per-call text), least recently used evicted first
+    TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", 64 * 1024 * 1024))
+    # Phrases synthesized at startup, separated by "|"
+    TTS_PREWARM_PHRASES = [p.strip() for p in os.getenv(
+        "TTS_PREWARM_PHRASES",
+        "Is there anything else I can assist you with today?|"
+        "Our opening hours are Monday to Friday, 8am to 6pm.|"
+        "Thank you for calling HealthCenter One. Goodbye!"
+    ).split("|") if p.strip()]
+
     # System Prompt for the AI
     SYSTEM_PROMPT = """
     You are a helpful, professional, and empathetic medical receptionist for 'HealthCenter One'.
@@ -25,3 +150,14 @@ class Config:
     
     Keep responses concise and conversational, suitable for voice interaction. Avoid long lists or complex URL reading.
     """
+
+    # Per-call system prompt used for booking conversations
+    ASSISTANT_PROMPT = """You are a professional medical administrative assistant for HealthCenter One. Your objective is to manage patient inquiries and finalize bookings.
+
+STRICT DATA EXTRACTION RULES:
+1. FULL NAME: You must extract the patient's FULL NAME (First and Last). If they say only "Vishal", ASK for their last name. DO NOT use words like "Yes", "Hello", or "Okay" as a name.
+2. DETAILS: You need a Date, a Time, and a Reason for the visit.
+3. CONFIRMATION: Only call the 'book_appointment' tool AFTER you have all 3 items and the FULL NAME. 
+4. CLOSING: After confirming a booking, ALWAYS ask if there is anything else you can help with (e.g., "Is there anything else I can assist you with today?").
+5. TERMINATION: If the user says "No", "Goodbye", "No thanks", or indicates they are finished, use the 'terminate_call' tool and give a final farewell.
+6. CONCISENESS: Maintain a formal, helpful tone but keep responses very concise for voice interaction."""
@@ -0,0 +1,91 @@
+import sqlite3
+
+# Shared schema for the bookings store (used by BookingService and the import script)
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    datetime TEXT NOT NULL,
+    reason TEXT,
+    status TEXT,
+    timestamp TEXT,
+    source TEXT,
+    external_id TEXT
+)
+'''
+# Columns added after the first release, created on existing stores by init_db.
+# Imported bookings keep their export id in external_id (source names the export);
+# both are NULL for bookings taken on the phone line
+MIGRATED_COLUMNS = {"source": "TEXT", "external_id": "TEXT"}
+
+# Short-lived holds on offered slots (see BookingService.hold_slots); one row per slot
+HOLDS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS slot_holds (
+    slot TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+)
+'''
+
+# Import watermark per export (see import_json_to_sqlite.py --incremental)
+IMPORT_STATE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS import_state (
+    source TEXT PRIMARY KEY,
+    last_timestamp TEXT,
+    imported_at TEXT
+)
+'''
+
+INDEXES = {
+    "idx_bookings_datetime": "CREATE INDEX IF NOT EXISTS idx_bookings_datetime ON bookings (datetime)",
+    "idx_bookings_name": "CREATE INDEX IF NOT EXISTS idx_bookings_name ON bookings (name)",
+    # Conflict guard: at most one confirmed booking per slot start, across all workers
+    "idx_bookings_confirmed_slot": "CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_confirmed_slot "
+                                   "ON bookings (datetime) WHERE status = 'confirmed'",
+    # Upsert key of imported bookings, apart from the ids of live bookings
+    "idx_bookings_external": "CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_external "
+                             "ON bookings (source, external_id)",
+    "idx_slot_holds_expires": "CREATE INDEX IF NOT EXISTS idx_slot_holds_expires ON slot_holds (expires_at)",
+}
+# Indexes that enforce a constraint: kept during bulk loads so imports cannot break it
+CONSTRAINT_INDEXES = {"idx_bookings_confirmed_slot", "idx_bookings_external"}
+
+
+def connect(path: str, timeout: float = 5.0) -> sqlite3.Connection:
+    """
+    Opens a connection in WAL mode so readers never block the single writer.
+    """
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def init_db(conn: sqlite3.Connection, with_indexes: bool = True):
+    conn.execute(SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(bookings)")}
+    for column, kind in MIGRATED_COLUMNS.items():
+        if column not in columns:
+            conn.execute(f"ALTER TABLE bookings ADD COLUMN {column} {kind}")
+    conn.execute(HOLDS_SCHEMA)
+    conn.execute(IMPORT_STATE_SCHEMA)
+    for name, statement in INDEXES.items():
+        if with_indexes or name in CONSTRAINT_INDEXES:
+            try:
+                conn.execute(statement)
+            except sqlite3.IntegrityError as e:
+                # Legacy data with double bookings: keep running without the guard
+                print(f"[DB] Could not create {name}: {e}")
+    conn.commit()
+
+
+def drop_indexes(conn: sqlite3.Connection):
+    """
+    Drops the secondary indexes (bulk loads rebuild them once afterwards).
+    """
+    for name in INDEXES:
+        if name in CONSTRAINT_INDEXES:
+            continue
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
@@ -0,0 +1,148 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+def estimate_tokens(message: Dict) -> int:
+    """
+    Cheap token estimate (~4 characters per token plus per-message overhead).
+    """
+    chars = len(message.get("content") or "")
+    for tool_call in message.get("tool_calls") or []:
+        chars += len(json.dumps(tool_call))
+    return chars // 4 + 4
+
+
+class ConversationHistory:
+    """
+    Token-budgeted conversation history for one call.
+    The prompt is laid out as [system prompt][running summary][recent turns], so the
+    prefix only changes when older turns are folded into the summary. Folding runs
+    in the background between turns and never delays the current turn.
+    """
+    def __init__(self, system_prompt: str, token_budget: int, keep_turns: int):
+        self.system_message = {"role": "system", "content": system_prompt}
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summary = ""
+        # Each turn is the list of messages it produced (user, tool calls/results, assistant)
+        self.turns: List[List[Dict]] = []
+        self._turn_tokens: List[int] = []
+        self._summary_task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict:
+        return {"summary": self.summary, "turns": self.turns}
+
+    def restore(self, state: Dict):
+        """
+        Loads the summary and turns saved by `to_dict` (e.g. by another worker).
+        """
+        self.summary = state.get("summary", "")
+        self.turns = [list(turn) for turn in state.get("turns", [])]
+        self._turn_tokens = [sum(estimate_tokens(m) for m in turn) for turn in self.turns]
+
+    def messages(self) -> List[Dict]:
+        messages = [self.system_message]
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+        for turn in self.turns:
+            messages.extend(turn)
+        return messages
+
+    def last_reply(self) -> Optional[str]:
+        """
+        Text of the most recent assistant message, if any.
+        """
+        for turn in reversed(self.turns):
+            for message in reversed(turn):
+                if message.get("role") == "assistant" and message.get("content"):
+                    return message["content"]
+        return None
+
+    def token_count(self) -> int:
+        count = estimate_tokens(self.system_message) + sum(self._turn_tokens)
+        if self.summary:
+            count += len(self.summary) // 4 + 4
+        return count
+
+    def add_turn(self, turn: List[Dict]):
+        """
+        Commits the messages of a finished (or interrupted) turn.
+        """
+        turn = self._complete_prefix(turn)
+        if turn:
+            self.turns.append(turn)
+            self._turn_tokens.append(sum(estimate_tokens(m) for m in turn))
+
+    def truncate_message(self, message: Dict, content: str):
+        """
+        Replaces a committed assistant message with the part the caller actually heard
+        (barge-in). The message is dropped if nothing was heard; messages already
+        folded into the summary are left alone.
+        """
+        for index, turn in enumerate(self.turns):
+            if not any(m is message for m in turn):
+                continue
+            if content:
+                message["content"] = content
+            else:
+                turn[:] = [m for m in turn if m is not message]
+            self._turn_tokens[index] = sum(estimate_tokens(m) for m in turn)
+            return
+
+    def compact(self, summarize: Callable[[str, List[Dict]], Awaitable[str]]):
+        """
+        Schedules background folding of the oldest turns once the budget is exceeded.
+        """
+        if self.token_count() <= self.token_budget:
+            return
+        if self._summary_task and not self._summary_task.done():
+            return
+        self._summary_task = asyncio.create_task(self._fold(summarize))
+
+    def cancel(self):
+        if self._summary_task and not self._summary_task.done():
+            self._summary_task.cancel()
+
+    async def _fold(self, summarize: Callable[[str, List[Dict]], Awaitable[str]]):
+        # Fold down to 3/4 of the budget so the prefix stays stable for several turns
+        target = self.token_budget * 3 // 4
+        foldable = max(0, len(self.turns) - self.keep_turns)
+        count = 0
+        excess = self.token_count() - target
+        while count < foldable and excess > 0:
+            excess -= self._turn_tokens[count]
+            count += 1
+        if count == 0:
+            return
+
+        folded = [m for turn in self.turns[:count] for m in turn]
+        try:
+            summary = await summarize(self.summary, folded)
+        except Exception as e:
+            print(f"[History] Summarization failed: {e}")
+            return
+        if not summary:
+            return
+
+        # Only the oldest turns are folded; turns added meanwhile stay at the end
+        self.summary = summary
+        del self.turns[:count]
+        del self._turn_tokens[:count]
+        print(f"[History] Folded {count} turns into summary ({self.token_count()} tokens)")
+
+    @staticmethod
+    def _complete_prefix(turn: List[Dict]) -> List[Dict]:
+        """
+        Drops a trailing tool-call message whose results are missing (interrupted turn),
+        since the API rejects tool calls without matching tool messages.
+        """
+        for i, message in enumerate(turn):
+            tool_calls = message.get("tool_calls")
+            if not tool_calls:
+                continue
+            ids = {tc["id"] for tc in tool_calls}
+            answered = {m.get("tool_call_id") for m in turn[i + 1:] if m.get("role") == "tool"}
+            if not ids <= answered:
+                return turn[:i]
+        return turn
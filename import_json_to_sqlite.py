@@ -1,45 +1,250 @@
+"""
+Imports or syncs bookings from a JSON export into the SQLite bookings store.
+
+The input is parsed incrementally (a JSON array or JSON Lines), rows are written
+in large executemany batches, one transaction per batch, and indexes are built
+after a full load. Records are upserted on (source, export id), kept apart from
+the ids of bookings taken on the phone line. With --incremental only records newer
+than the export's import watermark (import_state) are applied. A confirmed record
+for a slot that is already booked is skipped and reported; the booking in the
+store is kept. Datetimes are stored in the slot format of live bookings
+(SLOT_FORMAT), so both collide on the same slot; records whose datetime cannot be
+parsed are rejected and reported.
+
+    python import_json_to_sqlite.py bookings.json
+    python import_json_to_sqlite.py export.jsonl --incremental
+"""
+import argparse
+import itertools
 import json
 import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import Config
+from scheduling import SLOT_FORMAT, parse_datetime
+import db
+
+READ_CHUNK = 1 << 16
+# Name of the export the records come from (bookings.source)
+DEFAULT_SOURCE = "export"
+
+# Upsert on (source, export id) only: a slot conflict (idx_bookings_confirmed_slot) fails
+# the row instead of deleting the booking that holds the slot, as OR REPLACE would
+INSERT_SQL = '''
+    INSERT INTO bookings (source, external_id, name, datetime, reason, status, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(source, external_id) DO UPDATE SET
+        name = excluded.name, datetime = excluded.datetime, reason = excluded.reason,
+        status = excluded.status, timestamp = excluded.timestamp
+'''
+# Skipped records shown by the command line; the report holds all of them
+SHOW_CONFLICTS = 20
+
+
+def _iter_array(f) -> Iterator[Dict]:
+    """
+    Yields the elements of a top-level JSON array without loading the whole file.
+    `f` is positioned right after the opening bracket.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    while True:
+        # Skip whitespace and separators between elements
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer):
+                break
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                raise ValueError("Unterminated JSON array")
+            buffer, pos = chunk, 0
+        if buffer[pos] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The element continues past the buffer: read more and retry
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                raise
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield record
+        pos = end
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """
+    Streams booking records from a JSON array or a JSON Lines file.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        if first == "[":
+            yield from _iter_array(f)
+            return
+        f.seek(0)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _row(booking: Dict, source: str) -> Optional[Tuple]:
+    """
+    The bookings row for an export record, or None when its datetime is not valid.
+    """
+    start = parse_datetime(booking.get("datetime") or "")
+    if start is None:
+        return None
+    external_id = booking.get("id")
+    return (
+        source,
+        None if external_id is None else str(external_id),
+        booking["name"],
+        start.strftime(SLOT_FORMAT),
+        booking.get("reason"),
+        booking.get("status"),
+        booking.get("timestamp"),
+    )
+
+
+def _write_batch(conn, batch: List[Tuple], conflicts: List[Dict]) -> int:
+    """
+    Writes one batch in one transaction. If a record conflicts with a booking in the
+    store, the batch is rolled back and applied row by row, skipping the conflicts.
+    """
+    try:
+        with conn:
+            conn.executemany(INSERT_SQL, batch)
+        return len(batch)
+    except sqlite3.IntegrityError:
+        pass
+    written = 0
+    with conn:
+        for row in batch:
+            try:
+                conn.execute(INSERT_SQL, row)
+                written += 1
+            except sqlite3.IntegrityError as e:
+                conflicts.append({"id": row[1], "name": row[2], "datetime": row[3], "error": str(e)})
+    return written
+
+
+def last_imported_timestamp(conn, source: str) -> Optional[str]:
+    row = conn.execute("SELECT last_timestamp FROM import_state WHERE source = ?", (source,)).fetchone()
+    return row["last_timestamp"] if row else None
+
+
+def _save_watermark(conn, source: str, timestamp: Optional[str]):
+    """
+    Advances the export's watermark to the newest timestamp it has delivered so far.
+    """
+    if not timestamp:
+        return
+    with conn:
+        conn.execute(
+            "INSERT INTO import_state (source, last_timestamp, imported_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(source) DO UPDATE SET imported_at = excluded.imported_at, "
+            "last_timestamp = MAX(COALESCE(last_timestamp, ''), excluded.last_timestamp)",
+            (source, timestamp, datetime.now().isoformat(timespec="seconds"))
+        )
+
+
+def import_bookings(json_path: str, db_path: str, batch_size: int = 10000, incremental: bool = False,
+                    source: str = DEFAULT_SOURCE) -> Dict:
+    conn = db.connect(db_path)
+    # Bulk-load settings: bigger page cache, temp structures in memory
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+    since = None
+    if incremental:
+        db.init_db(conn)
+        since = last_imported_timestamp(conn, source)
+    else:
+        # Full load: maintaining indexes row by row is slower than building them once
+        db.init_db(conn, with_indexes=False)
+        db.drop_indexes(conn)
+
+    records = iter_records(json_path)
+    if since:
+        # ISO 8601 timestamps compare correctly as strings
+        records = (r for r in records if (r.get("timestamp") or "") > since)
+
+    started = time.perf_counter()
+    imported = 0
+    newest = since
+    conflicts: List[Dict] = []
+    rejected: List[Dict] = []
+
+    def valid_rows() -> Iterator[Tuple]:
+        for record in records:
+            row = _row(record, source)
+            if row is None:
+                rejected.append({"id": record.get("id"), "name": record.get("name"),
+                                 "datetime": record.get("datetime"), "error": "invalid datetime"})
+            else:
+                yield row
+
+    rows = valid_rows()
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        imported += _write_batch(conn, batch, conflicts)
+        newest = max([newest or ""] + [row[-1] or "" for row in batch])
+    # Saved once at the end: an interrupted import is re-applied by the next run
+    _save_watermark(conn, source, newest)
+
+    if not incremental:
+        index_started = time.perf_counter()
+        db.init_db(conn)
+        print(f"Indexes built in {time.perf_counter() - index_started:.2f}s")
+    conn.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": imported,
+        "seconds": elapsed,
+        "rows_per_second": imported / elapsed if elapsed > 0 else 0.0,
+        "since": since,
+        "conflicts": conflicts,
+        "rejected": rejected,
+    }
+
+
+def _print_skipped(title: str, records: List[Dict]):
+    if not records:
+        return
+    print(f"Skipped {len(records)} {title}:")
+    for record in records[:SHOW_CONFLICTS]:
+        print(f"  id {record['id']}: {record['name']} at {record['datetime']} ({record['error']})")
+    if len(records) > SHOW_CONFLICTS:
+        print(f"  ... and {len(records) - SHOW_CONFLICTS} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or sync bookings from JSON / JSON Lines into SQLite")
+    parser.add_argument("json_file", nargs="?", default="bookings.json")
+    parser.add_argument("--db", default=Config.BOOKINGS_DB)
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows per executemany/transaction")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only apply records newer than the export's import watermark")
+    parser.add_argument("--source", default=DEFAULT_SOURCE,
+                        help="Name of the export; ids and the watermark are kept per source")
+    args = parser.parse_args()
+
+    report = import_bookings(args.json_file, args.db, args.batch_size, args.incremental, args.source)
+    since = f" newer than {report['since']}" if report["since"] else ""
+    print(f"Imported {report['rows']} bookings{since} into {args.db} "
+          f"in {report['seconds']:.2f}s ({report['rows_per_second']:.0f} rows/s)")
+    _print_skipped("records that conflict with bookings in the store", report["conflicts"])
+    _print_skipped("records with an invalid datetime", report["rejected"])
+
 
-# Paths
-JSON_FILE = 'bookings.json'
-DB_FILE = 'bookings.db'
-
-# Connect to SQLite (creates file if not exists)
-conn = sqlite3.connect(DB_FILE)
-cursor = conn.cursor()
-
-# Create table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS bookings (
-    id INTEGER PRIMARY KEY,
-    name TEXT NOT NULL,
-    datetime TEXT NOT NULL,
-    reason TEXT,
-    status TEXT,
-    timestamp TEXT
-)
-''')
-
-# Load JSON data
-with open(JSON_FILE, 'r', encoding='utf-8') as f:
-    bookings = json.load(f)
-
-# Insert data
-for booking in bookings:
-    cursor.execute('''
-        INSERT OR REPLACE INTO bookings (id, name, datetime, reason, status, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (
-        booking['id'],
-        booking['name'],
-        booking['datetime'],
-        booking.get('reason'),
-        booking.get('status'),
-        booking.get('timestamp')
-    ))
-
-conn.commit()
-conn.close()
-
-print('All bookings from JSON have been stored in bookings.db')
+if __name__ == "__main__":
+    main()
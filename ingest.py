@@ -0,0 +1,131 @@
+import asyncio
+import binascii
+import json
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from config import Config
+from metrics import metrics
+
+try:
+    import orjson
+except ImportError:  # optional, ~3-5x faster parsing of the 50 msg/s media events
+    orjson = None
+
+if orjson:
+    loads = orjson.loads
+
+    def dumps(payload: Dict) -> str:
+        return orjson.dumps(payload).decode()
+else:
+    loads = json.loads
+    dumps = json.dumps
+
+# 8 kHz mulaw: one byte per sample
+BYTES_PER_MS = 8
+
+
+class MediaIngest:
+    """
+    Inbound audio path of one call: Twilio media payloads are decoded into a buffer
+    and forwarded to STT in `chunk_ms` chunks (instead of one send per 20 ms frame)
+    by a sender task. The queue between them is bounded, so when the STT socket falls
+    behind the websocket reader waits instead of buffering without limit.
+    CPU spent parsing and decoding is accounted per call.
+    """
+    def __init__(self, send_media: Callable[[bytes], Awaitable[None]],
+                 chunk_ms: int = Config.INGEST_CHUNK_MS,
+                 max_queued_chunks: int = Config.INGEST_MAX_QUEUED_CHUNKS):
+        self.send_media = send_media
+        self.chunk_bytes = max(40, min(chunk_ms, 100)) * BYTES_PER_MS
+        self._buffer = bytearray()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_queued_chunks))
+        self._sender: Optional[asyncio.Task] = None
+        self.frames = 0
+        self.chunks = 0
+        self.audio_bytes = 0
+        self.cpu_seconds = 0.0
+        self.backpressure_waits = 0
+        self.backpressure_seconds = 0.0
+
+    def start(self):
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def parse(self, data) -> Dict:
+        started = time.thread_time()
+        message = loads(data)
+        self.cpu_seconds += time.thread_time() - started
+        return message
+
+    async def push(self, payload: str):
+        """
+        Decodes one media payload; a full chunk is handed to the sender.
+        """
+        started = time.thread_time()
+        self._buffer += binascii.a2b_base64(payload)
+        self.frames += 1
+        self.cpu_seconds += time.thread_time() - started
+        if len(self._buffer) >= self.chunk_bytes:
+            chunk = bytes(self._buffer)
+            self._buffer.clear()
+            await self._enqueue(chunk)
+
+    async def close(self):
+        """
+        Sends what is still buffered and stops the sender.
+        """
+        if self._buffer and self._sender and not self._sender.done():
+            await self._enqueue(bytes(self._buffer))
+            self._buffer.clear()
+        if self._sender:
+            if not self._sender.done():
+                await self._queue.put(None)
+            try:
+                await asyncio.wait_for(self._sender, timeout=2.0)
+            except asyncio.TimeoutError:
+                self._sender.cancel()
+            except Exception as e:
+                print(f"[Ingest] STT sender stopped: {e}")
+        self._report()
+
+    async def _enqueue(self, chunk: bytes):
+        if self._sender is None or self._sender.done():
+            # STT socket is gone; nothing will drain the queue
+            return
+        if self._queue.full():
+            self.backpressure_waits += 1
+            started = time.perf_counter()
+            await self._queue.put(chunk)
+            self.backpressure_seconds += time.perf_counter() - started
+        else:
+            self._queue.put_nowait(chunk)
+
+    async def _send_loop(self):
+        while True:
+            chunk = await self._queue.get()
+            if chunk is None:
+                return
+            self.chunks += 1
+            self.audio_bytes += len(chunk)
+            await self.send_media(chunk)
+
+    def stats(self) -> Dict:
+        audio_seconds = self.audio_bytes / (BYTES_PER_MS * 1000)
+        return {
+            "frames": self.frames,
+            "chunks": self.chunks,
+            "audio_seconds": round(audio_seconds, 2),
+            "cpu_ms": round(self.cpu_seconds * 1000, 2),
+            "cpu_ms_per_audio_second": round(self.cpu_seconds * 1000 / audio_seconds, 3) if audio_seconds else 0.0,
+            "backpressure_waits": self.backpressure_waits,
+            "backpressure_ms": round(self.backpressure_seconds * 1000, 1),
+        }
+
+    def _report(self):
+        metrics.inc("voice_ingest_cpu_seconds_total", "CPU time spent parsing and decoding inbound media",
+                    value=self.cpu_seconds)
+        metrics.inc("voice_ingest_audio_seconds_total", "Inbound audio forwarded to STT",
+                    value=self.audio_bytes / (BYTES_PER_MS * 1000))
+        metrics.inc("voice_ingest_backpressure_total", "Times the reader waited for a slow STT socket",
+                    value=self.backpressure_waits)
+        if self.frames:
+            print(f"[Ingest] Call stats: {self.stats()}")
@@ -0,0 +1,233 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from phrases import detect_language
+from speculation import normalize_utterance
+
+EMERGENCY = "emergency"
+FAREWELL = "farewell"
+
+# (pattern, weight) per language, matched against the normalized utterance
+# (lowercase, no punctuation). Weights are the confidence of a match on its own.
+_EMERGENCY_PATTERNS = {
+    "en": [
+        (r"\bchest pains?\b|\bpain in (my|his|her|the) chest\b", 0.95),
+        (r"\b(can ?not|cant|can't|could ?nt|unable to|trouble|difficulty|struggling to) breath(e|ing)?\b", 0.95),
+        (r"\bshort(ness)? of breath\b", 0.9),
+        # "stroke" only in a medical phrase ("a stroke of luck" is not an emergency)
+        (r"\bheart attack\b|\b(having|had|has|have) an? stroke\b|\bstroke (symptoms|signs)\b"
+         r"|\bsigns of an? stroke\b|\bseizure\b|\boverdos(e|ed)\b", 0.95),
+        (r"\b(unconscious|not breathing|passed out|collapsed|fainted)\b", 0.95),
+        (r"\bbleeding (a lot|heavily|badly)\b|\bwont stop bleeding\b|\bsevere bleeding\b", 0.9),
+        (r"\b(suicid\w*|kill myself|end my life)\b", 0.95),
+        (r"\bemergency\b", 0.7),
+        (r"\b(ambulance|call 911|call 112)\b", 0.85),
+    ],
+    "fr": [
+        (r"\bdouleurs? (thoracique|à la poitrine|dans la poitrine)s?\b|\bmal à la poitrine\b", 0.95),
+        (r"\b(n ?arrive pas|du mal) à respirer\b|\bje (ne )?peux pas respirer\b|\bje respire mal\b", 0.95),
+        (r"\bessoufflée?\b|\bétouffe\b", 0.85),
+        (r"\bcrise cardiaque\b|\binfarctus\b|\bavc\b|\bconvulsions?\b|\bcrise d ?épilepsie\b|\bovers?dose\b", 0.95),
+        (r"\b(inconsciente?|évanouie?|ne respire plus|perdu connaissance)\b", 0.95),
+        (r"\bsaigne (beaucoup|abondamment)\b|\bhémorragie\b", 0.9),
+        (r"\b(suicid\w*|me tuer|en finir)\b", 0.95),
+        (r"\burgence\b", 0.7),
+        (r"\b(ambulance|samu|appeler le 15|appeler le 112)\b", 0.85),
+    ],
+    "de": [
+        (r"\bbrustschmerz\w*\b|\bschmerzen in der brust\b", 0.95),
+        (r"\b(keine luft|kann nicht atmen|kann kaum atmen|atemnot)\b", 0.95),
+        (r"\bherzinfarkt\b|\bschlaganfall\b|\bkrampfanfall\b|\büberdosis\b", 0.95),
+        (r"\b(bewusstlos|ohnmächtig|atmet nicht( mehr)?|zusammengebrochen)\b", 0.95),
+        (r"\b(blutet stark|starke blutung|hört nicht auf zu bluten)\b", 0.9),
+        (r"\b(suizid\w*|selbstmord|mich umbringen)\b", 0.95),
+        (r"\bnotfall\b", 0.7),
+        (r"\b(krankenwagen|rettungswagen|notarzt|112 anrufen)\b", 0.85),
+    ],
+}
+
+# "I don't have chest pain", "ce n'est pas une urgence", "kein Notfall": a negation up
+# to three words before the match, in the same clause ("I don't know, I have chest pain"
+# is split at the comma; the window does not reach across "but", "and", ...)
+_NEGATIONS = {
+    "en": r"\b(no|not|dont|doesnt|isnt|never|without)\b((?!\s+(but|and|so|because)\b)\s+\w+){0,3}\s*$",
+    "fr": r"\b(pas|plus|jamais|sans|aucune?)\b((?!\s+(mais|et|donc|parce)\b)\s+\w+){0,3}\s*$",
+    "de": r"\b(kein\w*|nicht|nie|ohne)\b((?!\s+(aber|und|also|weil)\b)\s+\w+){0,3}\s*$",
+}
+
+# Medical history rather than an emergency: "after my stroke", "I had chest pain last
+# month", "a seizure disorder". Matched in the few words before / after the match
+_HISTORY_BEFORE = {
+    "en": r"\b((i|he|she|we|they|you) had|after (my|his|her|the|a)|history of|followup|follow up|checkup"
+          r"|recover\w* from)\b",
+    "fr": r"\b((j|il|elle) ?a(i)? eu|après (mon|ma|son|sa|le|la|l|un|une)|antécédents? d|suivi|contrôle)\b",
+    "de": r"\b((ich|er|sie) hatte|nach (meinem|meiner|seinem|seiner|ihrem|ihrer|dem|der|einem|einer)"
+          r"|vorgeschichte|nachsorge|kontrolle)\b",
+}
+_HISTORY_AFTER = {
+    "en": r"^\s*(\w+\s+){0,2}(last (year|month|week|winter|summer|time)|(\w+ )?(years?|months?|weeks?) ago"
+          r"|disorder|history|in the past)\b",
+    "fr": r"^\s*(\w+\s+){0,2}(l ?an dernier|l ?année dernière|le mois dernier|la semaine dernière"
+          r"|il y a \w+ (ans?|mois|semaines?)|chronique)\b",
+    "de": r"^\s*(\w+\s+){0,2}(letztes jahr|letzten monat|letzte woche|vor \w+ (jahren|monaten|wochen)"
+          r"|leiden|erkrankung)\b",
+}
+# Words around a match searched for history context
+_HISTORY_WINDOW = 5
+
+# Clause boundaries in the raw transcript (negations do not reach across them)
+_CLAUSE = re.compile(r"[,;:.!?]+\s*|\s+[-–]\s+")
+
+# Phrases that close the call; the whole (short) utterance should be the farewell.
+# "That's all" / "c'est tout" / "das ist alles" must end the utterance (up to a thanks),
+# so "that's all right, see you Tuesday" or "c'est tout à fait ça" do not hang up
+_FAREWELL_PATTERNS = {
+    "en": [
+        (r"\b(good ?bye|bye( bye)?|have a (good|nice) (day|one))\b", 0.95),
+        (r"\b(thats|that is) (all(?! right)|everything)( (thanks|thank you|for (now|today)|then))*$", 0.9),
+    ],
+    "fr": [
+        (r"\b(au revoir|bonne (journée|soirée)|à bientôt)\b", 0.95),
+        (r"\b(c ?est tout|ce sera tout|ça sera tout)( (merci|pour (moi|aujourdhui)|alors))*$", 0.9),
+    ],
+    "de": [
+        (r"\b(auf wiedersehen|auf wiederhören|tschüss|tschüs|schönen tag)\b", 0.95),
+        (r"\b(das wars|das war ?s|das wäre alles|das ist alles)( (danke|dann|für heute))*$", 0.9),
+    ],
+}
+
+# Replies that close the call only as the answer to the closing question ("Anything
+# else?" - "No thanks"); elsewhere they are ordinary answers ("8am instead?" - "No thanks")
+_CLOSING_REPLY_PATTERNS = {
+    "en": [
+        (r"\bno (thanks|thank you)\b|\bnothing else\b", 0.85),
+        (r"\b(thats|that is) it( (thanks|thank you|for (now|today)|then))*$", 0.85),
+        (r"\bim (all )?(good|done|set)\b", 0.7),
+        (r"^(no|nope)$", 0.6),
+    ],
+    "fr": [
+        (r"\bnon merci\b|\brien d ?autre\b", 0.85),
+        (r"\bc ?est bon\b", 0.7),
+        (r"^non$", 0.6),
+    ],
+    "de": [
+        (r"\bnein danke\b|\bsonst nichts\b|\bnichts weiter\b", 0.85),
+        (r"\b(passt schon|alles gut)\b", 0.7),
+        (r"^nein$", 0.6),
+    ],
+}
+
+# Utterances with one of these are not the end of the call, wherever the farewell
+# phrase sits ("no thanks, but can I also book ...", "bye the way, I need Monday")
+_CONTINUATION = {
+    "en": r"\b(but|also|actually|wait|book|appointment|when|what|can|could|how|need|want|way)\b",
+    "fr": r"\b(mais|aussi|attendez|rendez-?vous|quand|quel|pouvez|puis-?je|comment|besoin|voudrais|veux)\b",
+    "de": r"\b(aber|auch|moment|warten|termin|wann|welche|können|kann|wie|brauche|möchte|will)\b",
+}
+
+# Longer utterances are rarely just a goodbye
+_FAREWELL_MAX_WORDS = 8
+
+# The assistant's closing question ("Is there anything else ...?")
+_CLOSING_QUESTION = re.compile(r"anything else|autre chose|sonst noch", re.IGNORECASE)
+
+
+def _compile(patterns: Dict[str, List[Tuple[str, float]]]) -> Dict[str, List[Tuple[re.Pattern, float]]]:
+    return {lang: [(re.compile(p), w) for p, w in items] for lang, items in patterns.items()}
+
+
+_EMERGENCY = _compile(_EMERGENCY_PATTERNS)
+_FAREWELL = _compile(_FAREWELL_PATTERNS)
+_CLOSING_REPLY = _compile(_CLOSING_REPLY_PATTERNS)
+_NEGATION = {lang: re.compile(p) for lang, p in _NEGATIONS.items()}
+_HISTORY_PRE = {lang: re.compile(p) for lang, p in _HISTORY_BEFORE.items()}
+_HISTORY_POST = {lang: re.compile(p) for lang, p in _HISTORY_AFTER.items()}
+_CONTINUES = {lang: re.compile(p) for lang, p in _CONTINUATION.items()}
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    confidence: float
+    language: str
+    matched: str
+
+
+def _best(text: str, patterns: Dict[str, List[Tuple[re.Pattern, float]]],
+          languages: List[str]) -> Optional[Tuple[float, str, re.Match]]:
+    best = None
+    for lang in languages:
+        for pattern, weight in patterns[lang]:
+            match = pattern.search(text)
+            if match and (best is None or weight > best[0]):
+                best = (weight, lang, match)
+    return best
+
+
+def _emergency(text: str, languages: List[str]) -> Optional[Tuple[float, str, re.Match]]:
+    """
+    Scores every emergency match clause by clause and returns the strongest after
+    discounting negated matches and matches in a medical-history context.
+    """
+    best = None
+    for clause in _CLAUSE.split(text):
+        clause = normalize_utterance(clause)
+        for lang in languages:
+            for pattern, weight in _EMERGENCY[lang]:
+                for match in pattern.finditer(clause):
+                    confidence = weight
+                    before = clause[:match.start()]
+                    if _NEGATION[lang].search(before):
+                        confidence *= 0.3
+                    if (_HISTORY_PRE[lang].search(" ".join(before.split()[-_HISTORY_WINDOW:]))
+                            or _HISTORY_POST[lang].search(clause[match.end():])):
+                        confidence *= 0.5
+                    if best is None or confidence > best[0]:
+                        best = (confidence, lang, match)
+    return best
+
+
+def classify_intent(text: str, language: Optional[str] = None,
+                    awaiting_close: bool = False) -> Optional[IntentMatch]:
+    """
+    Keyword/pattern classifier for the two intents that must not wait on the LLM.
+    `language` is the call's current language (tried first); `awaiting_close` is set
+    when the assistant just asked "anything else?": only then do a bare "no" or
+    "I'm good" count as a farewell. Returns None when nothing matched; callers compare `confidence` to
+    their threshold and leave uncertain utterances to the LLM.
+    """
+    normalized = normalize_utterance(text)
+    if not normalized:
+        return None
+    detected = detect_language(text)
+    languages = [lang for lang in (detected, language) if lang]
+    languages += [lang for lang in _EMERGENCY if lang not in languages]
+
+    emergency = _emergency(text, languages)
+    if emergency:
+        confidence, lang, match = emergency
+        return IntentMatch(EMERGENCY, confidence, lang, match.group(0))
+
+    farewell = _best(normalized, _FAREWELL, languages)
+    if awaiting_close:
+        reply = _best(normalized, _CLOSING_REPLY, languages)
+        if reply and (farewell is None or reply[0] > farewell[0]):
+            farewell = reply
+    if farewell:
+        confidence, lang, match = farewell
+        words = len(normalized.split())
+        if _CONTINUES[lang].search(normalized) or "?" in text:
+            confidence *= 0.3
+        elif words > _FAREWELL_MAX_WORDS:
+            confidence *= 0.5
+        elif awaiting_close:
+            confidence = min(1.0, confidence + 0.3)
+        return IntentMatch(FAREWELL, confidence, lang, match.group(0))
+    return None
+
+
+def asks_to_close(message: Optional[str]) -> bool:
+    """
+    True when an assistant message ends with the closing question, so a bare
+    "no" from the caller ends the call.
+    """
+    message = (message or "").strip()
+    return message.endswith("?") and bool(_CLOSING_QUESTION.search(message))
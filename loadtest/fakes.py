@@ -0,0 +1,337 @@
+"""
+Local stand-ins for OpenAI, Deepgram (STT + Speak) and Twilio's REST API.
+
+Run them in one process and point the service at it:
+
+    python -m loadtest.fakes --port 9000
+    OPENAI_BASE_URL=http://localhost:9000/v1 DEEPGRAM_API_URL=http://localhost:9000 \\
+    DEEPGRAM_WS_URL=ws://localhost:9000 TWILIO_API_URL=http://localhost:9000 \\
+    uvicorn main:app --port 5000
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.websockets import WebSocketDisconnect
+
+# mulaw byte for digital silence; anything else counts as speech for the fake STT
+MULAW_SILENCE = 0xFF
+
+
+class FakeSettings:
+    """
+    Tunables for the fakes (all delays in seconds).
+    """
+    def __init__(self):
+        self.llm_first_token_delay = 0.25
+        self.llm_token_rate = 40.0          # tokens per second
+        self.tts_first_byte_delay = 0.15
+        self.tts_bytes_per_char = 600       # ~75 ms of 8 kHz mulaw per character
+        self.tts_chunk_bytes = 1600
+        self.tts_realtime_factor = 4.0      # audio is produced 4x faster than real time
+        self.stt_endpointing = 0.3          # silence before speech_final
+        self.stt_final_delay = 0.1          # silence before the is_final fragment
+        self.utterances: List[str] = [
+            "Hello, I would like to book an appointment.",
+            "Is next Tuesday available?",
+            "Please book it for John Smith at 9 am for a checkup.",
+            "No thanks, goodbye.",
+        ]
+        self.replies: List[str] = [
+            "Certainly, I can help you with that. Which day would suit you best?",
+            "Of course. Could you tell me your full name and the reason for your visit?",
+        ]
+        # Scripted LLM plans keyed by the normalized user message (see /fake/script)
+        self.plans: Dict[str, Dict] = {}
+        self.hangups = 0
+        self.redirects = 0
+
+
+settings = FakeSettings()
+app = FastAPI()
+
+
+# --- OpenAI chat completions -------------------------------------------------
+
+def _next_weekday(days_ahead: int = 1) -> datetime:
+    day = datetime.now() + timedelta(days=days_ahead)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", "", text.lower()).split())
+
+
+def _plan_reply(messages: List[Dict]) -> Dict:
+    """
+    Chooses a scripted reply: the loaded plan for this user message if any, else a
+    tool call for recognizable intents, otherwise text.
+    """
+    last = messages[-1] if messages else {}
+    if settings.plans:
+        user = next((m for m in reversed(messages) if m.get("role") == "user"), {})
+        plan = settings.plans.get(_normalize(user.get("content") or ""))
+        if plan:
+            if last.get("role") == "tool":
+                return {"text": plan.get("followup") or "Is there anything else I can assist you with today?"}
+            return plan
+    if last.get("role") == "tool":
+        return {"text": "Is there anything else I can assist you with today?"}
+
+    text = (last.get("content") or "").lower()
+    if re.search(r"\b(goodbye|bye|no thanks)\b", text):
+        return {"tool": "terminate_call", "arguments": {}}
+    if "book it" in text or "book for" in text:
+        name = re.search(r"for ([a-z]+ [a-z]+)", text)
+        slot = _next_weekday(2).replace(hour=9, minute=0)
+        return {"tool": "book_appointment", "arguments": {
+            "name": name.group(1).title() if name else "John Smith",
+            "datetime": slot.strftime("%Y-%m-%d %H:%M"),
+            "reason": "Checkup",
+        }}
+    if "available" in text or "free" in text:
+        return {"tool": "check_availability", "arguments": {"date": _next_weekday(2).strftime("%Y-%m-%d")}}
+    user_turns = sum(1 for m in messages if m.get("role") == "user")
+    return {"text": settings.replies[(user_turns - 1) % len(settings.replies)]}
+
+
+def _chunk(completion_id: str, delta: Dict, finish_reason: Optional[str] = None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+async def _stream_reply(plan: Dict):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    await asyncio.sleep(settings.llm_first_token_delay)
+    interval = 1.0 / settings.llm_token_rate
+    yield _chunk(completion_id, {"role": "assistant", "content": ""})
+
+    if "tool" in plan:
+        arguments = json.dumps(plan["arguments"])
+        yield _chunk(completion_id, {"tool_calls": [{
+            "index": 0, "id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+            "function": {"name": plan["tool"], "arguments": ""},
+        }]})
+        for i in range(0, len(arguments), 8):
+            await asyncio.sleep(interval)
+            yield _chunk(completion_id, {"tool_calls": [{"index": 0, "function": {"arguments": arguments[i:i + 8]}}]})
+        yield _chunk(completion_id, {}, "tool_calls")
+    else:
+        for token in re.findall(r"\S+\s*", plan["text"]):
+            await asyncio.sleep(interval)
+            yield _chunk(completion_id, {"content": token})
+        yield _chunk(completion_id, {}, "stop")
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    if body.get("stream"):
+        plan = _plan_reply(messages) if body.get("tools") else {"text": _plan_reply(messages).get("text", "Certainly.")}
+        return StreamingResponse(_stream_reply(plan), media_type="text/event-stream")
+
+    # Non-streaming requests are only used for history summaries
+    await asyncio.sleep(settings.llm_first_token_delay)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "gpt-4o-mini",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "The caller is booking an appointment."},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "created": 0, "owned_by": "fake"}]}
+
+
+# --- Deepgram Speak ----------------------------------------------------------
+
+async def _speak_bytes(total: int):
+    await asyncio.sleep(settings.tts_first_byte_delay)
+    chunk_seconds = settings.tts_chunk_bytes / 8000 / settings.tts_realtime_factor
+    sent = 0
+    while sent < total:
+        size = min(settings.tts_chunk_bytes, total - sent)
+        # Non-silent payload so the audio is distinguishable from comfort noise
+        yield bytes([0x7E]) * size
+        sent += size
+        await asyncio.sleep(chunk_seconds)
+
+
+@app.post("/v1/speak")
+async def speak(request: Request):
+    body = await request.json()
+    total = max(160, len(body.get("text", "")) * settings.tts_bytes_per_char)
+    return StreamingResponse(_speak_bytes(total), media_type="audio/basic")
+
+
+# --- Deepgram live STT -------------------------------------------------------
+
+def _results(transcript: str, is_final: bool, speech_final: bool, start: float, duration: float) -> str:
+    words = [
+        {"word": w.strip(".,?!").lower(), "start": start, "end": start + duration,
+         "confidence": 0.99, "punctuated_word": w}
+        for w in transcript.split()
+    ]
+    return json.dumps({
+        "type": "Results",
+        "channel_index": [0, 1],
+        "duration": duration,
+        "start": start,
+        "is_final": is_final,
+        "speech_final": speech_final,
+        "from_finalize": False,
+        "channel": {"alternatives": [{"transcript": transcript, "confidence": 0.99, "words": words}]},
+        "metadata": {
+            "request_id": "fake",
+            "model_info": {"name": "fake", "version": "0", "arch": "fake"},
+            "model_uuid": "fake",
+        },
+    })
+
+
+def _speech_started(timestamp: float) -> str:
+    return json.dumps({"type": "SpeechStarted", "channel": [0, 1], "timestamp": timestamp})
+
+
+@app.websocket("/v1/listen")
+async def listen(websocket: WebSocket):
+    """
+    Energy-based fake STT: non-silent frames are speech; after a pause the next
+    scripted utterance is emitted as is_final, then speech_final after endpointing.
+    """
+    await websocket.accept()
+    # Like Deepgram, the client's endpointing (ms) sets the silence before speech_final
+    endpointing = settings.stt_endpointing
+    if websocket.query_params.get("endpointing", "").isdigit():
+        endpointing = int(websocket.query_params["endpointing"]) / 1000
+
+    # The script is read when speech starts, so connections opened ahead of the call
+    # (webhook, warm pool) follow a script loaded after they connected
+    spoken = 0
+    received = 0.0           # seconds of audio received
+    speech_start = None
+    last_speech = None
+    pending = None           # utterance waiting for its is_final / speech_final
+    final_sent = False
+    try:
+        while True:
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is None:
+                text = message.get("text") or ""
+                if '"CloseStream"' in text:
+                    break
+                continue
+
+            duration = len(data) / 8000
+            speech = any(b != MULAW_SILENCE for b in data[:: max(1, len(data) // 16)])
+            if speech:
+                if speech_start is None:
+                    speech_start = received
+                    await websocket.send_text(_speech_started(received))
+                last_speech = received + duration
+                pending = None
+                final_sent = False
+            elif speech_start is not None:
+                silence = received - last_speech
+                if pending is None:
+                    pending = settings.utterances[spoken % len(settings.utterances)]
+                    spoken += 1
+                if not final_sent and silence >= settings.stt_final_delay:
+                    await websocket.send_text(_results(pending, True, False, speech_start, last_speech - speech_start))
+                    final_sent = True
+                if silence >= endpointing:
+                    await websocket.send_text(_results("", True, True, last_speech, 0.0))
+                    speech_start = None
+                    pending = None
+                    final_sent = False
+            received += duration
+    except WebSocketDisconnect:
+        pass
+
+
+# --- Twilio REST -------------------------------------------------------------
+
+@app.post("/2010-04-01/Accounts/{account_sid}/Calls/{call_sid}.json")
+async def update_call(account_sid: str, call_sid: str, request: Request):
+    form = {k: v[0] for k, v in parse_qs((await request.body()).decode()).items()}
+    if form.get("Status") == "completed":
+        settings.hangups += 1
+    else:
+        settings.redirects += 1
+    return JSONResponse({"sid": call_sid, "account_sid": account_sid, "status": form.get("Status", "in-progress")})
+
+
+@app.post("/fake/script")
+async def load_script(request: Request):
+    """
+    Replaces the caller utterances and the per-utterance LLM plans
+    ({"text": ...} or {"tool": ..., "arguments": ..., "followup": ...});
+    loadtest/replay.py loads the script of each recorded call before replaying it.
+    """
+    body = await request.json()
+    if body.get("utterances"):
+        settings.utterances = body["utterances"]
+    settings.plans = {_normalize(text): plan for text, plan in (body.get("plans") or {}).items()}
+    return {"utterances": len(settings.utterances), "plans": len(settings.plans)}
+
+
+@app.get("/fake/stats")
+async def fake_stats():
+    return {"hangups": settings.hangups, "redirects": settings.redirects}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-ins for OpenAI, Deepgram and Twilio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--llm-first-token", type=float, default=settings.llm_first_token_delay)
+    parser.add_argument("--llm-token-rate", type=float, default=settings.llm_token_rate)
+    parser.add_argument("--tts-first-byte", type=float, default=settings.tts_first_byte_delay)
+    parser.add_argument("--stt-endpointing", type=float, default=settings.stt_endpointing,
+                        help="Silence (s) before speech_final when the client sets no endpointing")
+    parser.add_argument("--utterances", help="JSON file with the list of scripted caller utterances")
+    args = parser.parse_args()
+
+    settings.llm_first_token_delay = args.llm_first_token
+    settings.llm_token_rate = args.llm_token_rate
+    settings.tts_first_byte_delay = args.tts_first_byte
+    settings.stt_endpointing = args.stt_endpointing
+    if args.utterances:
+        with open(args.utterances, encoding="utf-8") as f:
+            settings.utterances = json.load(f)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Load generator for the /ws/call Media Stream endpoint.
+
+Each simulated call speaks (non-silent mulaw frames) for a while, then sends silence
+at real-time pace until the assistant's audio comes back. Run against the service
+wired to loadtest.fakes:
+
+    python -m loadtest.loadgen --url ws://localhost:5000/ws/call --calls 1,2,4,8,16 --turns 4
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+FRAME_BYTES = 160          # 20 ms of 8 kHz mulaw
+FRAME_SECONDS = 0.02
+SPEECH_FRAME = base64.b64encode(bytes([0x00]) * FRAME_BYTES).decode()
+SILENCE_FRAME = base64.b64encode(bytes([0xFF]) * FRAME_BYTES).decode()
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class TurnResult:
+    def __init__(self, ttfa: Optional[float], turn_latency: Optional[float], audio_seconds: float):
+        self.ttfa = ttfa                    # end of caller speech -> first media frame
+        self.turn_latency = turn_latency    # end of caller speech -> last media frame of the reply
+        self.audio_seconds = audio_seconds
+
+
+class SimulatedCall:
+    """
+    One Twilio-like Media Stream client.
+    """
+    def __init__(self, url: str, turns: int, speech_seconds: float, reply_timeout: float,
+                 reply_gap: float, listen_factor: float, webhook_url: Optional[str] = None):
+        self.url = url
+        self.webhook_url = webhook_url
+        self.turns = turns
+        self.speech_seconds = speech_seconds
+        self.reply_timeout = reply_timeout
+        self.reply_gap = reply_gap
+        self.listen_factor = listen_factor
+        self.stream_sid = f"MZ{uuid.uuid4().hex}"
+        self.call_sid = f"CA{uuid.uuid4().hex}"
+        self.results: List[TurnResult] = []
+        self._media_times: List[float] = []
+        self._media_bytes = 0
+        # Simulated playout clock: marks are echoed once the audio before them has "played"
+        self._play_until = 0.0
+        self._mark_tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(self):
+        if self.webhook_url:
+            # Like Twilio: the voice webhook is answered before the Media Stream connects
+            async with httpx.AsyncClient() as client:
+                await client.post(self.webhook_url, data={"CallSid": self.call_sid, "From": "+15550000000"})
+        async with websockets.connect(self.url, max_size=None) as ws:
+            receiver = asyncio.create_task(self._receive(ws))
+            try:
+                await ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+                await ws.send(json.dumps({
+                    "event": "start",
+                    "streamSid": self.stream_sid,
+                    "start": {"streamSid": self.stream_sid, "callSid": self.call_sid,
+                              "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": 8000, "channels": 1}},
+                }))
+                for _ in range(self.turns):
+                    self.results.append(await self._turn(ws))
+                await ws.send(json.dumps({"event": "stop", "streamSid": self.stream_sid}))
+            finally:
+                receiver.cancel()
+                for task in self._mark_tasks.values():
+                    task.cancel()
+
+    async def _send_frames(self, ws, payload: str, seconds: float):
+        frames = int(seconds / FRAME_SECONDS)
+        start = time.monotonic()
+        for i in range(frames):
+            await ws.send(json.dumps({"event": "media", "streamSid": self.stream_sid, "media": {"payload": payload}}))
+            # Real-time pacing
+            delay = start + (i + 1) * FRAME_SECONDS - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def _turn(self, ws) -> TurnResult:
+        await self._send_frames(ws, SPEECH_FRAME, self.speech_seconds)
+        speech_end = time.monotonic()
+        self._media_times = []
+        self._media_bytes = 0
+
+        # Keep streaming silence until the reply has started and then gone quiet
+        deadline = speech_end + self.reply_timeout
+        while time.monotonic() < deadline:
+            await self._send_frames(ws, SILENCE_FRAME, 0.1)
+            if self._media_times and time.monotonic() - self._media_times[-1] > self.reply_gap:
+                break
+
+        if not self._media_times:
+            return TurnResult(None, None, 0.0)
+        audio_seconds = self._media_bytes / 8000
+        result = TurnResult(self._media_times[0] - speech_end, self._media_times[-1] - speech_end, audio_seconds)
+        # Let the caller "listen" to (a fraction of) the reply before speaking again
+        await self._send_frames(ws, SILENCE_FRAME, audio_seconds * self.listen_factor)
+        return result
+
+    async def _echo_mark(self, ws, name: str, delay: float):
+        await asyncio.sleep(delay)
+        await ws.send(json.dumps({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}}))
+
+    async def _receive(self, ws):
+        async for raw in ws:
+            message = json.loads(raw)
+            event = message.get("event")
+            now = time.monotonic()
+            if event == "media":
+                self._media_times.append(now)
+                size = len(message["media"]["payload"]) * 3 // 4
+                self._media_bytes += size
+                self._play_until = max(self._play_until, now) + size / 8000
+            elif event == "mark":
+                name = message["mark"]["name"]
+                delay = max(0.0, self._play_until - now)
+                self._mark_tasks = {n: t for n, t in self._mark_tasks.items() if not t.done()}
+                self._mark_tasks[name] = asyncio.create_task(self._echo_mark(ws, name, delay))
+            elif event == "clear":
+                # Like Twilio: buffered audio is dropped and pending marks are returned at once
+                self._play_until = now
+                pending, self._mark_tasks = self._mark_tasks, {}
+                for name, task in pending.items():
+                    if not task.done():
+                        task.cancel()
+                        await self._echo_mark(ws, name, 0.0)
+
+
+async def run_level(args, calls: int) -> Dict:
+    webhook_url = None if args.no_webhook else _webhook_url(args.url)
+    simulated = [
+        SimulatedCall(args.url, args.turns, args.speech_seconds, args.reply_timeout, args.reply_gap,
+                      args.listen_factor, webhook_url)
+        for _ in range(calls)
+    ]
+    started = time.monotonic()
+    outcomes = await asyncio.gather(*(call.run() for call in simulated), return_exceptions=True)
+    errors = [o for o in outcomes if isinstance(o, Exception)]
+
+    results = [r for call in simulated for r in call.results]
+    ttfa = [r.ttfa * 1000 for r in results if r.ttfa is not None]
+    latency = [r.turn_latency * 1000 for r in results if r.turn_latency is not None]
+    return {
+        "calls": calls,
+        "turns": len(results),
+        "unanswered_turns": sum(1 for r in results if r.ttfa is None),
+        "errors": len(errors),
+        "elapsed_s": round(time.monotonic() - started, 2),
+        "ttfa_ms": {p: percentile(ttfa, q) for p, q in (("p50", 50), ("p95", 95), ("p99", 99))},
+        "turn_latency_ms": {p: percentile(latency, q) for p, q in (("p50", 50), ("p95", 95), ("p99", 99))},
+    }
+
+
+def _webhook_url(ws_url: str) -> str:
+    base = ws_url.replace("wss://", "https://", 1).replace("ws://", "http://", 1)
+    return base.rsplit("/ws/", 1)[0] + "/incoming"
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "   n/a" if value is None else f"{value:6.0f}"
+
+
+async def main_async(args):
+    levels = [int(n) for n in args.calls.split(",")]
+    reports = []
+    baseline = None
+    max_healthy = 0
+    print(f"{'calls':>5} {'turns':>5} {'err':>4} | {'TTFA p50':>8} {'p95':>6} {'p99':>6} | {'turn p50':>8} {'p95':>6} {'p99':>6}")
+    for calls in levels:
+        report = await run_level(args, calls)
+        reports.append(report)
+        t, l = report["ttfa_ms"], report["turn_latency_ms"]
+        print(f"{calls:5d} {report['turns']:5d} {report['errors'] + report['unanswered_turns']:4d} | "
+              f"{_fmt(t['p50']):>8} {_fmt(t['p95'])} {_fmt(t['p99'])} | "
+              f"{_fmt(l['p50']):>8} {_fmt(l['p95'])} {_fmt(l['p99'])}")
+
+        p95 = t["p95"]
+        if baseline is None and p95 is not None:
+            baseline = p95
+        healthy = (
+            p95 is not None and report["errors"] == 0 and report["unanswered_turns"] == 0
+            and p95 <= baseline * args.degrade_factor
+        )
+        if healthy:
+            max_healthy = calls
+        elif args.stop_on_degrade:
+            break
+
+    print(f"\nMax concurrent calls before p95 TTFA exceeded {args.degrade_factor:.1f}x baseline: {max_healthy}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"levels": reports, "max_concurrent_calls": max_healthy}, f, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent Media Stream load generator")
+    parser.add_argument("--url", default="ws://localhost:5000/ws/call")
+    parser.add_argument("--calls", default="1,2,4,8,16,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--speech-seconds", type=float, default=1.5)
+    parser.add_argument("--reply-timeout", type=float, default=15.0)
+    parser.add_argument("--reply-gap", type=float, default=0.6, help="Quiet time that ends a reply")
+    parser.add_argument("--listen-factor", type=float, default=0.25,
+                        help="Fraction of the reply duration to wait before the next turn")
+    parser.add_argument("--degrade-factor", type=float, default=1.5)
+    parser.add_argument("--stop-on-degrade", action="store_true")
+    parser.add_argument("--no-webhook", action="store_true",
+                        help="Connect the Media Stream without calling /incoming first")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Replays recorded calls (see recorder.py) against the service wired to loadtest.fakes
+and diffs per-turn latency between two builds.
+
+The caller side follows the recorded audio timeline: speech where the recorded STT
+heard an utterance, silence elsewhere. The fake STT is energy based, so speech is
+sent as synthetic frames and the fake transcribes the recorded utterances in order;
+the fake LLM answers each utterance with the recorded reply or tool call. Vendor
+latency comes from the fakes' settings, so two builds replayed with the same fakes
+see the same vendors and differ only in their own code:
+
+    RECORD_DIR=recordings python main.py            # record real or load-test calls
+    python -m loadtest.replay run recordings/*.jsonl.gz --output before.json
+    python -m loadtest.replay run recordings/*.jsonl.gz --output after.json --speed 2
+    python -m loadtest.replay diff before.json after.json
+
+Calls are replayed one after another since the fakes hold a single script.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from loadtest.loadgen import (
+    FRAME_BYTES, FRAME_SECONDS, SILENCE_FRAME, SPEECH_FRAME, SimulatedCall, _webhook_url, percentile,
+)
+from recorder import read_recording
+
+# Silence streamed after the last utterance so its reply can finish
+TAIL_SECONDS = 6.0
+
+
+class Utterance:
+    def __init__(self, start: float, end: float, text: str):
+        self.start = start      # seconds on the call's audio timeline
+        self.end = end
+        self.text = text
+
+
+class Recording:
+    """
+    What a replay needs from a recorded call: the caller's utterances on the audio
+    timeline, the reply plan per utterance and the recorded per-turn offsets.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path).split(".")[0]
+        self.utterances: List[Utterance] = []
+        self.plans: Dict[str, Dict] = {}
+        self.recorded: List[Dict] = []
+        self.audio = bytearray()
+        self.duration = 0.0
+
+        fragments: List[Dict] = []
+        for t, kind, fields in read_recording(path):
+            self.duration = max(self.duration, t)
+            if kind == "audio":
+                self.audio += base64.b64decode(fields["payload"])
+            elif kind == "stt" and fields.get("type") == "Results":
+                if fields.get("is_final") and fields.get("transcript"):
+                    fragments.append(fields)
+                if fields.get("speech_final") and fragments:
+                    self._add_utterance(fragments)
+                    fragments = []
+            elif kind == "turn":
+                self._add_turn(fields)
+        if fragments:
+            self._add_utterance(fragments)
+
+    def _add_utterance(self, fragments: List[Dict]):
+        start = fragments[0].get("start") or 0.0
+        last = fragments[-1]
+        end = (last.get("start") or start) + (last.get("duration") or 0.0)
+        self.utterances.append(Utterance(start, end, " ".join(f["transcript"] for f in fragments)))
+
+    def _add_turn(self, fields: Dict):
+        replies = fields.get("replies") or []
+        user = fields.get("user")
+        if user:
+            tools = fields.get("tools") or []
+            if tools:
+                arguments = tools[0]["arguments"]
+                self.plans[user] = {
+                    "tool": tools[0]["name"],
+                    "arguments": json.loads(arguments) if isinstance(arguments, str) else arguments,
+                    "followup": replies[-1] if replies else None,
+                }
+            elif replies:
+                self.plans[user] = {"text": " ".join(replies)}
+        self.recorded.append({"turn": fields.get("turn"), "user": user, "offsets_ms": fields.get("offsets_ms")})
+
+
+class ReplayedCall(SimulatedCall):
+    """
+    Streams one recording at `speed` times real time and measures, per utterance,
+    the time from the end of the caller's speech to the first and last media frame
+    of the reply.
+    """
+    def __init__(self, url: str, recording: Recording, speed: float, reply_gap: float,
+                 use_audio: bool = False, webhook_url: Optional[str] = None):
+        # One "turn" in SimulatedCall terms: the whole recorded timeline
+        super().__init__(url, 1, 0.0, 0.0, reply_gap, 0.0, webhook_url)
+        self.recording = recording
+        self.speed = speed
+        self.use_audio = use_audio
+        self.turn_results: List[Dict] = []
+
+    async def _turn(self, ws):
+        utterances = self.recording.utterances
+        end = (utterances[-1].end if utterances else self.recording.duration) + TAIL_SECONDS
+        frames = int(end / FRAME_SECONDS)
+        speech_starts = [None] * len(utterances)
+        speech_ends = [None] * len(utterances)
+        current = 0
+        start = time.monotonic()
+        for i in range(frames):
+            at = i * FRAME_SECONDS
+            while current < len(utterances) and at >= utterances[current].end:
+                if speech_ends[current] is None:
+                    speech_ends[current] = time.monotonic()
+                current += 1
+            speaking = current < len(utterances) and at >= utterances[current].start
+            if speaking and speech_starts[current] is None:
+                speech_starts[current] = time.monotonic()
+            if self.use_audio and (i + 1) * FRAME_BYTES <= len(self.recording.audio):
+                # Recorded audio went to STT in coalesced chunks; re-slice it into 20 ms frames
+                payload = base64.b64encode(self.recording.audio[i * FRAME_BYTES:(i + 1) * FRAME_BYTES]).decode()
+            else:
+                payload = SPEECH_FRAME if speaking else SILENCE_FRAME
+            await ws.send(json.dumps({"event": "media", "streamSid": self.stream_sid, "media": {"payload": payload}}))
+            delay = start + (i + 1) * FRAME_SECONDS / self.speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        for index, utterance in enumerate(utterances):
+            speech_end = speech_ends[index]
+            if speech_end is None:
+                break
+            # Audio after the caller starts speaking again is not part of this reply
+            window_end = speech_starts[index + 1] if index + 1 < len(utterances) else None
+            media = [t for t in self._media_times if t > speech_end and (window_end is None or t <= window_end)]
+            # The reply ends at the first quiet gap; later frames belong to a backchannel or a re-prompt
+            last = None
+            for t in media:
+                if last is not None and t - last > self.reply_gap:
+                    break
+                last = t
+            self.turn_results.append({
+                "turn": index + 1,
+                "user": utterance.text,
+                "ttfa_ms": round((media[0] - speech_end) * 1000, 1) if media else None,
+                "turn_ms": round((last - speech_end) * 1000, 1) if media else None,
+            })
+
+
+def _summary(turns: List[Dict], key: str) -> Dict:
+    values = [t[key] for t in turns if t.get(key) is not None]
+    return {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+
+
+async def replay(args) -> Dict:
+    webhook_url = None if args.no_webhook else _webhook_url(args.url)
+    calls = []
+    async with httpx.AsyncClient(base_url=args.fakes) as fakes:
+        for path in args.recordings:
+            recording = Recording(path)
+            if not recording.utterances:
+                print(f"{recording.name}: no utterances recorded, skipped")
+                continue
+            await fakes.post("/fake/script", json={
+                "utterances": [u.text for u in recording.utterances],
+                "plans": recording.plans,
+            })
+            call = ReplayedCall(args.url, recording, args.speed, args.reply_gap,
+                                use_audio=args.audio == "recorded", webhook_url=webhook_url)
+            started = time.monotonic()
+            error = None
+            try:
+                await call.run()
+            except Exception as e:
+                error = str(e)
+            print(f"{recording.name}: {len(call.turn_results)} turns in {time.monotonic() - started:.1f}s"
+                  + (f" ({error})" if error else ""))
+            for turn in call.turn_results:
+                print(f"  {turn['turn']:>3} {_fmt(turn['ttfa_ms'])} {_fmt(turn['turn_ms'])}  {turn['user'][:60]}")
+            calls.append({"recording": recording.name, "error": error, "turns": call.turn_results,
+                          "recorded": recording.recorded})
+    turns = [t for c in calls for t in c["turns"]]
+    return {
+        "speed": args.speed,
+        "calls": calls,
+        "ttfa_ms": _summary(turns, "ttfa_ms"),
+        "turn_ms": _summary(turns, "turn_ms"),
+    }
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "   n/a" if value is None else f"{value:6.0f}"
+
+
+def _delta(before: Optional[float], after: Optional[float]) -> str:
+    if before is None or after is None:
+        return "   n/a"
+    return f"{after - before:+6.0f}"
+
+
+def diff(before: Dict, after: Dict, threshold: float) -> bool:
+    """
+    Prints per-turn and percentile deltas; returns True when the p95 TTFA or turn
+    latency regressed by more than `threshold` ms.
+    """
+    if before.get("speed") != after.get("speed"):
+        print(f"warning: replayed at different speeds ({before.get('speed')} vs {after.get('speed')})")
+    previous = {(c["recording"], t["turn"]): t for c in before["calls"] for t in c["turns"]}
+    print(f"{'call':<36} {'turn':>4} | {'TTFA':>6} {'after':>6} {'delta':>6} | {'turn':>6} {'after':>6} {'delta':>6}")
+    for call in after["calls"]:
+        for turn in call["turns"]:
+            old = previous.get((call["recording"], turn["turn"]))
+            if old is None:
+                continue
+            print(f"{call['recording'][:36]:<36} {turn['turn']:>4} | "
+                  f"{_fmt(old['ttfa_ms'])} {_fmt(turn['ttfa_ms'])} {_delta(old['ttfa_ms'], turn['ttfa_ms'])} | "
+                  f"{_fmt(old['turn_ms'])} {_fmt(turn['turn_ms'])} {_delta(old['turn_ms'], turn['turn_ms'])}")
+
+    regressed = False
+    for key, label in (("ttfa_ms", "TTFA"), ("turn_ms", "turn latency")):
+        for p in ("p50", "p95"):
+            old, new = before[key][p], after[key][p]
+            print(f"{label} {p}: {_fmt(old).strip()} -> {_fmt(new).strip()} ms ({_delta(old, new).strip()})")
+            if p == "p95" and old is not None and new is not None and new - old > threshold:
+                regressed = True
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded calls and diff latency between builds")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Replay recordings against the running service")
+    run.add_argument("recordings", nargs="+", help="Recorded calls (*.jsonl.gz)")
+    run.add_argument("--url", default="ws://localhost:5000/ws/call")
+    run.add_argument("--fakes", default="http://localhost:9000", help="Base URL of loadtest.fakes")
+    run.add_argument("--speed", type=float, default=1.0, help="Caller audio speed (2 = twice real time)")
+    run.add_argument("--audio", choices=("synthetic", "recorded"), default="synthetic",
+                     help="Send synthetic speech (fake STT) or the recorded audio (real STT)")
+    run.add_argument("--reply-gap", type=float, default=0.6, help="Quiet time that ends a reply")
+    run.add_argument("--no-webhook", action="store_true",
+                     help="Connect the Media Stream without calling /incoming first")
+    run.add_argument("--output", help="Write the JSON report to this file")
+
+    compare = commands.add_parser("diff", help="Compare two replay reports")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    compare.add_argument("--threshold-ms", type=float, default=50.0,
+                         help="Exit with status 1 when a p95 regresses by more than this")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = asyncio.run(replay(args))
+        print(f"TTFA p50 {_fmt(report['ttfa_ms']['p50'])} p95 {_fmt(report['ttfa_ms']['p95'])} | "
+              f"turn p50 {_fmt(report['turn_ms']['p50'])} p95 {_fmt(report['turn_ms']['p95'])}")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=4)
+    else:
+        with open(args.before, encoding="utf-8") as f:
+            before = json.load(f)
+        with open(args.after, encoding="utf-8") as f:
+            after = json.load(f)
+        sys.exit(1 if diff(before, after, args.threshold_ms) else 0)
+
+
+if __name__ == "__main__":
+    main()
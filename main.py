@@ -1,24 +1,257 @@
 import uvicorn
 from fastapi import FastAPI, WebSocket, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.websockets import WebSocketDisconnect
-import json
+import copy
 import asyncio
 import base64
+import time
 import traceback
-from deepgram import AsyncDeepgramClient
+from contextlib import asynccontextmanager
+from typing import Optional
+from deepgram import AsyncDeepgramClient, DeepgramClientEnvironment
 from config import Config
-from services import LLMService, TTSService
-from twilio.rest import Client
+from callstate import create_call_state_store
+from services import CallControlService, LLMService, TTSService, TurnFlags
+from intents import EMERGENCY, IntentMatch, asks_to_close, classify_intent
+from phrases import intent_phrases
+from pipeline import TTSPipeline
+from segmenter import SentenceSegmenter
+from playback import PlaybackTracker
+from ingest import MediaIngest, dumps, loads
+from stt import STTConnectionManager
+from recorder import CallRecorder
+from turns import TurnDecision, TurnDetector
+from urllib.parse import parse_qs
+from metrics import CallTrace, TurnTrace, metrics
+from speculation import Speculation, SpeculationStats, is_plausible_utterance, speculation_stats
 
-app = FastAPI()
-llm_service = LLMService()
-tts_service = TTSService()
-twilio_client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
+dg_options = {
+    "model": "nova-2",
+    "language": "en-US",
+    "smart_format": "true",
+    "encoding": "mulaw",
+    "sample_rate": "8000",
+    "interim_results": "true",
+    "utterance_end_ms": "1000",
+    "vad_events": "true",
+    # Short on purpose: the turn detector (turns.py) adds the rest of the silence when needed
+    "endpointing": str(Config.STT_ENDPOINTING_MS)
+}
 
-# In-memory storage for active call contexts
-# Key: streamSid, Value: list of message dictionaries
+# Vendor clients and stores are created by `lifespan`, so importing this module opens
+# no connections or databases
+llm_service: Optional[LLMService] = None
+tts_service: Optional[TTSService] = None
+call_control: Optional[CallControlService] = None
+stt_manager: Optional[STTConnectionManager] = None
+call_state = None
+
+# Live sessions of the media streams handled by this worker
+# Key: streamSid, Value: CallSession (history, flags, booking service handle)
 call_contexts = {}
+# Extra time after a hangup's expected moment before another worker takes it over
+HANGUP_TAKEOVER_SECONDS = 10.0
+
+metrics.callback("voice_active_calls", "Calls with an active media stream", lambda: len(call_contexts))
+metrics.callback("voice_speculation_started_total", "Speculative turns started", lambda: speculation_stats.started, "counter")
+metrics.callback("voice_speculation_committed_total", "Speculative turns committed", lambda: speculation_stats.committed, "counter")
+metrics.callback("voice_speculation_wasted_total", "Speculative turns discarded", lambda: speculation_stats.wasted, "counter")
+
+
+def create_stt_manager() -> STTConnectionManager:
+    # Start from the SDK's production environment and override only the endpoints we use
+    environment = copy.copy(DeepgramClientEnvironment.PRODUCTION)
+    environment.base = Config.DEEPGRAM_API_URL
+    environment.production = Config.DEEPGRAM_WS_URL
+    # One Deepgram client for the process; live sessions are opened ahead of time
+    deepgram = AsyncDeepgramClient(api_key=Config.DEEPGRAM_API_KEY, environment=environment)
+    return STTConnectionManager(deepgram, dg_options)
+
+
+async def warm_up():
+    """
+    Opens vendor connections and loads phrase audio; GET /ready reports ready afterwards.
+    Calls are served during warm-up, just without warm connections.
+    """
+    started = time.perf_counter()
+    try:
+        opened = await asyncio.gather(
+            llm_service.warm_up(),
+            tts_service.warm_up(),
+            call_control.warm_up(),
+        )
+        print(f"[Startup] Opened {sum(opened)} vendor connections")
+        await tts_service.prewarm(Config.TTS_PREWARM_PHRASES)
+        if Config.INTENT_FAST_PATH:
+            # Emergency and farewell answers must never wait on the TTS vendor
+            await tts_service.prewarm(intent_phrases(), pin=True)
+    except Exception as e:
+        print(f"[Startup] Warm-up failed: {e}")
+    finally:
+        app.state.ready = True
+        print(f"[Startup] Ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+async def drain_calls(timeout: float = Config.SHUTDOWN_DRAIN_SECONDS):
+    """
+    Reports not ready, then waits up to `timeout` for the active calls to end. Calls
+    still running are redirected to HANDOFF_STREAM_URL when it is set, so another
+    worker picks them up with their saved state; otherwise they are cut.
+    """
+    if app.state.draining:
+        return
+    app.state.draining = True
+    if not call_contexts:
+        return
+    print(f"[Shutdown] Draining {len(call_contexts)} active calls (up to {timeout:.0f}s)")
+    deadline = time.monotonic() + timeout
+    while call_contexts and time.monotonic() < deadline:
+        await asyncio.sleep(0.2)
+    if call_contexts and Config.HANDOFF_STREAM_URL:
+        sessions = [s for s in call_contexts.values() if s.call_sid]
+        await asyncio.gather(*(save_session(s) for s in sessions))
+        twiml = f'<Response><Connect><Stream url="{Config.HANDOFF_STREAM_URL}" /></Connect></Response>'
+        moved = await asyncio.gather(*(call_control.redirect(s.call_sid, twiml=twiml) for s in sessions))
+        print(f"[Shutdown] Handed off {sum(moved)} of {len(sessions)} calls")
+        # Twilio stops the old streams once the new TwiML runs
+        deadline = time.monotonic() + 5.0
+        while call_contexts and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+    if call_contexts:
+        print(f"[Shutdown] {len(call_contexts)} calls still active at the drain deadline")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global llm_service, tts_service, call_control, stt_manager, call_state
+    app.state.ready = False
+    app.state.draining = False
+    llm_service = LLMService()
+    tts_service = TTSService()
+    cache = tts_service.cache
+    if cache:
+        # Registered once the cache exists; the callbacks keep it, so scrapes after shutdown still work
+        metrics.callback("tts_cache_hits_total", "Phrase cache hits (memory and disk)",
+                         lambda: cache.memory_hits + cache.disk_hits, "counter")
+        metrics.callback("tts_cache_misses_total", "Phrase cache misses", lambda: cache.misses, "counter")
+    call_control = CallControlService()
+    # Shared call state (history, flags, pending hangups), see callstate.py
+    call_state = create_call_state_store()
+    stt_manager = create_stt_manager()
+    stt_manager.start()
+    sweeper = asyncio.create_task(sweep_call_state())
+    warm_up_task = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        # Already done by DrainingServer before uvicorn closed the WebSockets
+        await drain_calls()
+        warm_up_task.cancel()
+        sweeper.cancel()
+        await stt_manager.close()
+        await call_control.close()
+        await tts_service.close()
+        await llm_service.close()
+        await call_state.close()
+        print("[Shutdown] Connection pools closed")
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn closes open WebSockets (code 1012) before the lifespan shutdown runs, so
+    active calls are drained here, after the listening sockets stop accepting.
+    """
+    async def shutdown(self, sockets=None):
+        for server in self.servers:
+            server.close()
+        await drain_calls()
+        await super().shutdown(sockets)
+
+
+async def save_session(session):
+    try:
+        await call_state.save(session.state_key, session.to_state())
+    except Exception as e:
+        print(f"[CallState] Save failed: {e}")
+
+
+async def sweep_call_state():
+    """
+    Purges expired call state and performs hangups whose owning worker went away.
+    """
+    while True:
+        await asyncio.sleep(Config.CALL_STATE_SWEEP_SECONDS)
+        try:
+            now = time.time()
+            purged = await call_state.purge_expired(now)
+            if purged:
+                print(f"[CallState] Purged {purged} expired calls")
+            for sid in await call_state.claim_due_hangups(now):
+                print(f"[CallState] Taking over overdue hangup of {sid}")
+                await call_control.hangup(sid)
+        except Exception as e:
+            print(f"[CallState] Sweep failed: {e}")
+
+
+@app.get("/ready")
+async def readiness():
+    """
+    Readiness probe: 503 until startup warm-up is done and again while draining.
+    """
+    ready = app.state.ready and not app.state.draining
+    return JSONResponse(
+        {"ready": ready, "draining": app.state.draining, "active_calls": len(call_contexts)},
+        status_code=200 if ready else 503
+    )
+
+
+@app.get("/tts/cache")
+async def tts_cache_stats():
+    """
+    Exposes phrase cache hit/miss counters.
+    """
+    if tts_service is None or not tts_service.cache:
+        return {"enabled": False}
+    return {"enabled": True, **tts_service.cache.stats()}
+
+
+@app.get("/speculation")
+async def speculation_report():
+    """
+    Exposes commit/waste rates of speculative turns.
+    """
+    return {"enabled": Config.SPECULATIVE_ENABLED, **speculation_stats.as_dict()}
+
+
+@app.get("/stt")
+async def stt_report():
+    """
+    Exposes prepared and pooled STT sessions.
+    """
+    return stt_manager.stats()
+
+
+async def prepare_stt(request: Request):
+    """
+    Starts opening the caller's STT session while Twilio connects the media stream.
+    """
+    form = parse_qs((await request.body()).decode(errors="replace"))
+    call_sid = form.get("CallSid", [None])[0]
+    if call_sid:
+        stt_manager.prepare(call_sid)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus scrape endpoint: per-stage turn latency histograms and service counters.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 @app.get("/")
 async def get():
@@ -30,6 +263,7 @@ async def post_root(request: Request):
     """
     Handles POST requests to the root endpoint and returns valid TwiML for Twilio.
     """
+    await prepare_stt(request)
     response = f"""
     <Response>
         <Say>Welcome to HealthCenter One administrative services. How may I assist you with your appointment today?</Say>
@@ -45,6 +279,7 @@ async def incoming_call(request: Request):
     """
     Twilio Webhook URL. Returns TwiML to connect the call to the Media Stream.
     """
+    await prepare_stt(request)
     response = f"""
     <Response>
         <Say>Welcome to HealthCenter One administrative services. How may I assist you with your appointment today?</Say>
@@ -63,158 +298,362 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     print("WebSocket connected")
     
-    deepgram = AsyncDeepgramClient(api_key=Config.DEEPGRAM_API_KEY)
-    
-    dg_options = {
-        "model": "nova-2",
-        "language": "en-US",
-        "smart_format": "true",
-        "encoding": "mulaw",
-        "sample_rate": "8000",
-        "interim_results": "true",
-        "utterance_end_ms": "1000",
-        "vad_events": "true",
-        "endpointing": "800"
-    }
-
     stream_sid = None
     call_sid = None
     hangup_task = None # To manage the 5-second grace period
     ai_task = None     # To manage the AI response generation
+    speculation = None # Turn started ahead of speech_final (see speculation.py)
+    call_speculation_stats = SpeculationStats(parent=speculation_stats)
+    call_trace = CallTrace()
+    recorder = None    # Optional call recording for offline replay (RECORD_DIR)
+    turn_detector = TurnDetector()  # Adaptive end of turn on top of Deepgram's speech_final
+
+    async def send_json(payload: dict):
+        await websocket.send_text(dumps(payload))
+
+    # Twilio marks tell us what the caller actually heard; `clear` stops playback on barge-in
+    playback_tracker = PlaybackTracker(send_json)
     
-    async def process_ai_response(sentence: str, current_stream_sid: str):
-        """Processes the LLM and TTS in a non-blocking background task."""
+    async def process_ai_response(sentence: str, current_stream_sid: str, trace: TurnTrace, release: asyncio.Event = None,
+                                  intent: Optional[IntentMatch] = None):
+        """
+        Processes the LLM and TTS in a non-blocking background task.
+        When `release` is given the turn is speculative: tokens and audio are buffered
+        and nothing is played, executed or committed until the event is set.
+        When `intent` is given (local fast path) the templated answer replaces the LLM.
+        """
         nonlocal hangup_task, call_sid
         total_audio_bytes = 0
+        session = call_contexts.get(current_stream_sid)
+        if session is None:
+            session = llm_service.create_session(current_stream_sid, call_sid)
+            call_contexts[current_stream_sid] = session
+
+        # Messages produced by this turn; committed to the history once the turn ends
+        turn = [{"role": "user", "content": sentence}]
+        flags = TurnFlags()
+        playback = playback_tracker.start_turn()
         try:
-            # Initialize context if missing
-            if current_stream_sid not in call_contexts:
-                call_contexts[current_stream_sid] = [
-                    {"role": "system", "content": """You are a professional medical administrative assistant for HealthCenter One. Your objective is to manage patient inquiries and finalize bookings.
-
-STRICT DATA EXTRACTION RULES:
-1. FULL NAME: You must extract the patient's FULL NAME (First and Last). If they say only "Vishal", ASK for their last name. DO NOT use words like "Yes", "Hello", or "Okay" as a name.
-2. DETAILS: You need a Date, a Time, and a Reason for the visit.
-3. CONFIRMATION: Only call the 'book_appointment' tool AFTER you have all 3 items and the FULL NAME. 
-4. CLOSING: After confirming a booking, ALWAYS ask if there is anything else you can help with (e.g., "Is there anything else I can assist you with today?").
-5. TERMINATION: If the user says "No", "Goodbye", "No thanks", or indicates they are finished, use the 'terminate_call' tool and give a final farewell.
-6. CONCISENESS: Maintain a formal, helpful tone but keep responses very concise for voice interaction."""}
-                ]
-            
-            call_contexts[current_stream_sid].append({"role": "user", "content": sentence})
-            
             full_ai_response = ""
-            sentence_buffer = ""
-            
-            async for chunk in llm_service.get_response(call_contexts[current_stream_sid]):
-                full_ai_response += chunk
-                sentence_buffer += chunk
-                
-                # Check for sentence boundaries for lower latency TTS
-                if any(punct in sentence_buffer for punct in [".", "!", "?", "\n"]):
-                    import re
-                    sentences = re.split(r'(?<=[.!?\n])\s*', sentence_buffer)
-                    for i in range(len(sentences) - 1):
-                        segment = sentences[i].strip()
-                        if segment:
-                            print(f"AI (Streaming Segment): {segment}")
-                            audio_chunk = await tts_service.generate_audio(segment)
-                            if audio_chunk:
-                                total_audio_bytes += len(audio_chunk)
-                                base64_audio = base64.b64encode(audio_chunk).decode('utf-8')
-                                audio_delta = {
-                                    "event": "media",
-                                    "streamSid": current_stream_sid,
-                                    "media": {"payload": base64_audio}
-                                }
-                                await websocket.send_text(json.dumps(audio_delta))
-                    sentence_buffer = sentences[-1]
-
-            # Final flush
-            if sentence_buffer.strip():
-                segment = sentence_buffer.strip()
-                print(f"AI (Streaming Final): {segment}")
-                audio_chunk = await tts_service.generate_audio(segment)
-                if audio_chunk:
-                    total_audio_bytes += len(audio_chunk)
-                    base64_audio = base64.b64encode(audio_chunk).decode('utf-8')
-                    audio_delta = {
-                        "event": "media",
-                        "streamSid": current_stream_sid,
-                        "media": {"payload": base64_audio}
-                    }
-                    await websocket.send_text(json.dumps(audio_delta))
+            segmenter = None
+
+            async def send_audio(audio_chunk: bytes):
+                base64_audio = base64.b64encode(audio_chunk).decode('utf-8')
+                audio_delta = {
+                    "event": "media",
+                    "streamSid": current_stream_sid,
+                    "media": {"payload": base64_audio}
+                }
+                await send_json(audio_delta)
+
+            # Segments go to TTS as soon as they are cut; audio is played back in order
+            pipeline = TTSPipeline(tts_service, send_audio, gate=release, trace=trace, playback=playback)
+            pipeline.start()
+            try:
+                if intent:
+                    responses = llm_service.get_intent_response(session, intent, trace=trace, flags=flags)
+                else:
+                    responses = llm_service.get_response(session, turn, gate=release, trace=trace, flags=flags)
+                async for chunk in responses:
+                    trace.mark("llm_first_token")
+                    full_ai_response += chunk
+                    if recorder:
+                        recorder.record("llm_token", text=chunk, turn=trace.turn)
+                    if segmenter is None:
+                        # The caller's language is known once the response starts
+                        segmenter = SentenceSegmenter(flags.language or session.language)
+
+                    # Only the new characters are scanned for segment boundaries
+                    for segment in segmenter.push(chunk):
+                        print(f"AI (Streaming Segment): {segment}")
+                        trace.mark("first_segment_cut")
+                        pipeline.submit(segment)
+
+                # Final flush
+                for segment in segmenter.flush() if segmenter else []:
+                    print(f"AI (Streaming Final): {segment}")
+                    trace.mark("first_segment_cut")
+                    pipeline.submit(segment)
+
+                await pipeline.finish()
+            finally:
+                # No-op on success; on barge-in this aborts pending synthesis and playback
+                await pipeline.cancel()
+            total_audio_bytes = pipeline.total_audio_bytes
 
             print(f"AI (Full): {full_ai_response}")
-            call_contexts[current_stream_sid].append({"role": "assistant", "content": full_ai_response})
+            # Audio may still be buffered at Twilio; a later barge-in truncates this message
+            playback.message = {"role": "assistant", "content": full_ai_response}
+            turn.append(playback.message)
+            session.history.add_turn(turn)
+            flags.commit(session)
+            llm_service.compact_history(session)
             
             # Schedule Auto-Hangup if booking or termination was detected
-            if llm_service.booking_flag or llm_service.terminate_flag:
-                async def delayed_hangup(sid, audio_bytes, is_termination):
-                    # Estimate audio duration: bytes / 8000 Hz
-                    audio_duration = audio_bytes / 8000
+            if flags.booking or flags.terminate:
+                async def delayed_hangup(sid, last_mark, audio_bytes, is_termination):
                     # Use a shorter grace period for intentional termination
                     grace_period = 1.0 if is_termination else 5.0
-                    wait_time = audio_duration + grace_period
-                    print(f"Waiting {wait_time:.1f}s (Audio: {audio_duration:.1f}s + Grace: {grace_period}s) before hangup.")
-                    await asyncio.sleep(wait_time)
-                    try:
-                        twilio_client.calls(sid).update(status='completed')
+                    max_playback = audio_bytes / 8000 + 2.0
+                    # Recorded in the shared store so another worker hangs up if this one dies
+                    await call_state.schedule_hangup(
+                        sid, time.time() + max_playback + grace_period + HANGUP_TAKEOVER_SECONDS
+                    )
+                    # Wait for Twilio to confirm the final segment was played; the
+                    # bytes / 8000 Hz estimate only bounds the wait if marks never come back
+                    started = asyncio.get_running_loop().time()
+                    played = await playback_tracker.wait_played(last_mark, timeout=max_playback)
+                    waited = asyncio.get_running_loop().time() - started
+                    source = "final mark" if played else "estimate"
+                    print(f"Playback finished after {waited:.1f}s ({source}); hanging up in {grace_period}s.")
+                    await asyncio.sleep(grace_period)
+                    if not await call_state.claim_hangup(sid):
+                        print(f"[Twilio] Hangup of {sid} was cancelled or taken over.")
+                        return
+                    if await call_control.hangup(sid):
                         print(f"[Twilio] Call {sid} terminated after grace period.")
-                    except Exception as e:
-                        print(f"[Twilio] Error hanging up call: {e}")
+                    else:
+                        print(f"[Twilio] Error hanging up call {sid}.")
 
                 if call_sid:
                     if hangup_task and not hangup_task.done():
                         hangup_task.cancel()
-                    hangup_task = asyncio.create_task(delayed_hangup(call_sid, total_audio_bytes, llm_service.terminate_flag))
-                    type_str = "Termination" if llm_service.terminate_flag else "Booking"
+                    hangup_task = asyncio.create_task(
+                        delayed_hangup(call_sid, playback.last_mark, total_audio_bytes, flags.terminate)
+                    )
+                    type_str = "Termination" if flags.terminate else "Booking"
                     print(f"{type_str} detected. Call will hang up after assistant finishes.")
         except asyncio.CancelledError:
+            if release is not None and not release.is_set():
+                # Speculation discarded before commit: nothing was heard or executed
+                return
+            trace.mark("barge_in_cancel")
             print(f"[AI Task] Response generation cancelled for barge-in.")
+            # Keep what the caller said (and any completed tool calls) in the history,
+            # plus the part of the answer that was actually played
+            heard = playback.heard_text()
+            if heard:
+                turn.append({"role": "assistant", "content": heard})
+            session.history.add_turn(turn)
+            flags.commit(session)
         except Exception as e:
             print(f"[AI Task] Error: {e}")
             traceback.print_exc()
+            if release is None or release.is_set():
+                session.history.add_turn(turn)
+                flags.commit(session)
+        finally:
+            if release is None or release.is_set():
+                trace.finish()
+                if recorder:
+                    recorder.turn(turn, trace)
+                await save_session(session)
+
+    async def handle_start(message: dict):
+        nonlocal stream_sid, call_sid, recorder
+        stream_sid = message.get('streamSid')
+        call_sid = message.get('start', {}).get('callSid')
+        print(f"Media Stream started: {stream_sid}, CallSid: {call_sid}")
+        if Config.RECORD_DIR:
+            recorder = CallRecorder(Config.RECORD_DIR, call_sid or stream_sid)
+            recorder.start()
+            recorder.record("start", call_sid=call_sid, stream_sid=stream_sid, stt_options=dg_options)
+        call_trace.stream_sid = stream_sid
+        playback_tracker.stream_sid = stream_sid
+        session = llm_service.create_session(stream_sid, call_sid)
+        # Resume the call's state if another stream/worker already served it
+        state = await call_state.load(session.state_key)
+        if state:
+            session.restore(state)
+            print(f"[CallState] Resumed {session.state_key} ({len(session.history.turns)} turns)")
+        call_contexts[stream_sid] = session
 
     try:
-        async with deepgram.listen.v1.connect(**dg_options) as dg_connection:
+        # Twilio sends "connected" then "start"; the CallSid selects the STT session
+        # the webhook already started opening
+        while stream_sid is None:
+            message = loads(await websocket.receive_text())
+            if message.get("event") == "connected":
+                print("Twilio Media Stream connected")
+            elif message.get("event") == "start":
+                await handle_start(message)
+
+        async with stt_manager.session(call_sid) as dg_connection:
             print("[Deepgram] Async connection established")
 
+            def discard_speculation():
+                nonlocal speculation
+                if speculation:
+                    speculation.discard()
+                    speculation = None
+
+            def start_speculation(text: str):
+                """
+                Starts the LLM turn early when the finalized fragments look complete.
+                """
+                nonlocal speculation
+                if not stream_sid or not is_plausible_utterance(text):
+                    return
+                if speculation and speculation.matches(text):
+                    return
+                discard_speculation()
+                release = asyncio.Event()
+                trace = TurnTrace()
+                task = asyncio.create_task(process_ai_response(text, stream_sid, trace, release=release))
+                speculation = Speculation(text, task, release, call_speculation_stats, trace)
+
+            def detect_intent(text: str, only: Optional[str] = None) -> Optional[IntentMatch]:
+                """
+                Local emergency/farewell classification; None leaves the turn to the LLM.
+                `only` restricts it to one intent (checked on every final fragment).
+                """
+                if not Config.INTENT_FAST_PATH:
+                    return None
+                session = call_contexts.get(stream_sid)
+                language = session.language if session else None
+                awaiting_close = bool(session) and asks_to_close(session.history.last_reply())
+                match = classify_intent(text, language, awaiting_close)
+                if match is None or (only and match.intent != only):
+                    return None
+                labels = f'intent="{match.intent}"'
+                if match.confidence < Config.INTENT_CONFIDENCE_THRESHOLD:
+                    if only is None:
+                        metrics.inc("voice_intent_fallback_total", "Intent matches left to the LLM (low confidence)", labels)
+                    return None
+                metrics.inc("voice_intent_fast_path_total", "Turns answered by the local intent fast path", labels)
+                print(f"[Intent] {match.intent} ({match.language}, {match.confidence:.2f}): {match.matched!r}")
+                return match
+
+            def start_intent_turn(sentence: str, match: IntentMatch):
+                nonlocal ai_task
+                if ai_task and not ai_task.done():
+                    ai_task.cancel()
+                discard_speculation()
+                trace = TurnTrace()
+                trace.mark("speech_final")
+                call_trace.add(trace)
+                ai_task = asyncio.create_task(process_ai_response(sentence, stream_sid, trace, intent=match))
+
             async def receive_transcriptions():
-                nonlocal stream_sid, call_sid, hangup_task, ai_task
                 full_transcript = []
+                speech_end = None      # Audio time at which the last finalized words ended
+                pending_commit = None  # Turn waiting for the extra silence the detector asked for
+
+                def commit_turn(sentence: str, decision: TurnDecision):
+                    nonlocal ai_task, speculation
+                    turn_detector.committed(decision, speech_end)
+                    print(f"User (Full): {sentence}")
+
+                    match = detect_intent(sentence) if stream_sid else None
+                    if match:
+                        # Clear farewell: start the closing and hangup without the LLM
+                        start_intent_turn(sentence, match)
+                    elif stream_sid:
+                        # Use the dedicated background task for AI processing
+                        if ai_task and not ai_task.done():
+                            ai_task.cancel()
+                        if speculation and speculation.matches(sentence):
+                            print(f"[Speculation] Committed: {sentence}")
+                            speculation.trace.mark("speech_final")
+                            call_trace.add(speculation.trace)
+                            ai_task = speculation.commit()
+                        else:
+                            discard_speculation()
+                            trace = TurnTrace()
+                            trace.mark("speech_final")
+                            call_trace.add(trace)
+                            ai_task = asyncio.create_task(process_ai_response(sentence, stream_sid, trace))
+                        speculation = None
+
+                async def commit_after(sentence: str, decision: TurnDecision):
+                    nonlocal full_transcript, pending_commit
+                    await asyncio.sleep(decision.wait)
+                    full_transcript = []
+                    pending_commit = None
+                    commit_turn(sentence, decision)
+
+                def speech_resumed(speech_start: Optional[float]):
+                    nonlocal pending_commit
+                    if pending_commit and not pending_commit.done():
+                        # The wait covered the pause: the next speech_final commits both parts
+                        pending_commit.cancel()
+                        pending_commit = None
+                        turn_detector.speech_resumed(speech_start, pending=True, speech_end=speech_end)
+                        print("[Turns] Caller carried on; waiting for the rest of the turn")
+                    else:
+                        turn_detector.speech_resumed(speech_start, pending=False)
+
                 try:
                     async for result in dg_connection:
                         msg_type = getattr(result, 'type', None)
+                        if recorder:
+                            recorder.stt(result)
                         
                         if msg_type == "Results":
                             if hasattr(result, 'channel') and result.channel.alternatives:
                                 is_final = getattr(result, 'is_final', False)
                                 is_speech_final = getattr(result, 'speech_final', False)
                                 
-                                transcript = result.channel.alternatives[0].transcript
+                                alternative = result.channel.alternatives[0]
+                                transcript = alternative.transcript
                                 if transcript:
+                                    if pending_commit:
+                                        speech_resumed(getattr(result, 'start', None))
                                     if is_final:
                                         full_transcript.append(transcript)
+                                        words = getattr(alternative, 'words', None)
+                                        if words:
+                                            speech_end = words[-1].end
+                                        elif getattr(result, 'start', None) is not None:
+                                            speech_end = result.start + (getattr(result, 'duration', None) or 0.0)
+                                        text = " ".join(full_transcript).strip()
+                                        match = detect_intent(text, only=EMERGENCY) if stream_sid else None
+                                        if match:
+                                            # Answer right away instead of waiting for the end of the utterance
+                                            print(f"User (Emergency): {text}")
+                                            full_transcript = []
+                                            start_intent_turn(text, match)
+                                            continue
+                                        if not is_speech_final and Config.SPECULATIVE_ENABLED:
+                                            start_speculation(text)
                                 
                                 if is_speech_final and full_transcript:
                                     sentence = " ".join(full_transcript).strip()
-                                    full_transcript = []
-                                    print(f"User (Full): {sentence}")
-                                    
-                                    if stream_sid:
-                                        # Use the dedicated background task for AI processing
-                                        if ai_task and not ai_task.done():
-                                            ai_task.cancel()
-                                        ai_task = asyncio.create_task(process_ai_response(sentence, stream_sid))
+                                    if pending_commit:
+                                        pending_commit.cancel()
+                                    session = call_contexts.get(stream_sid)
+                                    decision = turn_detector.decide(sentence, session.history.last_reply() if session else None)
+                                    if decision.wait > 0 and stream_sid:
+                                        # Not sure the caller is done: wait a little longer, with the
+                                        # LLM already running speculatively in the meantime
+                                        print(f"[Turns] Waiting {decision.wait * 1000:.0f} ms more ({decision.reason}): {sentence}")
+                                        if Config.SPECULATIVE_ENABLED:
+                                            start_speculation(sentence)
+                                        pending_commit = asyncio.create_task(commit_after(sentence, decision))
+                                    else:
+                                        full_transcript = []
+                                        pending_commit = None
+                                        commit_turn(sentence, decision)
 
                         elif msg_type == "SpeechStarted":
+                            speech_resumed(getattr(result, 'timestamp', None))
                             print("[Deepgram] User started speaking - triggering barge-in")
                             # Immediate barge-in: cancel everything
                             if ai_task and not ai_task.done():
                                 ai_task.cancel()
+                            # Flush audio already buffered at Twilio and keep only what was heard
+                            for interrupted in await playback_tracker.clear():
+                                session = call_contexts.get(stream_sid)
+                                if session and interrupted.message is not None:
+                                    session.history.truncate_message(interrupted.message, interrupted.heard_text())
+                                    print(f"[Playback] Cleared; caller heard: {interrupted.heard_text()!r}")
+                                    await save_session(session)
+                            # The caller kept talking, so the pending speculation is stale
+                            discard_speculation()
                             if hangup_task and not hangup_task.done():
                                 hangup_task.cancel()
+                                if call_sid:
+                                    await call_state.claim_hangup(call_sid)
                                 print("Auto-hangup cancelled due to barge-in.")
                                 
                         elif msg_type == "Metadata":
@@ -223,47 +662,78 @@ STRICT DATA EXTRACTION RULES:
                 except Exception as e:
                     print(f"[Deepgram] Receiver error: {e}")
                     # traceback.print_exc()
+                finally:
+                    if pending_commit:
+                        pending_commit.cancel()
 
             receiver_task = asyncio.create_task(receive_transcriptions())
+            async def send_media(chunk: bytes):
+                if recorder:
+                    recorder.audio(chunk)
+                await dg_connection.send_media(chunk)
+
+            # Coalesces 20 ms media frames into larger STT sends, with backpressure
+            ingest = MediaIngest(send_media)
+            ingest.start()
 
+            stopped = False
             try:
                 while True:
                     data = await websocket.receive_text()
-                    message = json.loads(data)
+                    message = ingest.parse(data)
                     event = message.get("event")
                     
-                    if event == "connected":
-                        print("Twilio Media Stream connected")
-                    elif event == "start":
-                        stream_sid = message.get('streamSid')
-                        call_sid = message.get('start', {}).get('callSid')
-                        print(f"Media Stream started: {stream_sid}, CallSid: {call_sid}")
-                    elif event == "media":
-                        payload = message['media']['payload']
-                        audio_chunk = base64.b64decode(payload)
-                        await dg_connection.send_media(audio_chunk)
+                    if event == "media":
+                        await ingest.push(message['media']['payload'])
+                    elif event == "mark":
+                        playback_tracker.on_mark(message.get('mark', {}).get('name'))
                     elif event == "stop":
                         print(f"Media Stream stopped: {stream_sid}")
-                        if stream_sid in call_contexts:
-                            del call_contexts[stream_sid]
+                        stopped = True
                         break
             except WebSocketDisconnect:
                 print("WebSocket disconnected")
-                if stream_sid in call_contexts:
-                            del call_contexts[stream_sid]
             finally:
+                # Stop everything that could still save the call state (a turn in flight,
+                # a speculation, the receiver starting new turns) before it is deleted
                 receiver_task.cancel()
-                try:
-                    await receiver_task
-                except asyncio.CancelledError:
-                    pass
+                tasks = [receiver_task, ai_task, hangup_task, speculation.task if speculation else None]
+                discard_speculation()
+                for task in tasks:
+                    if task and not task.done():
+                        task.cancel()
+                await asyncio.gather(*(t for t in tasks if t), return_exceptions=True)
+
+                if stream_sid in call_contexts:
+                    session = call_contexts.pop(stream_sid)
+                    session.history.cancel()
+                    # A call handed off while draining continues on another worker; without
+                    # `stop` the shared state is left to expire (CALL_STATE_TTL)
+                    if stopped and not app.state.draining:
+                        await call_state.delete(session.state_key)
+                    # Slots offered on this call become available to other callers right away
+                    try:
+                        await session.booking_service.release_holds(session.state_key)
+                    except Exception as e:
+                        print(f"[Bookings] Releasing holds failed: {e}")
+                await ingest.close()
+                if call_speculation_stats.started:
+                    print(f"[Speculation] Call stats: {call_speculation_stats.as_dict()}")
+                if turn_detector.gaps:
+                    print(f"[Turns] {turn_detector.summary()}")
+                if Config.TRACE_DIR:
+                    await asyncio.to_thread(call_trace.dump, Config.TRACE_DIR)
                 print("[Deepgram] Connection closed")
 
+    except WebSocketDisconnect:
+        print("WebSocket disconnected before the stream started")
     except Exception as e:
         print(f"Error in Voice Pipeline: {e}")
         traceback.print_exc()
     finally:
+        if recorder:
+            await recorder.close()
         print("WebSocket cleanup complete")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=Config.PORT)
+    DrainingServer(uvicorn.Config(app, host="0.0.0.0", port=Config.PORT)).run()
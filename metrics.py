@@ -0,0 +1,158 @@
+import bisect
+import json
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Latency buckets in seconds (20 ms .. 10 s)
+DEFAULT_BUCKETS = (0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed buckets, rendered in Prometheus text format.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        sep = "," if labels else ""
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry exposed on /metrics.
+    Histograms are keyed by (name, label string); callback metrics are read at scrape time.
+    """
+    def __init__(self):
+        self._histograms: Dict[str, Dict[str, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._counters: Dict[str, Dict[str, float]] = {}
+        self._callbacks: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def histogram(self, name: str, help_text: str, labels: str = "") -> Histogram:
+        self._help.setdefault(name, help_text)
+        series = self._histograms.setdefault(name, {})
+        if labels not in series:
+            series[labels] = Histogram()
+        return series[labels]
+
+    def inc(self, name: str, help_text: str, labels: str = "", value: float = 1.0):
+        self._help.setdefault(name, help_text)
+        series = self._counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0.0) + value
+
+    def callback(self, name: str, help_text: str, read: Callable[[], float], kind: str = "gauge"):
+        self._help[name] = help_text
+        self._callbacks[name] = (kind, read)
+
+    def render(self) -> str:
+        lines = []
+        for name, series in self._histograms.items():
+            lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                lines.extend(histogram.render(name, labels))
+        for name, series in self._counters.items():
+            lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        for name, (kind, read) in self._callbacks.items():
+            lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {read()}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class TurnTrace:
+    """
+    Timestamps of one turn's spans: speech_final, llm_request_sent, llm_first_token,
+    first_segment_cut, tts_first_byte, tts_last_byte, first_media_sent, barge_in_cancel.
+    Only the first occurrence of a span is kept unless `last=True` (tts_last_byte),
+    so marking is a dict lookup and a clock read.
+    """
+    def __init__(self, stream_sid: Optional[str] = None, turn: int = 0):
+        self.stream_sid = stream_sid
+        self.turn = turn
+        self.created = time.time()
+        self.spans: Dict[str, float] = {}
+
+    def mark(self, span: str, last: bool = False):
+        if last or span not in self.spans:
+            self.spans[span] = time.perf_counter()
+
+    def offsets(self) -> Dict[str, float]:
+        """
+        Seconds from speech_final to each span (spans that happened earlier, e.g. during
+        speculation, count as 0).
+        """
+        origin = self.spans.get("speech_final")
+        if origin is None:
+            return {}
+        return {span: max(0.0, t - origin) for span, t in self.spans.items() if span != "speech_final"}
+
+    def finish(self):
+        """
+        Aggregates the turn into the stage histograms.
+        """
+        for span, offset in self.offsets().items():
+            metrics.histogram(
+                "voice_turn_stage_seconds",
+                "Time from speech_final to each stage of the turn",
+                f'stage="{span}"'
+            ).observe(offset)
+        metrics.inc("voice_turns_total", "Completed or interrupted turns")
+
+    def as_dict(self) -> Dict:
+        return {
+            "stream_sid": self.stream_sid,
+            "turn": self.turn,
+            "created": self.created,
+            "offsets_ms": {span: round(offset * 1000, 1) for span, offset in self.offsets().items()},
+        }
+
+
+class CallTrace:
+    """
+    All turn traces of one call, optionally dumped as JSON when the call ends.
+    """
+    def __init__(self, stream_sid: Optional[str] = None):
+        self.stream_sid = stream_sid
+        self.turns: List[TurnTrace] = []
+
+    def add(self, trace: TurnTrace):
+        """
+        Registers a turn once it is committed (discarded speculations are never added).
+        """
+        trace.stream_sid = self.stream_sid
+        trace.turn = len(self.turns) + 1
+        self.turns.append(trace)
+
+    def dump(self, directory: str):
+        if not self.turns:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.stream_sid or 'unknown'}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"stream_sid": self.stream_sid, "turns": [t.as_dict() for t in self.turns]}, f, indent=4)
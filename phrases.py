@@ -0,0 +1,175 @@
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+from scheduling import parse_datetime
+
+SUPPORTED_LANGUAGES = ("en", "fr", "de")
+
+# Frequent function words per language, used for cheap language detection
+_LANGUAGE_MARKERS = {
+    "en": {"hello", "hi", "i", "you", "yes", "no", "thanks", "thank", "appointment", "the", "a", "is",
+           "for", "with", "my", "would", "like", "please", "tomorrow", "goodbye", "bye", "need", "want"},
+    "fr": {"bonjour", "je", "vous", "oui", "non", "merci", "rendez-vous", "le", "la", "les", "un", "une",
+           "est", "pour", "avec", "mon", "voudrais", "demain", "revoir", "au", "madame", "monsieur", "besoin"},
+    "de": {"hallo", "ich", "sie", "ja", "nein", "danke", "termin", "der", "die", "das", "ein", "eine",
+           "ist", "für", "mit", "mein", "möchte", "bitte", "morgen", "wiedersehen", "tschüss", "guten", "brauche"},
+}
+_WORD = re.compile(r"[\w'-]+")
+
+
+def detect_language(text: str) -> Optional[str]:
+    """
+    Returns the most likely of en/fr/de, or None when the text gives no clear signal.
+    """
+    words = _WORD.findall(text.lower())
+    scores = {lang: sum(1 for w in words if w in markers) for lang, markers in _LANGUAGE_MARKERS.items()}
+    best = max(scores, key=scores.get)
+    ranked = sorted(scores.values(), reverse=True)
+    if ranked[0] == 0 or ranked[0] == ranked[1]:
+        return None
+    return best
+
+
+_WEEKDAYS = {
+    "en": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
+    "fr": ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"],
+    "de": ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"],
+}
+_MONTHS = {
+    "en": ["January", "February", "March", "April", "May", "June", "July", "August",
+           "September", "October", "November", "December"],
+    "fr": ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août",
+           "septembre", "octobre", "novembre", "décembre"],
+    "de": ["Januar", "Februar", "März", "April", "Mai", "Juni", "Juli", "August",
+           "September", "Oktober", "November", "Dezember"],
+}
+_AND = {"en": "and", "fr": "et", "de": "und"}
+
+TOOL_TEMPLATES: Dict[str, Dict[str, str]] = {
+    "en": {
+        "available": "On {date}, I have openings at {times}. Which time works best for you?",
+        "next_available": "I'm sorry, there are no openings on {date}. The next available times are {times}. Would one of those work for you?",
+        "unavailable": "I'm sorry, there are no openings on {date}. Would another day work for you?",
+        "booked": "Thank you, {name}. Your appointment is confirmed for {date} at {time}. Is there anything else I can assist you with today?",
+        "taken": "I'm sorry, {date} at {time} has just been booked. The next available times are {times}. Would one of those work for you?",
+        "not_offered": "I'm sorry, we don't have appointments on {date} at {time}. The next available times are {times}. Would one of those work for you?",
+        "farewell": "Thank you for calling HealthCenter One. Goodbye!",
+        "emergency": "This sounds like an emergency. Please hang up now and call emergency services at 911, or 112, immediately.",
+    },
+    "fr": {
+        "available": "Le {date}, j'ai des disponibilités à {times}. Quelle heure vous convient le mieux ?",
+        "next_available": "Je suis désolée, il n'y a aucune disponibilité le {date}. Les prochains créneaux libres sont {times}. L'un d'eux vous convient-il ?",
+        "unavailable": "Je suis désolée, il n'y a aucune disponibilité le {date}. Un autre jour vous conviendrait-il ?",
+        "booked": "Merci, {name}. Votre rendez-vous est confirmé le {date} à {time}. Puis-je vous aider avec autre chose aujourd'hui ?",
+        "taken": "Je suis désolée, le créneau du {date} à {time} vient d'être réservé. Les prochains créneaux libres sont {times}. L'un d'eux vous convient-il ?",
+        "not_offered": "Je suis désolée, nous ne proposons pas de rendez-vous le {date} à {time}. Les prochains créneaux libres sont {times}. L'un d'eux vous convient-il ?",
+        "farewell": "Merci d'avoir appelé HealthCenter One. Au revoir !",
+        "emergency": "Cela ressemble à une urgence. Raccrochez et appelez immédiatement le 15 ou le 112.",
+    },
+    "de": {
+        "available": "Am {date} habe ich Termine um {times} frei. Welche Uhrzeit passt Ihnen am besten?",
+        "next_available": "Es tut mir leid, am {date} ist leider nichts frei. Die nächsten freien Termine sind {times}. Passt Ihnen einer davon?",
+        "unavailable": "Es tut mir leid, am {date} ist leider nichts frei. Würde Ihnen ein anderer Tag passen?",
+        "booked": "Vielen Dank, {name}. Ihr Termin am {date} um {time} ist bestätigt. Kann ich Ihnen sonst noch behilflich sein?",
+        "taken": "Es tut mir leid, der Termin am {date} um {time} wurde gerade vergeben. Die nächsten freien Termine sind {times}. Passt Ihnen einer davon?",
+        "not_offered": "Es tut mir leid, am {date} um {time} bieten wir keine Termine an. Die nächsten freien Termine sind {times}. Passt Ihnen einer davon?",
+        "farewell": "Vielen Dank für Ihren Anruf bei HealthCenter One. Auf Wiederhören!",
+        "emergency": "Das klingt nach einem Notfall. Bitte legen Sie auf und rufen Sie sofort den Notruf 112 an.",
+    },
+}
+
+
+def speak_date(value: datetime, language: str) -> str:
+    weekday = _WEEKDAYS[language][value.weekday()]
+    month = _MONTHS[language][value.month - 1]
+    if language == "fr":
+        return f"{weekday} {value.day} {month}"
+    if language == "de":
+        return f"{weekday}, {value.day}. {month}"
+    return f"{weekday}, {month} {value.day}"
+
+
+def speak_time(value: datetime, language: str) -> str:
+    if language == "fr":
+        return f"{value.hour}h{value.minute:02d}" if value.minute else f"{value.hour}h"
+    if language == "de":
+        return f"{value.hour}:{value.minute:02d} Uhr"
+    hour = value.hour % 12 or 12
+    suffix = "AM" if value.hour < 12 else "PM"
+    return f"{hour}:{value.minute:02d} {suffix}"
+
+
+def speak_list(items: List[str], language: str) -> str:
+    if len(items) <= 1:
+        return "".join(items)
+    return f"{', '.join(items[:-1])} {_AND[language]} {items[-1]}"
+
+
+def render_tool_response(name: str, result, language: str, max_times: int = 4) -> Optional[str]:
+    """
+    Renders a spoken response for a deterministic tool result.
+    Returns None when the result needs the model (errors, unknown tools).
+    """
+    language = language if language in TOOL_TEMPLATES else "en"
+    templates = TOOL_TEMPLATES[language]
+    if not isinstance(result, dict) or "error" in result:
+        return None
+
+    if name == "check_availability":
+        day = parse_datetime(result.get("date") or "")
+        if day is None:
+            return None
+        date_text = speak_date(day, language)
+        available = result.get("available_times") or []
+        if available:
+            times = [speak_time(parse_datetime(f"{result['date']} {t}"), language) for t in available[:max_times]]
+            return templates["available"].format(date=date_text, times=speak_list(times, language))
+        upcoming = [parse_datetime(s) for s in result.get("next_available") or []]
+        if upcoming:
+            times = [f"{speak_date(s, language)} {speak_time(s, language)}" for s in upcoming[:max_times]]
+            return templates["next_available"].format(date=date_text, times=speak_list(times, language))
+        return templates["unavailable"].format(date=date_text)
+
+    if name == "book_appointment":
+        start = parse_datetime(result.get("datetime") or "")
+        if start is None:
+            return None
+        if result.get("status") == "unavailable":
+            # Taken by a concurrent call between the offer and the confirmation,
+            # or a time the clinic does not offer
+            upcoming = [parse_datetime(s) for s in result.get("next_available") or []]
+            if not upcoming:
+                return None
+            times = [f"{speak_date(s, language)} {speak_time(s, language)}" for s in upcoming[:max_times]]
+            return templates[result.get("reason") or "taken"].format(
+                date=speak_date(start, language),
+                time=speak_time(start, language),
+                times=speak_list(times, language)
+            )
+        if not result.get("name"):
+            return None
+        return templates["booked"].format(
+            name=result["name"],
+            date=speak_date(start, language),
+            time=speak_time(start, language)
+        )
+
+    if name == "terminate_call":
+        return templates["farewell"]
+
+    return None
+
+
+def render_intent_response(intent: str, language: str) -> str:
+    """
+    Spoken response of a fast-path intent ("emergency" or "farewell", see intents.py).
+    """
+    language = language if language in TOOL_TEMPLATES else "en"
+    return TOOL_TEMPLATES[language][intent]
+
+
+def intent_phrases() -> List[str]:
+    """
+    All fast-path responses, pre-synthesized and pinned in the phrase cache at startup.
+    """
+    return [templates[key] for templates in TOOL_TEMPLATES.values() for key in ("emergency", "farewell")]
@@ -0,0 +1,110 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+from config import Config
+from metrics import TurnTrace
+from playback import Playback
+
+
+class TTSPipeline:
+    """
+    Producer/consumer pipeline between the LLM token stream and the caller.
+    Segments are handed to TTS as soon as they are cut (bounded concurrency per call),
+    while a single player task sends the resulting audio back strictly in order,
+    one 20 ms media frame at a time.
+    """
+    def __init__(self, tts_service, send_audio: Callable[[bytes], Awaitable[None]],
+                 max_concurrency: int = Config.TTS_MAX_CONCURRENCY,
+                 streaming: bool = Config.TTS_STREAMING,
+                 gate: Optional[asyncio.Event] = None,
+                 trace: Optional[TurnTrace] = None,
+                 playback: Optional[Playback] = None):
+        self.tts_service = tts_service
+        self.send_audio = send_audio
+        self.streaming = streaming
+        # Playback is held until the gate is set (speculative turns)
+        self.gate = gate
+        self.trace = trace or TurnTrace()
+        # Twilio marks around each segment (what the caller actually heard)
+        self.playback = playback
+        self.total_audio_bytes = 0
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending: List[asyncio.Task] = []
+        self._player: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._player = asyncio.create_task(self._play())
+
+    def submit(self, text: str):
+        """
+        Starts synthesis of a segment immediately and queues it for ordered playback.
+        """
+        frames: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self._synthesize(text, frames))
+        self._pending.append(task)
+        task.add_done_callback(self._discard)
+        self._queue.put_nowait((text, frames))
+
+    async def finish(self):
+        """
+        Waits until every submitted segment has been played.
+        """
+        self._queue.put_nowait(None)
+        if self._player:
+            await self._player
+
+    async def cancel(self):
+        """
+        Stops playback and abandons any in-flight synthesis (e.g. on barge-in).
+        """
+        tasks = list(self._pending)
+        if self._player and not self._player.done():
+            tasks.append(self._player)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _discard(self, task: asyncio.Task):
+        if task in self._pending:
+            self._pending.remove(task)
+
+    async def _synthesize(self, text: str, frames: asyncio.Queue):
+        try:
+            async with self._semaphore:
+                if self.streaming:
+                    # Frames are forwarded as soon as the first TTS bytes arrive
+                    async for frame in self.tts_service.stream_audio(text):
+                        self.trace.mark("tts_first_byte")
+                        frames.put_nowait(frame)
+                else:
+                    audio_chunk = await self.tts_service.generate_audio(text)
+                    if audio_chunk:
+                        self.trace.mark("tts_first_byte")
+                        frame_bytes = self.tts_service.FRAME_BYTES
+                        for offset in range(0, len(audio_chunk), frame_bytes):
+                            frames.put_nowait(audio_chunk[offset:offset + frame_bytes])
+                self.trace.mark("tts_last_byte", last=True)
+        finally:
+            frames.put_nowait(None)
+
+    async def _play(self):
+        if self.gate:
+            await self.gate.wait()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            text, frames = item
+            mark = None
+            while True:
+                frame = await frames.get()
+                if frame is None:
+                    break
+                if mark is None and self.playback:
+                    mark = self.playback.begin(text)
+                self.total_audio_bytes += len(frame)
+                self.trace.mark("first_media_sent")
+                await self.send_audio(frame)
+            if mark is not None:
+                await self.playback.end(mark)
@@ -0,0 +1,124 @@
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class Playback:
+    """
+    The segments of one assistant turn as sent to the caller, and which of them
+    Twilio has confirmed as played (their mark came back).
+    """
+    def __init__(self, tracker: "PlaybackTracker"):
+        self.tracker = tracker
+        self.segments: List[Tuple[str, str]] = []    # (mark name, text) in playback order
+        self.played: set = set()
+        # The committed assistant message, truncated if the caller barges in later
+        self.message: Optional[Dict] = None
+
+    def begin(self, text: str) -> str:
+        """
+        Registers a segment whose first frame is about to be sent.
+        """
+        name = self.tracker.register(self)
+        self.segments.append((name, text))
+        return name
+
+    async def end(self, name: str):
+        """
+        Sends the mark that follows the segment's last frame.
+        """
+        await self.tracker.send_mark(name)
+
+    @property
+    def last_mark(self) -> Optional[str]:
+        return self.segments[-1][0] if self.segments else None
+
+    def heard_text(self) -> str:
+        """
+        Text of the segments the caller actually heard (segments play in order).
+        """
+        heard = []
+        for name, text in self.segments:
+            if name not in self.played:
+                break
+            heard.append(text)
+        return " ".join(heard)
+
+
+class PlaybackTracker:
+    """
+    Tracks outbound audio on one Media Stream with Twilio marks.
+    A mark is sent after each segment and echoed back by Twilio once the audio before
+    it has played; `clear` flushes Twilio's buffer on barge-in.
+    """
+    def __init__(self, send_json: Callable[[Dict], Awaitable[None]]):
+        self.send_json = send_json
+        self.stream_sid: Optional[str] = None
+        self._names = itertools.count(1)
+        # Segments whose mark has not come back yet, in playback order
+        self._pending: "OrderedDict[str, Playback]" = OrderedDict()
+        self._cleared: set = set()
+        # Resolved with True when the mark comes back, False when the segment is cleared
+        self._waiters: Dict[str, asyncio.Future] = {}
+
+    def start_turn(self) -> Playback:
+        return Playback(self)
+
+    def register(self, playback: Playback) -> str:
+        name = f"seg-{next(self._names)}"
+        self._pending[name] = playback
+        return name
+
+    async def send_mark(self, name: str):
+        if name not in self._pending:
+            return
+        await self.send_json({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}})
+
+    def on_mark(self, name: str):
+        """
+        Handles a mark echoed by Twilio. Marks of cleared segments are ignored.
+        """
+        playback = self._pending.pop(name, None)
+        if playback is None:
+            return
+        playback.played.add(name)
+        waiter = self._waiters.pop(name, None)
+        if waiter and not waiter.done():
+            waiter.set_result(True)
+
+    @property
+    def playing(self) -> bool:
+        return bool(self._pending)
+
+    async def wait_played(self, name: str, timeout: float) -> bool:
+        """
+        Waits until the segment's mark is back. Returns False on timeout or if the
+        segment was cleared.
+        """
+        if name not in self._pending:
+            return name not in self._cleared
+        waiter = self._waiters.get(name)
+        if waiter is None:
+            waiter = self._waiters[name] = asyncio.get_running_loop().create_future()
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    async def clear(self) -> List[Playback]:
+        """
+        Stops buffered audio immediately. Returns the turns that were cut short;
+        what they played so far is frozen before Twilio echoes the cleared marks.
+        """
+        if not self._pending:
+            return []
+        interrupted = list(dict.fromkeys(self._pending.values()))
+        self._cleared.update(self._pending)
+        self._pending.clear()
+        for waiter in self._waiters.values():
+            if not waiter.done():
+                waiter.set_result(False)
+        self._waiters.clear()
+        await self.send_json({"event": "clear", "streamSid": self.stream_sid})
+        return interrupted
@@ -0,0 +1,113 @@
+import asyncio
+import base64
+import gzip
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import Config
+from ingest import dumps, loads
+
+
+class CallRecorder:
+    """
+    Records what happened on one call for offline replay (see loadtest/replay.py):
+    inbound audio, STT events, LLM tokens, tool calls and per-turn latency spans.
+
+    `record` only appends a tuple to a list; a writer task serializes the batch and
+    appends it to a gzip JSON Lines file (`<dir>/<call>.jsonl.gz`) in a worker thread
+    every RECORD_FLUSH_SECONDS, so the call never waits on disk I/O.
+    Each line is `[seconds since call start, kind, fields]`.
+    """
+    def __init__(self, directory: str, name: str, record_audio: bool = Config.RECORD_AUDIO,
+                 flush_seconds: float = Config.RECORD_FLUSH_SECONDS):
+        self.path = os.path.join(directory, f"{name}.jsonl.gz")
+        self.record_audio = record_audio
+        self.flush_seconds = flush_seconds
+        self._started = time.perf_counter()
+        self._events: List[Tuple[float, str, Dict]] = []
+        self._file = None
+        self._writer: Optional[asyncio.Task] = None
+        self._closing = asyncio.Event()
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def record(self, kind: str, **fields):
+        self._events.append((time.perf_counter() - self._started, kind, fields))
+
+    def audio(self, chunk: bytes):
+        if self.record_audio:
+            self.record("audio", payload=base64.b64encode(chunk).decode())
+
+    def stt(self, result):
+        """
+        Records a Deepgram live message (Results, SpeechStarted, UtteranceEnd).
+        """
+        kind = getattr(result, "type", None)
+        if kind == "Results":
+            alternatives = result.channel.alternatives if getattr(result, "channel", None) else []
+            self.record(
+                "stt", type=kind,
+                transcript=alternatives[0].transcript if alternatives else "",
+                is_final=bool(getattr(result, "is_final", False)),
+                speech_final=bool(getattr(result, "speech_final", False)),
+                start=getattr(result, "start", None),
+                duration=getattr(result, "duration", None),
+            )
+        elif kind:
+            self.record("stt", type=kind)
+
+    def turn(self, turn: List[Dict], trace):
+        """
+        Records a committed turn: tool calls with their results and the latency spans.
+        """
+        results = {m.get("tool_call_id"): m.get("content") for m in turn if m.get("role") == "tool"}
+        tools = [
+            {"name": tc["function"]["name"], "arguments": tc["function"]["arguments"], "result": results.get(tc["id"])}
+            for m in turn if m.get("tool_calls") for tc in m["tool_calls"]
+        ]
+        replies = [m.get("content") for m in turn if m.get("role") == "assistant" and m.get("content")]
+        self.record("turn", user=turn[0].get("content") if turn else None, tools=tools, replies=replies,
+                    turn=trace.turn, offsets_ms=trace.as_dict()["offsets_ms"])
+
+    async def close(self):
+        self._closing.set()
+        if self._writer:
+            # The writer does the final flush, so two writes never overlap
+            await self._writer
+        else:
+            await self._flush()
+        if self._file:
+            await asyncio.to_thread(self._file.close)
+            print(f"[Recorder] Call recorded to {self.path}")
+
+    async def _write_loop(self):
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self._flush()
+            except Exception as e:
+                print(f"[Recorder] Write failed: {e}")
+
+    async def _flush(self):
+        if not self._events:
+            return
+        batch, self._events = self._events, []
+        await asyncio.to_thread(self._write, batch)
+
+    def _write(self, batch: List[Tuple[float, str, Dict]]):
+        if self._file is None:
+            self._file = gzip.open(self.path, "wt", encoding="utf-8", compresslevel=6)
+        self._file.write("".join(dumps([round(t, 4), kind, fields]) + "\n" for t, kind, fields in batch))
+
+
+def read_recording(path: str) -> Iterator[Tuple[float, str, Dict]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                t, kind, fields = loads(line)
+                yield t, kind, fields
@@ -0,0 +1,123 @@
+import bisect
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Canonical slot key used for bookings and holds
+SLOT_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def parse_datetime(value: str) -> Optional[datetime]:
+    """
+    Parses the booking formats used by the tools ("YYYY-MM-DD HH:MM" or ISO 8601).
+    Times with a UTC offset are converted to naive local time, like the slots.
+    """
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def parse_time(value: str) -> time:
+    hours, minutes = value.split(":")
+    return time(int(hours), int(minutes))
+
+
+class SlotIndex:
+    """
+    In-memory per-day index of occupied intervals, driven by the clinic opening hours.
+    Each day keeps a sorted list of (start, end) minutes, so free-slot lookups only
+    touch the requested day and never scan the whole booking history.
+    """
+    def __init__(self, open_days: Iterable[int], open_time: time, close_time: time, slot_minutes: int):
+        self.open_days = set(open_days)
+        self.open_minute = open_time.hour * 60 + open_time.minute
+        self.close_minute = close_time.hour * 60 + close_time.minute
+        self.slot_minutes = slot_minutes
+        self._days: Dict[date, List[Tuple[int, int]]] = {}
+
+    def add(self, start: datetime, minutes: Optional[int] = None):
+        """
+        Marks an interval as occupied (one slot long unless stated otherwise).
+        """
+        begin = start.hour * 60 + start.minute
+        end = begin + (minutes or self.slot_minutes)
+        bisect.insort(self._days.setdefault(start.date(), []), (begin, end))
+
+    def remove(self, start: datetime, minutes: Optional[int] = None):
+        begin = start.hour * 60 + start.minute
+        interval = (begin, begin + (minutes or self.slot_minutes))
+        intervals = self._days.get(start.date())
+        if intervals and interval in intervals:
+            intervals.remove(interval)
+
+    def is_occupied(self, start: datetime) -> bool:
+        begin = start.hour * 60 + start.minute
+        return self._overlaps(start.date(), begin, begin + self.slot_minutes)
+
+    def is_slot(self, start: datetime) -> bool:
+        """
+        True when `start` is a slot the clinic offers: an open day, within opening
+        hours and on the slot grid.
+        """
+        begin = start.hour * 60 + start.minute
+        if start.weekday() not in self.open_days or start.second or start.microsecond:
+            return False
+        if begin < self.open_minute or begin + self.slot_minutes > self.close_minute:
+            return False
+        return (begin - self.open_minute) % self.slot_minutes == 0
+
+    def is_free(self, start: datetime) -> bool:
+        if not self.is_slot(start):
+            return False
+        begin = start.hour * 60 + start.minute
+        return not self._overlaps(start.date(), begin, begin + self.slot_minutes)
+
+    def free_slots(self, day: date, not_before: Optional[datetime] = None) -> List[str]:
+        """
+        Returns the free slot start times ("HH:MM") on the given day.
+        """
+        return [f"{m // 60:02d}:{m % 60:02d}" for m in self._free_minutes(day, not_before)]
+
+    def next_free_slots(self, after: datetime, count: int, horizon_days: int = 60) -> List[datetime]:
+        """
+        Returns up to `count` free slot starts at or after `after`.
+        """
+        slots: List[datetime] = []
+        day = after.date()
+        for _ in range(horizon_days):
+            for minute in self._free_minutes(day, after):
+                slots.append(datetime.combine(day, time(minute // 60, minute % 60)))
+                if len(slots) >= count:
+                    return slots
+            day += timedelta(days=1)
+        return slots
+
+    def _free_minutes(self, day: date, not_before: Optional[datetime]) -> List[int]:
+        if day.weekday() not in self.open_days:
+            return []
+        first = self.open_minute
+        if not_before is not None:
+            if not_before.date() > day:
+                return []
+            if not_before.date() == day:
+                first = max(first, not_before.hour * 60 + not_before.minute)
+        # Align to the slot grid
+        offset = (first - self.open_minute) % self.slot_minutes
+        if offset:
+            first += self.slot_minutes - offset
+
+        return [
+            begin for begin in range(first, self.close_minute - self.slot_minutes + 1, self.slot_minutes)
+            if not self._overlaps(day, begin, begin + self.slot_minutes)
+        ]
+
+    def _overlaps(self, day: date, begin: int, end: int) -> bool:
+        intervals = self._days.get(day)
+        if not intervals:
+            return False
+        # Only intervals starting before `end` can overlap [begin, end)
+        i = bisect.bisect_left(intervals, (end,))
+        return any(e > begin for _, e in intervals[:i])
@@ -0,0 +1,183 @@
+import re
+from typing import List, Optional
+from config import Config
+
+# Abbreviations that never end a sentence (titles before a name, "e.g.", ...)
+_ABBREVIATIONS = {
+    "en": {"mr", "mrs", "ms", "dr", "prof", "st", "jr", "sr", "vs", "approx", "appt", "dept", "tel", "fig"},
+    "fr": {"m", "mme", "mmes", "mlle", "dr", "pr", "st", "ste", "env", "tél", "tel", "n°", "av", "bd", "cf"},
+    "de": {"hr", "fr", "dr", "prof", "nr", "str", "tel", "ca", "bzw", "vgl", "ggf", "inkl", "evtl", "zzgl", "allg"},
+}
+# Abbreviations that may also close a sentence ("... at 9 a.m. See you then.")
+_FINAL_ABBREVIATIONS = {"etc", "a.m", "p.m", "usw", "ff"}
+
+_CLAUSE_END = ",;:"
+_CLOSERS = "\"'”’»)]"
+_OPENERS = "\"'“‘«(["
+# Characters that may start a boundary; everything else is skipped at C speed
+_CANDIDATE = re.compile(r"[.!?…\n,;:]")
+
+
+class SentenceSegmenter:
+    """
+    Cuts a streamed LLM reply into TTS segments, scanning each character once.
+
+    A period only ends a sentence when it is followed by whitespace and is not part
+    of a number ("10.30"), an initial ("J. Smith"), an abbreviation ("Dr. Smith",
+    "z.B.", "M. Dupont") or, in German, an ordinal ("5. März").
+
+    Policy: the first segment is emitted as early as possible (first sentence, or a
+    clause of at least `first_min_chars`) to cut time-to-first-audio; later segments
+    group sentences until `min_chars` to cut the number of TTS requests, and nothing
+    grows beyond `max_chars` without being cut.
+    """
+    def __init__(self, language: str = "en",
+                 first_min_chars: int = Config.SEGMENT_FIRST_MIN_CHARS,
+                 min_chars: int = Config.SEGMENT_MIN_CHARS,
+                 max_chars: int = Config.SEGMENT_MAX_CHARS):
+        self.abbreviations = _ABBREVIATIONS.get(language, _ABBREVIATIONS["en"])
+        self.ordinals = language == "de"
+        self.first_min_chars = first_min_chars
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._pos = 0                       # next character to scan
+        self._sentence_ends: List[int] = []
+        self._clause_ends: List[int] = []
+        self._emitted = 0
+
+    def push(self, text: str) -> List[str]:
+        """
+        Adds streamed text and returns the segments that are ready.
+        """
+        self._buffer += text
+        self._scan(final=False)
+        segments = []
+        while True:
+            cut = self._choose_cut()
+            if cut is None:
+                return segments
+            segment = self._take(cut)
+            if segment:
+                segments.append(segment)
+
+    def flush(self) -> List[str]:
+        """
+        Returns the remaining text at the end of the stream.
+        """
+        self._scan(final=True)
+        segments = []
+        while len(self._buffer.strip()) > self.max_chars:
+            cut = self._choose_cut()
+            if cut is None:
+                break
+            segment = self._take(cut)
+            if segment:
+                segments.append(segment)
+        rest = self._take(len(self._buffer))
+        if rest:
+            segments.append(rest)
+        return segments
+
+    def _scan(self, final: bool):
+        buffer = self._buffer
+        i = self._pos
+        while True:
+            match = _CANDIDATE.search(buffer, i)
+            if match is None:
+                i = len(buffer)
+                break
+            i = match.start()
+            end = self._boundary(i, final)
+            if end is None:
+                # Need more text to decide
+                break
+            if end > 0:
+                if buffer[i] in _CLAUSE_END:
+                    self._clause_ends.append(end)
+                else:
+                    self._sentence_ends.append(end)
+                i = max(i, end - 1)
+            i += 1
+        self._pos = i
+
+    def _boundary(self, i: int, final: bool) -> Optional[int]:
+        """
+        Returns the end offset of a boundary at `i`, 0 when `i` is no boundary,
+        or None when more text is needed.
+        """
+        buffer = self._buffer
+        size = len(buffer)
+        char = buffer[i]
+        if char == "\n":
+            return i + 1
+
+        # Skip closing quotes/brackets, then require whitespace
+        j = i + 1
+        while j < size and buffer[j] in _CLOSERS:
+            j += 1
+        if j >= size:
+            return j if final else None
+        if not buffer[j].isspace():
+            return 0
+        if char in _CLAUSE_END or char in "!?…":
+            return j
+
+        # A period: look at the next word and the word before it
+        k = j
+        while k < size and buffer[k].isspace():
+            k += 1
+        if k >= size and not final:
+            return None
+        next_char = buffer[k] if k < size else ""
+        if next_char and next_char.islower():
+            return 0
+
+        start = i
+        while start > 0 and not buffer[start - 1].isspace():
+            start -= 1
+        word = buffer[start:i].lstrip(_OPENERS)
+        lowered = word.lower()
+        if not word.strip("."):
+            # Bare period or the end of an ellipsis
+            return j
+        if lowered in self.abbreviations:
+            return 0
+        if len(word) == 1 and word.isalpha() and word.isupper():
+            return 0
+        if word.isdigit() and self.ordinals:
+            return 0
+        if "." in word or lowered in _FINAL_ABBREVIATIONS:
+            # "z.B. Montag" keeps going; "9 a.m. See you" ends the sentence
+            return j if lowered in _FINAL_ABBREVIATIONS and next_char.isupper() else 0
+        return j
+
+    def _choose_cut(self) -> Optional[int]:
+        if not self._emitted:
+            if self._sentence_ends:
+                return self._sentence_ends[0]
+            for end in self._clause_ends:
+                if len(self._buffer[:end].strip()) >= self.first_min_chars:
+                    return end
+        else:
+            for end in self._sentence_ends:
+                if end >= self.min_chars:
+                    return end
+        if len(self._buffer) > self.max_chars:
+            fits = [e for e in self._sentence_ends if e <= self.max_chars]
+            fits = fits or [e for e in self._clause_ends if e <= self.max_chars]
+            if fits:
+                return fits[-1]
+            space = self._buffer.rfind(" ", 0, self.max_chars)
+            return space if space > 0 else self.max_chars
+        return None
+
+    def _take(self, cut: int) -> str:
+        segment = self._buffer[:cut].strip()
+        self._buffer = self._buffer[cut:]
+        self._pos = max(0, self._pos - cut)
+        self._sentence_ends = [e - cut for e in self._sentence_ends if e > cut]
+        self._clause_ends = [e - cut for e in self._clause_ends if e > cut]
+        if segment:
+            self._emitted += 1
+        return segment
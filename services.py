@@ -1,126 +1,459 @@
+import asyncio
 import json
-import os
+import sqlite3
+import threading
+import time
 import httpx
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, List, Optional, Dict, Set
 from config import Config
+import db
+from tts_cache import PhraseCache
+from history import ConversationHistory
+from metrics import TurnTrace
+from intents import FAREWELL, IntentMatch
+from phrases import detect_language, render_intent_response, render_tool_response
+from scheduling import SLOT_FORMAT, SlotIndex, parse_datetime, parse_time
 import openai
 
+
+async def open_connections(client: httpx.AsyncClient, url: str, count: int, **kwargs) -> int:
+    """
+    Opens up to `count` keep-alive connections to the host of `url` with concurrent
+    HEAD requests (any status will do), so the first calls skip DNS, TCP and TLS
+    setup. Returns the number of requests that got a response.
+    """
+    async def ping() -> bool:
+        try:
+            await client.head(url, **kwargs)
+            return True
+        except httpx.HTTPError as e:
+            print(f"[Warm-up] {url}: {e!r}")
+            return False
+
+    return sum(await asyncio.gather(*(ping() for _ in range(count))))
+
 class BookingService:
-    def __init__(self):
-        # Mock database of appointments
-        # Format: {"datetime": "2023-10-27T10:00:00", "name": "John Doe", "type": "Checkup"}
-        self.appointments = []
+    """
+    Appointment store backed by SQLite (WAL mode). All database work runs on a small
+    thread pool with one connection per thread, so bookings never block the event loop.
+
+    Slots offered to a caller are held for SLOT_HOLD_SECONDS in the shared `slot_holds`
+    table, so concurrent calls (on any worker) are offered other slots. A booking
+    confirms the hold with compare-and-set semantics, and a unique index on confirmed
+    slots rejects double bookings even when no hold was taken.
+    """
+    def __init__(self, db_path: str = Config.BOOKINGS_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=Config.BOOKINGS_DB_POOL_SIZE,
+            thread_name_prefix="bookings-db"
+        )
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bookings-db-writer")
+        db.init_db(self._connection())
+        self.slots = SlotIndex(
+            Config.CLINIC_OPEN_DAYS,
+            parse_time(Config.CLINIC_OPEN_TIME),
+            parse_time(Config.CLINIC_CLOSE_TIME),
+            Config.SLOT_MINUTES
+        )
+        # Highest booking id reflected in the slot index (ids only grow: AUTOINCREMENT)
+        self._last_id = 0
+        self._refreshed_at = 0.0
+        self._holds_swept_at = 0.0
+        self._apply_rows(self._fetch_since(0))
+
+    def _fetch_since(self, last_id: int) -> List[sqlite3.Row]:
+        return self._connection().execute(
+            "SELECT id, datetime FROM bookings WHERE id > ? AND (status IS NULL OR status = 'confirmed') "
+            "ORDER BY id",
+            (last_id,)
+        ).fetchall()
+
+    def _apply_rows(self, rows: List[sqlite3.Row]):
+        for row in rows:
+            # Overlapping refreshes may return the same rows twice
+            if row["id"] <= self._last_id:
+                continue
+            self._last_id = row["id"]
+            start = parse_datetime(row["datetime"])
+            if start:
+                self.slots.add(start)
+
+    async def refresh_slots(self, force: bool = False):
+        """
+        Picks up bookings written by other workers since the last refresh.
+        Only rows with a higher id are read, so a refresh is one indexed range scan.
+        """
+        now = time.monotonic()
+        if not force and now - self._refreshed_at < Config.SLOT_INDEX_REFRESH_SECONDS:
+            return
+        self._refreshed_at = now
+        self._apply_rows(await self._run(self._fetch_since, self._last_id))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = db.connect(self.db_path)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def _write(self, fn, *args):
+        # SQLite has a single writer: queueing writes on one thread avoids lock
+        # retries between this worker's own connections
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, fn, *args)
+
+    async def get_availability(self, date_str: str, holder: Optional[str] = None,
+                               replace: bool = True) -> List[str]:
+        """
+        Returns the free slot start times ("HH:MM") for a given date (YYYY-MM-DD).
+        Served from the in-memory slot index; at most one incremental refresh per
+        SLOT_INDEX_REFRESH_SECONDS picks up bookings made by other workers.
+        With a `holder` (the call), the first SLOT_HOLD_OFFERED free slots (the ones
+        read out to the caller) are held for it, and slots held by other live calls
+        or just booked are left out; the rest of the day stays on the list and is confirmed when booked.
+        With `replace` False the holds are added to the caller's previous ones.
+        """
+        try:
+            day = datetime.strptime(date_str.strip(), "%Y-%m-%d").date()
+        except (AttributeError, ValueError):
+            return []
+        await self.refresh_slots()
+        free = self.slots.free_slots(day, not_before=datetime.now())
+        if not holder or not free:
+            return free
+        candidates = [datetime.combine(day, parse_time(t)) for t in free]
+        await self.hold_slots(holder, candidates, Config.SLOT_HOLD_OFFERED, replace)
+        taken = await self._run(self._taken_elsewhere, holder, day, time.time())
+        return [t for t, slot in zip(free, candidates) if slot.strftime(SLOT_FORMAT) not in taken]
+
+    async def get_next_available(self, after: Optional[datetime] = None, count: int = 3,
+                                 holder: Optional[str] = None, replace: bool = True) -> List[str]:
+        """
+        Returns the next `count` free slots ("YYYY-MM-DD HH:MM") at or after `after`,
+        held for `holder` when given.
+        """
+        await self.refresh_slots()
+        now = datetime.now()
+        after = max(after or now, now)
+        if holder:
+            # Some candidates may be held by other calls; look further ahead
+            slots = await self.hold_slots(holder, self.slots.next_free_slots(after, count * 20), count, replace)
+        else:
+            slots = self.slots.next_free_slots(after, count)
+        return [slot.strftime(SLOT_FORMAT) for slot in slots]
+
+    async def hold_slots(self, holder: str, candidates: List[datetime], count: int,
+                         replace: bool = True) -> List[datetime]:
+        """
+        Holds the first `count` candidates that are neither booked nor held by another
+        live call, for SLOT_HOLD_SECONDS. The caller's previous holds are replaced,
+        or kept when `replace` is False.
+        """
+        if not candidates:
+            if replace:
+                await self.release_holds(holder)
+            return []
+        slots = [s.strftime(SLOT_FORMAT) for s in candidates]
+        acquired = set(await self._write(self._hold, holder, slots, count, time.time(), replace))
+        return [s for s, key in zip(candidates, slots) if key in acquired]
+
+    async def release_holds(self, holder: str):
+        await self._write(self._release, holder)
 
-    def get_availability(self, date_str: str) -> List[str]:
+    def _hold(self, holder: str, slots: List[str], count: int, now: float, replace: bool) -> List[str]:
+        conn = self._connection()
+        acquired = []
+        with conn:
+            if replace:
+                conn.execute("DELETE FROM slot_holds WHERE holder = ?", (holder,))
+            for slot in slots:
+                if len(acquired) >= count:
+                    break
+                if conn.execute(
+                    "SELECT 1 FROM bookings WHERE datetime = ? AND status = 'confirmed'", (slot,)
+                ).fetchone():
+                    # Booked by another worker since our slot index was refreshed
+                    continue
+                # Compare-and-set: take the slot unless another call holds it and the hold is live
+                cursor = conn.execute(
+                    "INSERT INTO slot_holds (slot, holder, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(slot) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+                    "WHERE slot_holds.expires_at <= ?",
+                    (slot, holder, now + Config.SLOT_HOLD_SECONDS, now)
+                )
+                if cursor.rowcount:
+                    acquired.append(slot)
+            if now - self._holds_swept_at > Config.SLOT_HOLD_SECONDS:
+                # Expired holds are already ignored; this only keeps the table small
+                self._holds_swept_at = now
+                conn.execute("DELETE FROM slot_holds WHERE expires_at <= ?", (now,))
+        return acquired
+
+    def _taken_elsewhere(self, holder: str, day: date, now: float) -> Set[str]:
         """
-        Mock function to return available slots for a given date.
-        Returns a list of time strings.
+        Slots of `day` held by other live calls or booked since the slot index was refreshed.
         """
-        # In a real app, this would query a DB
-        # For demo, assume 9 AM, 10 AM, 2 PM are always open
-        return ["09:00", "10:00", "14:00", "15:00"]
+        first, last = day.isoformat(), (day + timedelta(days=1)).isoformat()
+        rows = self._connection().execute(
+            "SELECT slot FROM slot_holds WHERE slot >= ? AND slot < ? AND holder != ? AND expires_at > ? "
+            "UNION SELECT datetime FROM bookings WHERE datetime >= ? AND datetime < ? AND status = 'confirmed'",
+            (first, last, holder, now, first, last)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def _release(self, holder: str):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM slot_holds WHERE holder = ?", (holder,))
 
-    def book_appointment(self, name: str, date_time_str: str, reason: str = "General") -> Dict:
+    async def book_appointment(self, name: str, date_time_str: str, reason: str = "General",
+                               holder: Optional[str] = None) -> Dict:
         """
-        Books an appointment and saves to JSON.
+        Books an appointment and saves it to the bookings database.
+        The slot's hold must belong to `holder` (or be expired/absent); if another call
+        holds or booked it, or it is not a free slot in the future (closed day, outside
+        opening hours, off the slot grid), the result has status "unavailable", the
+        reason ("taken" or "not_offered") and the next free slots.
         """
+        start = parse_datetime(date_time_str or "")
+        if start is None:
+            return {"error": f"Invalid datetime: {date_time_str}"}
         appointment = {
-            "id": len(self.appointments) + 1,
             "name": name,
-            "datetime": date_time_str,
+            "datetime": start.strftime(SLOT_FORMAT),
             "reason": reason,
             "status": "confirmed",
             "timestamp": datetime.now().isoformat()
         }
-        self.appointments.append(appointment)
-        self.save_to_json(appointment)
+        booking_id = None
+        offered = self.slots.is_slot(start) and start > datetime.now()
+        if offered and self.slots.is_free(start):
+            booking_id = await self._write(self._confirm, holder, appointment, time.time())
+        if booking_id is None:
+            print(f"Slot {appointment['datetime']} is {'no longer available' if offered else 'not offered'}")
+            await self.refresh_slots(force=True)
+            return {
+                "status": "unavailable",
+                "reason": "taken" if offered else "not_offered",
+                "name": name,
+                "datetime": appointment["datetime"],
+                "next_available": await self.get_next_available(start, holder=holder),
+            }
+        appointment["id"] = booking_id
+        # Indexes this booking together with any made elsewhere in the meantime
+        await self.refresh_slots(force=True)
+        print(f"Booking {appointment['id']} saved to {self.db_path}")
         return appointment
 
-    def save_to_json(self, booking_data: Dict):
+    def _confirm(self, holder: Optional[str], appointment: Dict, now: float) -> Optional[int]:
         """
-        Appends booking data to a local JSON file.
+        Consumes the hold and inserts the booking in one transaction; the caller's
+        other holds are released. Returns None when another call holds the slot or
+        it is already booked.
         """
-        file_path = "bookings.json"
-        existing_data = []
-        try:
-            if os.path.exists(file_path):
-                with open(file_path, "r") as f:
-                    existing_data = json.load(f)
-        except Exception as e:
-            print(f"Error reading bookings.json: {e}")
+        conn = self._connection()
+        slot = appointment["datetime"]
+        with conn:
+            # The first write takes the database write lock, so check-and-insert is atomic
+            conn.execute(
+                "DELETE FROM slot_holds WHERE slot = ? AND (holder = ? OR expires_at <= ?)",
+                (slot, holder or "", now)
+            )
+            if conn.execute("SELECT 1 FROM slot_holds WHERE slot = ?", (slot,)).fetchone():
+                return None
+            try:
+                cursor = conn.execute(
+                    "INSERT INTO bookings (name, datetime, reason, status, timestamp) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        appointment["name"],
+                        appointment["datetime"],
+                        appointment["reason"],
+                        appointment["status"],
+                        appointment["timestamp"]
+                    )
+                )
+            except sqlite3.IntegrityError:
+                # Conflict guard (idx_bookings_confirmed_slot): booked by another call
+                return None
+            if holder:
+                conn.execute("DELETE FROM slot_holds WHERE holder = ?", (holder,))
+        return cursor.lastrowid
 
-        existing_data.append(booking_data)
-        
-        try:
-            with open(file_path, "w") as f:
-                json.dump(existing_data, f, indent=4)
-            print(f"Booking saved to {file_path}")
-        except Exception as e:
-            print(f"Error writing to bookings.json: {e}")
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+# Tool definitions shared by every call
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "check_availability",
+            "description": "Check available appointment slots for a specific date",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "date": {"type": "string", "description": "YYYY-MM-DD format"},
+                },
+                "required": ["date"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "book_appointment",
+            "description": "Book a new appointment",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "description": "Patient name"},
+                    "datetime": {"type": "string", "description": "YYYY-MM-DD HH:MM format"},
+                    "reason": {"type": "string", "description": "Reason for visit"},
+                },
+                "required": ["name", "datetime"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "terminate_call",
+            "description": "Ends the call when the user is finished and no more assistance is needed.",
+            "parameters": {
+                "type": "object",
+                "properties": {},
+            },
+        },
+    }
+]
+
+# Tools that hold or release the caller's slot holds
+HOLDING_TOOLS = {"check_availability", "book_appointment"}
+
+
+class CallSession:
+    """
+    Per-call conversation state: history, flags and the booking service handle.
+    One session is created per media stream so concurrent calls never share state.
+    """
+    def __init__(self, stream_sid: str, call_sid: Optional[str], booking_service: BookingService):
+        self.stream_sid = stream_sid
+        self.call_sid = call_sid
+        self.booking_service = booking_service
+        self.history = ConversationHistory(
+            Config.ASSISTANT_PROMPT,
+            Config.HISTORY_TOKEN_BUDGET,
+            Config.HISTORY_KEEP_TURNS
+        )
+        self.language = "en"        # Last detected caller language (en/fr/de)
+        self.booking_flag = False   # Set when a committed turn confirmed a booking
+        self.terminate_flag = False # Set when a committed turn ends the call
+
+    @property
+    def state_key(self) -> str:
+        # Keyed by call so the state survives a new media stream on the same call
+        return self.call_sid or self.stream_sid
+
+    def to_state(self) -> Dict:
+        """
+        JSON-serializable state kept in the call-state store between turns.
+        """
+        return {
+            "stream_sid": self.stream_sid,
+            "call_sid": self.call_sid,
+            "history": self.history.to_dict(),
+            "language": self.language,
+            "booking_flag": self.booking_flag,
+            "terminate_flag": self.terminate_flag,
+        }
+
+    def restore(self, state: Dict):
+        self.history.restore(state.get("history", {}))
+        self.language = state.get("language", self.language)
+        self.booking_flag = state.get("booking_flag", False)
+        self.terminate_flag = state.get("terminate_flag", False)
+
+class TurnFlags:
+    """
+    Hangup flags and caller language decided by one turn. They are copied to the
+    session only when the turn is committed, so a speculative turn never changes
+    those of the turn before it.
+    """
+    def __init__(self):
+        self.booking = False    # A booking was confirmed
+        self.terminate = False  # The call should end
+        self.language = None    # Caller language of this turn (en/fr/de)
+
+    def commit(self, session: CallSession):
+        session.booking_flag = self.booking
+        session.terminate_flag = self.terminate
+        if self.language:
+            session.language = self.language
 
 class LLMService:
+    """
+    Shared, stateless LLM client. All per-call state lives on CallSession.
+    """
     def __init__(self):
-        self.client = openai.AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+        self.http_client = openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=Config.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.LLM_MAX_CONNECTIONS
+            )
+        )
+        self.client = openai.AsyncOpenAI(
+            api_key=Config.OPENAI_API_KEY,
+            base_url=Config.OPENAI_BASE_URL,
+            http_client=self.http_client
+        )
         self.booking_service = BookingService()
-        self.booking_flag = False   # Set when a booking is confirmed
-        self.terminate_flag = False # Set when the call should end
 
-    async def get_response(self, conversation_history: List[Dict]):
+    async def warm_up(self, connections: int = Config.WARMUP_CONNECTIONS) -> int:
+        return await open_connections(self.http_client, str(self.client.base_url), connections)
+
+    async def close(self):
+        await self.client.close()
+        await asyncio.to_thread(self.booking_service.close)
+
+    def create_session(self, stream_sid: str, call_sid: Optional[str] = None) -> CallSession:
+        return CallSession(stream_sid, call_sid, self.booking_service)
+
+    async def get_response(self, session: CallSession, turn: List[Dict], gate: Optional[asyncio.Event] = None,
+                           trace: Optional[TurnTrace] = None, flags: Optional[TurnFlags] = None):
         """
-        Generates a streaming response from the LLM.
+        Generates a streaming response from the LLM for one turn of the given call.
+        `turn` holds the new messages of this turn (starting with the user message);
+        tool calls and results are appended to it, and the caller commits it to history
+        (and `flags`, set by the tools, to the session).
+        If `gate` is given (speculative turn), tools are only executed once it is set.
         """
-        self.booking_flag = False
-        self.terminate_flag = False
-        
-        tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "check_availability",
-                    "description": "Check available appointment slots for a specific date",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "date": {"type": "string", "description": "YYYY-MM-DD format"},
-                        },
-                        "required": ["date"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "book_appointment",
-                    "description": "Book a new appointment",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string", "description": "Patient name"},
-                            "datetime": {"type": "string", "description": "YYYY-MM-DD HH:MM format"},
-                            "reason": {"type": "string", "description": "Reason for visit"},
-                        },
-                        "required": ["name", "datetime"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "terminate_call",
-                    "description": "Ends the call when the user is finished and no more assistance is needed.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {},
-                    },
-                },
-            }
-        ]
+        flags = flags or TurnFlags()
+        flags.language = detect_language(turn[0].get("content") or "") or session.language
+        conversation_history = session.history.messages() + turn
 
+        if trace:
+            trace.mark("llm_request_sent")
         response = await self.client.chat.completions.create(
             model="gpt-4o-mini",
             messages=conversation_history,
-            tools=tools,
+            tools=TOOLS,
             tool_choice="auto",
             stream=True
         )
@@ -150,13 +483,10 @@ class LLMService:
 
         # If tool calls were made, we need to execute them and get a second response
         if tool_calls:
-            # Construct a message object compatible with OpenAI's expected format for tool_calls
-            # Converting dict to a simple object for history injection if needed, 
-            # but usually OpenAI client handles dicts in messages list.
-            
-            # For simplicity in this async generator, if a tool is called, we wait, execute, 
-            # and then stream the final response.
-            
+            # Tools have side effects (bookings), so a speculative turn waits for its commit
+            if gate:
+                await gate.wait()
+
             # 1. Add assistant message with tool calls
             assistant_message = {
                 "role": "assistant",
@@ -164,66 +494,198 @@ class LLMService:
                 "tool_calls": tool_calls
             }
             conversation_history.append(assistant_message)
+            turn.append(assistant_message)
             
             # 2. Execute tools
-            for tc in tool_calls:
-                function_name = tc["function"]["name"]
-                arguments = json.loads(tc["function"]["arguments"])
-                
-                tool_result = None
-                if function_name == "check_availability":
-                    tool_result = self.booking_service.get_availability(arguments.get("date"))
-                elif function_name == "book_appointment":
-                    tool_result = self.booking_service.book_appointment(
-                        arguments.get("name"), 
-                        arguments.get("datetime"), 
-                        arguments.get("reason")
-                    )
-                    self.booking_flag = True
-                elif function_name == "terminate_call":
-                    self.terminate_flag = True
-                    tool_result = {"status": "Call termination initiated."}
-
-                conversation_history.append({
+            results = await self._execute_tools(session, tool_calls, flags)
+            for tc, tool_result in zip(tool_calls, results):
+                tool_message = {
                     "role": "tool",
                     "tool_call_id": tc["id"],
                     "content": json.dumps(tool_result)
-                })
+                }
+                conversation_history.append(tool_message)
+                turn.append(tool_message)
+
+            # 3. Fast path: deterministic results are spoken from templates right away
+            spoken = []
+            if Config.TOOL_FAST_PATH:
+                spoken = [
+                    render_tool_response(tc["function"]["name"], tool_result, flags.language,
+                                         max_times=Config.SLOT_HOLD_OFFERED)
+                    for tc, tool_result in zip(tool_calls, results)
+                ]
+            if spoken and all(spoken):
+                yield " ".join(spoken)
+                return
 
-            # 3. Get final streaming response
-            second_response = await self.client.chat.completions.create(
+            # 4. Otherwise get a follow-up streaming response. Templated parts are spoken
+            # while the follow-up request is in flight, and the model continues after them.
+            bridge = " ".join(text for text in spoken if text)
+            if bridge:
+                conversation_history.append({"role": "assistant", "content": bridge})
+            second_request = asyncio.create_task(self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=conversation_history,
                 stream=True
-            )
+            ))
+            try:
+                if bridge:
+                    yield bridge + " "
+                second_response = await second_request
+            finally:
+                if not second_request.done():
+                    second_request.cancel()
             
             async for chunk in second_response:
                 if chunk.choices[0].delta.content:
                     yield chunk.choices[0].delta.content
 
+    async def get_intent_response(self, session: CallSession, match: IntentMatch,
+                                  trace: Optional[TurnTrace] = None, flags: Optional[TurnFlags] = None):
+        """
+        Answers a locally classified emergency or farewell without the model.
+        A farewell ends the call exactly like the `terminate_call` tool.
+        """
+        if flags:
+            flags.terminate = match.intent == FAREWELL
+            flags.language = match.language
+        if trace:
+            trace.mark("intent_fast_path")
+        yield render_intent_response(match.intent, match.language)
+
+    @staticmethod
+    def _parse_arguments(tool_call: Dict) -> Dict:
+        try:
+            return json.loads(tool_call["function"]["arguments"] or "{}")
+        except json.JSONDecodeError:
+            return {}
+
+    async def _execute_tools(self, session: CallSession, tool_calls: List[Dict], flags: TurnFlags) -> List:
+        """
+        Runs the tool calls of one turn and returns their results in order. Calls that
+        hold slots for the caller run one after the other, the later ones adding to the
+        holds of the first, so two check_availability calls keep both days' slots held.
+        The other calls run concurrently.
+        """
+        arguments = [self._parse_arguments(tc) for tc in tool_calls]
+        names = [tc["function"]["name"] for tc in tool_calls]
+        results = [None] * len(tool_calls)
+
+        async def run(i: int, replace_holds: bool = True):
+            results[i] = await self._execute_tool(session, names[i], arguments[i], flags, replace_holds)
+
+        async def run_holding(indexes: List[int]):
+            for position, i in enumerate(indexes):
+                await run(i, replace_holds=position == 0)
+
+        holding = [i for i, name in enumerate(names) if name in HOLDING_TOOLS]
+        await asyncio.gather(run_holding(holding), *(run(i) for i in range(len(names)) if i not in holding))
+        return results
+
+    async def _execute_tool(self, session: CallSession, function_name: str, arguments: Dict, flags: TurnFlags,
+                            replace_holds: bool = True):
+        """
+        Runs one tool call and returns its JSON-serializable result.
+        """
+        try:
+            if function_name == "check_availability":
+                available = await session.booking_service.get_availability(
+                    arguments.get("date"), holder=session.state_key, replace=replace_holds
+                )
+                tool_result = {"date": arguments.get("date"), "available_times": available}
+                if not available:
+                    tool_result["next_available"] = await session.booking_service.get_next_available(
+                        parse_datetime(arguments.get("date") or ""), holder=session.state_key,
+                        replace=replace_holds
+                    )
+                return tool_result
+            elif function_name == "book_appointment":
+                tool_result = await session.booking_service.book_appointment(
+                    arguments.get("name"), 
+                    arguments.get("datetime"), 
+                    arguments.get("reason"),
+                    holder=session.state_key
+                )
+                flags.booking = tool_result.get("status") == "confirmed"
+                return tool_result
+            elif function_name == "terminate_call":
+                flags.terminate = True
+                return {"status": "Call termination initiated."}
+        except Exception as e:
+            print(f"[LLM] Tool {function_name} failed: {e}")
+            return {"error": str(e)}
+        return None
+
+    async def summarize(self, previous_summary: str, messages: List[Dict]) -> str:
+        """
+        Folds older conversation turns into a compact running summary.
+        """
+        transcript = "\n".join(
+            f"{m['role']}: {m.get('content') or json.dumps(m.get('tool_calls'))}" for m in messages
+        )
+        response = await self.client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": "Summarize this phone conversation between a clinic receptionist and a patient in at most 80 words. Keep the patient's name, requested or booked dates and times, reason for visit, language, and any open questions."},
+                {"role": "user", "content": f"Previous summary: {previous_summary or 'None'}\n\nNew conversation:\n{transcript}"}
+            ],
+            max_tokens=200
+        )
+        return response.choices[0].message.content or previous_summary
+
+    def compact_history(self, session: CallSession):
+        """
+        Folds old turns into the summary in the background when over the token budget.
+        """
+        session.history.compact(self.summarize)
+
 class TTSService:
+    # Twilio media frames are 20 ms of 8 kHz mulaw audio
+    FRAME_BYTES = 160
+
     def __init__(self):
         self.api_key = Config.DEEPGRAM_API_KEY
+        self.model = Config.TTS_MODEL
+        self.encoding = Config.TTS_ENCODING
+        self.sample_rate = Config.TTS_SAMPLE_RATE
         # Correct Deepgram URL for TTS
-        self.url = "https://api.deepgram.com/v1/speak?model=aura-asteria-en&encoding=mulaw&sample_rate=8000"
+        self.url = f"{Config.DEEPGRAM_API_URL}/v1/speak?model={self.model}&encoding={self.encoding}&sample_rate={self.sample_rate}"
         self.client = httpx.AsyncClient(timeout=10.0)
+        self.cache = PhraseCache(
+            Config.TTS_CACHE_DIR, Config.TTS_CACHE_MEMORY_BYTES, Config.TTS_CACHE_DISK_BYTES
+        ) if Config.TTS_CACHE_ENABLED else None
 
-    async def generate_audio(self, text: str) -> Optional[bytes]:
-        """
-        Generates mulaw 8000Hz audio from text using Deepgram Speak API.
-        Returns raw bytes if successful.
-        """
-        header = {
+    def _headers(self) -> Dict:
+        return {
             "Authorization": f"Token {self.api_key}",
             "Content-Type": "application/json"
         }
+
+    def _cache_key(self, text: str) -> str:
+        return PhraseCache.make_key(self.model, self.encoding, self.sample_rate, text)
+
+    async def generate_audio(self, text: str, persist: bool = False) -> Optional[bytes]:
+        """
+        Generates mulaw 8000Hz audio from text using Deepgram Speak API.
+        Returns raw bytes if successful. Cached phrases skip the network entirely;
+        only `persist` phrases (fixed wording, no caller data) are cached on disk.
+        """
+        if self.cache:
+            cache_key = self._cache_key(text)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         payload = {
             "text": text
         }
         
         try:
-            response = await self.client.post(self.url, headers=header, json=payload)
+            response = await self.client.post(self.url, headers=self._headers(), json=payload)
             if response.status_code == 200:
+                if self.cache:
+                    await self.cache.put(cache_key, response.content, persist=persist)
                 return response.content
             else:
                 print(f"[TTS] Error: {response.status_code} - {response.text}")
@@ -232,5 +694,124 @@ class TTSService:
             print(f"[TTS] Exception: {e}")
             return None
 
+    async def stream_audio(self, text: str, persist: bool = False) -> AsyncIterator[bytes]:
+        """
+        Streams mulaw 8000Hz audio from the Deepgram Speak API as it arrives,
+        sliced into 20 ms (160-byte) Twilio media frames. The clip is cached like
+        in generate_audio.
+        """
+        if self.cache:
+            cache_key = self._cache_key(text)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                for offset in range(0, len(cached), self.FRAME_BYTES):
+                    yield cached[offset:offset + self.FRAME_BYTES]
+                return
+
+        payload = {
+            "text": text
+        }
+        buffer = bytearray()
+        clip = bytearray()
+
+        try:
+            async with self.client.stream("POST", self.url, headers=self._headers(), json=payload) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    print(f"[TTS] Error: {response.status_code} - {body.decode(errors='replace')}")
+                    return
+                async for data in response.aiter_bytes():
+                    buffer.extend(data)
+                    if self.cache:
+                        clip.extend(data)
+                    while len(buffer) >= self.FRAME_BYTES:
+                        yield bytes(buffer[:self.FRAME_BYTES])
+                        del buffer[:self.FRAME_BYTES]
+        except Exception as e:
+            print(f"[TTS] Exception: {e}")
+            return
+
+        if buffer:
+            yield bytes(buffer)
+        if self.cache and clip:
+            await self.cache.put(cache_key, bytes(clip), persist=persist)
+
+    async def prewarm(self, phrases: List[str], pin: bool = False):
+        """
+        Pre-synthesizes frequently spoken phrases so they are served from the cache.
+        Pinned phrases are loaded into memory and kept there.
+        """
+        if not self.cache:
+            return
+        missing = [p for p in phrases if p.strip() and not self.cache.contains(self._cache_key(p))]
+        if missing:
+            semaphore = asyncio.Semaphore(Config.TTS_MAX_CONCURRENCY)
+
+            async def warm(phrase: str):
+                async with semaphore:
+                    await self.generate_audio(phrase, persist=True)
+
+            await asyncio.gather(*(warm(p) for p in missing))
+        if pin:
+            for phrase in phrases:
+                key = self._cache_key(phrase)
+                if await self.cache.get(key) is not None:
+                    self.cache.pin(key)
+        print(f"[TTS Cache] Pre-warmed {len(phrases)} phrases ({len(missing)} synthesized)")
+
+    async def warm_up(self, connections: int = Config.WARMUP_CONNECTIONS) -> int:
+        return await open_connections(self.client, self.url, connections, headers=self._headers())
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class CallControlService:
+    """
+    Async Twilio call control (hangup, redirect) over a pooled keep-alive client,
+    so a REST round-trip never blocks the event loop shared by the other calls.
+    """
+    def __init__(self):
+        self.url = f"{Config.TWILIO_API_URL}/2010-04-01/Accounts/{Config.TWILIO_ACCOUNT_SID}/Calls"
+        self.retries = Config.CALL_CONTROL_RETRIES
+        self.client = httpx.AsyncClient(
+            auth=(Config.TWILIO_ACCOUNT_SID or "", Config.TWILIO_AUTH_TOKEN or ""),
+            timeout=httpx.Timeout(Config.CALL_CONTROL_TIMEOUT, connect=2.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)
+        )
+
+    async def hangup(self, call_sid: str) -> bool:
+        return await self._update(call_sid, {"Status": "completed"})
+
+    async def redirect(self, call_sid: str, twiml: Optional[str] = None, url: Optional[str] = None) -> bool:
+        """
+        Replaces the call's TwiML, either inline or by fetching it from `url`.
+        """
+        form = {"Twiml": twiml} if twiml else {"Url": url, "Method": "POST"}
+        return await self._update(call_sid, form)
+
+    async def _update(self, call_sid: str, form: Dict) -> bool:
+        """
+        POSTs a call update. Network errors, 429 and 5xx are retried with exponential
+        backoff; other errors (e.g. 404 once the call has ended) are not.
+        """
+        url = f"{self.url}/{call_sid}.json"
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.post(url, data=form)
+                if response.status_code < 300:
+                    return True
+                print(f"[Twilio] Call update failed: {response.status_code} - {response.text}")
+                if response.status_code != 429 and response.status_code < 500:
+                    return False
+            except httpx.HTTPError as e:
+                print(f"[Twilio] Call update error: {e!r}")
+            if attempt < self.retries:
+                await asyncio.sleep(0.25 * 2 ** attempt)
+        return False
+
+    async def warm_up(self, connections: int = 1) -> int:
+        return await open_connections(self.client, f"{self.url}.json", connections)
+
     async def close(self):
         await self.client.aclose()
@@ -0,0 +1,81 @@
+import asyncio
+import re
+from typing import Dict, Optional
+from config import Config
+from metrics import TurnTrace
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_utterance(text: str) -> str:
+    return " ".join(_NON_WORD.sub("", text.lower()).split())
+
+
+def is_plausible_utterance(text: str) -> bool:
+    """
+    True when the finalized fragments look like a complete utterance
+    (smart_format punctuation at the end and enough words).
+    """
+    text = text.strip()
+    if not text or text[-1] not in ".?!":
+        return False
+    return len(text.split()) >= Config.SPECULATIVE_MIN_WORDS
+
+
+class SpeculationStats:
+    """
+    Counts speculative turns that were committed vs. thrown away.
+    Per-call instances roll up into the process-wide `speculation_stats`.
+    """
+    def __init__(self, parent: Optional["SpeculationStats"] = None):
+        self.parent = parent
+        self.started = 0
+        self.committed = 0
+        self.wasted = 0
+
+    def record(self, outcome: str):
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        if self.parent:
+            self.parent.record(outcome)
+
+    def as_dict(self) -> Dict:
+        return {
+            "started": self.started,
+            "committed": self.committed,
+            "wasted": self.wasted,
+            "commit_rate": self.committed / self.started if self.started else 0.0,
+            "waste_rate": self.wasted / self.started if self.started else 0.0,
+        }
+
+
+speculation_stats = SpeculationStats()
+
+
+class Speculation:
+    """
+    A turn started before `speech_final`. The task runs the LLM (and TTS) with its
+    output held behind `release`; it is either committed when the final transcript
+    matches or cancelled when the caller keeps talking.
+    """
+    def __init__(self, text: str, task: asyncio.Task, release: asyncio.Event, stats: SpeculationStats,
+                 trace: TurnTrace):
+        self.text = text
+        self.trace = trace
+        self.key = normalize_utterance(text)
+        self.task = task
+        self.release = release
+        self.stats = stats
+        stats.record("started")
+
+    def matches(self, text: str) -> bool:
+        return normalize_utterance(text) == self.key
+
+    def commit(self) -> asyncio.Task:
+        self.release.set()
+        self.stats.record("committed")
+        return self.task
+
+    def discard(self):
+        if not self.task.done():
+            self.task.cancel()
+        self.stats.record("wasted")
@@ -0,0 +1,212 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Deque, Dict, Optional
+from config import Config
+from metrics import metrics
+
+
+class STTSession:
+    """
+    An open Deepgram live connection and the exit stack that closes it.
+    """
+    def __init__(self, connection, stack: AsyncExitStack, open_seconds: float):
+        self.connection = connection
+        self.stack = stack
+        self.open_seconds = open_seconds
+        self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        websocket = getattr(self.connection, "_websocket", None)
+        return websocket is None or getattr(websocket, "open", True)
+
+    async def keep_alive(self) -> bool:
+        try:
+            await self.connection.send_keep_alive()
+            return True
+        except Exception:
+            return False
+
+    async def close(self):
+        try:
+            await self.connection.send_close_stream()
+        except Exception:
+            pass
+        try:
+            await self.stack.aclose()
+        except Exception as e:
+            print(f"[STT] Error closing session: {e}")
+
+
+class STTConnectionManager:
+    """
+    Opens Deepgram live sessions ahead of the media stream.
+    `prepare(call_sid)` runs when the webhook returns TwiML, so the TLS and WebSocket
+    handshakes overlap with Twilio connecting the stream; `session(call_sid)` then hands
+    over the ready connection. A small warm pool covers streams without a prepared
+    session (e.g. the webhook was served by another worker). Idle sessions are kept
+    open with KeepAlive messages and recycled after STT_POOL_MAX_AGE seconds.
+    """
+    def __init__(self, client, options: Dict):
+        self.client = client
+        self.options = options
+        self._prepared: Dict[str, asyncio.Task] = {}
+        self._prepared_at: Dict[str, float] = {}
+        self._pool: Deque[STTSession] = deque()
+        self._opening = 0
+        self._open_seconds = 0.5          # running average of the handshake time
+        self._maintenance: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._maintenance = asyncio.create_task(self._maintain())
+
+    @property
+    def pool_target(self) -> int:
+        """
+        Enough warm sessions to cover the calls expected to arrive while replacements
+        are being opened, capped at STT_POOL_MAX.
+        """
+        if Config.STT_CALLS_PER_MINUTE <= 0:
+            return 0
+        arrivals = Config.STT_CALLS_PER_MINUTE / 60 * self._open_seconds * 2
+        return min(Config.STT_POOL_MAX, max(1, math.ceil(arrivals)))
+
+    def prepare(self, call_sid: str):
+        """
+        Starts opening (or reserves from the pool) the STT session of an incoming call.
+        """
+        if not call_sid or call_sid in self._prepared:
+            return
+        session = self._take_pooled()
+        if session:
+            task = asyncio.get_running_loop().create_future()
+            task.set_result(session)
+        else:
+            task = asyncio.create_task(self._open())
+        self._prepared[call_sid] = task
+        self._prepared_at[call_sid] = time.monotonic()
+        self._refill()
+
+    @asynccontextmanager
+    async def session(self, call_sid: Optional[str]):
+        session = await self._acquire(call_sid)
+        try:
+            yield session.connection
+        finally:
+            await session.close()
+
+    async def _acquire(self, call_sid: Optional[str]) -> STTSession:
+        task = self._prepared.pop(call_sid, None) if call_sid else None
+        self._prepared_at.pop(call_sid, None)
+        if task is not None:
+            try:
+                session = await task
+                if session.is_open:
+                    metrics.inc("voice_stt_sessions_total", "STT sessions handed to media streams", 'source="webhook"')
+                    return session
+                await session.close()
+            except Exception as e:
+                print(f"[STT] Prepared session for {call_sid} failed: {e}")
+
+        session = self._take_pooled()
+        self._refill()
+        if session:
+            metrics.inc("voice_stt_sessions_total", "STT sessions handed to media streams", 'source="pool"')
+            return session
+        metrics.inc("voice_stt_sessions_total", "STT sessions handed to media streams", 'source="cold"')
+        return await self._open()
+
+    def _take_pooled(self) -> Optional[STTSession]:
+        while self._pool:
+            session = self._pool.popleft()
+            if session.is_open:
+                return session
+            asyncio.create_task(session.close())
+        return None
+
+    async def _open(self) -> STTSession:
+        started = time.monotonic()
+        stack = AsyncExitStack()
+        try:
+            connection = await stack.enter_async_context(self.client.listen.v1.connect(**self.options))
+        except BaseException:
+            await stack.aclose()
+            raise
+        elapsed = time.monotonic() - started
+        self._open_seconds = 0.8 * self._open_seconds + 0.2 * elapsed
+        metrics.histogram("voice_stt_connect_seconds", "Deepgram live session handshake time").observe(elapsed)
+        return STTSession(connection, stack, elapsed)
+
+    def _refill(self):
+        missing = self.pool_target - len(self._pool) - self._opening
+        for _ in range(max(0, missing)):
+            self._opening += 1
+            asyncio.create_task(self._open_pooled())
+
+    async def _open_pooled(self):
+        try:
+            self._pool.append(await self._open())
+        except Exception as e:
+            print(f"[STT] Warm pool connect failed: {e}")
+        finally:
+            self._opening -= 1
+
+    async def _maintain(self):
+        """
+        Keeps idle sessions alive, recycles old ones and drops prepared sessions
+        whose media stream never arrived.
+        """
+        self._refill()
+        while True:
+            await asyncio.sleep(Config.STT_KEEPALIVE_SECONDS)
+            try:
+                await self._maintain_once()
+            except Exception as e:
+                print(f"[STT] Pool maintenance failed: {e}")
+
+    async def _maintain_once(self):
+        now = time.monotonic()
+        for call_sid, prepared_at in list(self._prepared_at.items()):
+            if now - prepared_at > Config.STT_PREPARED_TTL:
+                self._prepared_at.pop(call_sid, None)
+                task = self._prepared.pop(call_sid, None)
+                if task:
+                    asyncio.create_task(self._discard(task))
+        idle = [t.result() for t in self._prepared.values() if t.done() and not t.cancelled() and not t.exception()]
+        idle.extend(self._pool)
+        for session in idle:
+            if now - session.opened_at > Config.STT_POOL_MAX_AGE or not await session.keep_alive():
+                if session in self._pool:
+                    self._pool.remove(session)
+                    await session.close()
+        self._refill()
+
+    @staticmethod
+    async def _discard(task: asyncio.Future):
+        try:
+            session = await task
+        except Exception:
+            return
+        await session.close()
+
+    def stats(self) -> Dict:
+        return {
+            "prepared": len(self._prepared),
+            "pool": len(self._pool),
+            "pool_target": self.pool_target,
+            "open_seconds_avg": round(self._open_seconds, 3),
+        }
+
+    async def close(self):
+        if self._maintenance:
+            self._maintenance.cancel()
+        tasks = list(self._prepared.values())
+        self._prepared.clear()
+        self._prepared_at.clear()
+        for task in tasks:
+            await self._discard(task)
+        while self._pool:
+            await self._pool.popleft().close()
@@ -0,0 +1,90 @@
+import asyncio
+import json
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from services import BookingService, LLMService, TurnFlags
+
+
+def _next_day(open_: bool = True) -> date:
+    day = date.today() + timedelta(days=1)
+    while (day.weekday() in Config.CLINIC_OPEN_DAYS) != open_:
+        day += timedelta(days=1)
+    return day
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = BookingService(str(tmp_path / "bookings.db"))
+    yield service
+    service.close()
+
+
+def test_availability_lists_the_whole_day_to_every_caller(service):
+    day = _next_day().isoformat()
+
+    async def scenario():
+        free = await service.get_availability(day)
+        first = await service.get_availability(day, holder="call-1")
+        second = await service.get_availability(day, holder="call-2")
+        booked = await service.book_appointment("Second Caller", f"{day} 15:00", holder="call-2")
+        return free, first, second, booked
+
+    free, first, second, booked = asyncio.run(scenario())
+
+    assert first == free
+    # The slots read out to the first caller are held for it and left out for the second
+    held = first[:Config.SLOT_HOLD_OFFERED]
+    assert second == [t for t in first if t not in held]
+    assert "15:00" in second
+    assert booked["status"] == "confirmed"
+
+
+@pytest.mark.parametrize("start", [
+    f"{_next_day()} 03:00",
+    f"{_next_day(open_=False)} 10:00",
+    f"{_next_day()} 09:10",
+    f"{_next_day()} {Config.CLINIC_CLOSE_TIME}",
+    f"{date.today() - timedelta(days=7)} 10:00",
+])
+def test_times_the_clinic_does_not_offer_are_not_booked(service, start):
+    result = asyncio.run(service.book_appointment("Night Owl", start, holder="call-1"))
+
+    assert result["status"] == "unavailable"
+    assert result["reason"] == "not_offered"
+    assert result["next_available"]
+
+
+def test_times_with_a_utc_offset_are_booked_in_local_time(service):
+    start = datetime.combine(_next_day(), time(9, 0)).astimezone()
+
+    result = asyncio.run(service.book_appointment("Abroad Caller", start.isoformat(), holder="call-1"))
+
+    assert result["status"] == "confirmed"
+    assert result["datetime"] == f"{_next_day()} 09:00"
+
+
+def test_availability_checks_in_one_turn_keep_each_others_holds(service):
+    monday = _next_day()
+    tuesday = monday + timedelta(days=1)
+    while tuesday.weekday() not in Config.CLINIC_OPEN_DAYS:
+        tuesday += timedelta(days=1)
+    session = SimpleNamespace(booking_service=service, state_key="call-1")
+    tool_calls = [
+        {"id": f"call_{day}", "function": {"name": "check_availability", "arguments": json.dumps({"date": str(day)})}}
+        for day in (monday, tuesday)
+    ]
+
+    async def scenario():
+        results = await LLMService._execute_tools(LLMService.__new__(LLMService), session, tool_calls, TurnFlags())
+        other = [await service.get_availability(str(day), holder="call-2") for day in (monday, tuesday)]
+        return results, other
+
+    results, other = asyncio.run(scenario())
+
+    for result, seen_by_other in zip(results, other):
+        held = result["available_times"][:Config.SLOT_HOLD_OFFERED]
+        assert not set(held) & set(seen_by_other)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+from datetime import date, timedelta
+
+import db
+from config import Config
+from import_json_to_sqlite import import_bookings
+from services import BookingService
+
+
+def _open_day() -> str:
+    day = date.today() + timedelta(days=1)
+    while day.weekday() not in Config.CLINIC_OPEN_DAYS:
+        day += timedelta(days=1)
+    return day.isoformat()
+
+
+DAY = _open_day()
+# The same slot as the live service stores it and as exports write it
+SLOT = f"{DAY} 09:00"
+EXPORT_SLOT = f"{DAY}T09:00:00"
+
+
+def _store(path):
+    """
+    A bookings store with one booking taken by a caller on the phone line.
+    """
+    service = BookingService(str(path))
+    try:
+        result = asyncio.run(service.book_appointment("Live Caller", SLOT, "Checkup", holder="call-1"))
+    finally:
+        service.close()
+    assert result["status"] == "confirmed"
+
+
+def _export(path, records):
+    path.write_text("\n".join(json.dumps(r) for r in records), encoding="utf-8")
+
+
+def _bookings(path):
+    conn = db.connect(str(path))
+    rows = [dict(r) for r in conn.execute("SELECT name, datetime, status FROM bookings ORDER BY datetime")]
+    conn.close()
+    return rows
+
+
+def test_live_booking_survives_a_conflicting_import(tmp_path):
+    store, export = tmp_path / "bookings.db", tmp_path / "export.jsonl"
+    _store(store)
+    _export(export, [
+        {"id": 7, "name": "Legacy Patient", "datetime": EXPORT_SLOT, "status": "confirmed",
+         "timestamp": "2026-10-01T08:00:00"},
+        {"id": 8, "name": "Other Patient", "datetime": f"{DAY}T10:00:00", "status": "confirmed",
+         "timestamp": "2026-10-01T08:05:00"},
+        {"id": 9, "name": "Garbled", "datetime": "next tuesday", "status": "confirmed",
+         "timestamp": "2026-10-01T08:10:00"},
+    ])
+
+    report = import_bookings(str(export), str(store), batch_size=10)
+
+    assert [c["name"] for c in report["conflicts"]] == ["Legacy Patient"]
+    assert [r["name"] for r in report["rejected"]] == ["Garbled"]
+    assert report["rows"] == 1
+    assert _bookings(store) == [
+        {"name": "Live Caller", "datetime": SLOT, "status": "confirmed"},
+        {"name": "Other Patient", "datetime": f"{DAY} 10:00", "status": "confirmed"},
+    ]
+
+
+def test_full_load_keeps_the_conflict_guard(tmp_path):
+    store, export = tmp_path / "bookings.db", tmp_path / "export.jsonl"
+    _store(store)
+    _export(export, [])
+    import_bookings(str(export), str(store))
+
+    conn = db.connect(str(store))
+    names = {r["name"] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert set(db.INDEXES) <= names
+
+
+def test_export_ids_do_not_overwrite_live_bookings(tmp_path):
+    store, export = tmp_path / "bookings.db", tmp_path / "export.jsonl"
+    _store(store)
+    # The live booking got id 1 from AUTOINCREMENT; the export numbers its own records
+    record = {"id": 1, "name": "Exported Patient", "datetime": f"{DAY}T11:00:00", "status": "confirmed",
+              "timestamp": "2026-10-01T08:00:00"}
+    _export(export, [record])
+    import_bookings(str(export), str(store))
+    # Re-importing an updated record updates the imported booking only
+    _export(export, [dict(record, datetime=f"{DAY}T11:30:00")])
+    import_bookings(str(export), str(store))
+
+    assert _bookings(store) == [
+        {"name": "Live Caller", "datetime": SLOT, "status": "confirmed"},
+        {"name": "Exported Patient", "datetime": f"{DAY} 11:30", "status": "confirmed"},
+    ]
+
+
+def test_incremental_import_uses_the_export_watermark(tmp_path):
+    store, export = tmp_path / "bookings.db", tmp_path / "export.jsonl"
+    first = {"id": 1, "name": "First", "datetime": f"{DAY}T10:00:00", "status": "confirmed",
+             "timestamp": "2026-09-01T08:00:00"}
+    _export(export, [first])
+    import_bookings(str(export), str(store))
+    # A phone booking newer than anything in the export
+    _store(store)
+    _export(export, [first, {"id": 2, "name": "Second", "datetime": f"{DAY}T10:30:00", "status": "confirmed",
+                             "timestamp": "2026-09-02T08:00:00"}])
+    report = import_bookings(str(export), str(store), incremental=True)
+
+    assert report["since"] == "2026-09-01T08:00:00"
+    assert report["rows"] == 1
+    assert [b["name"] for b in _bookings(store)] == ["Live Caller", "First", "Second"]
+
+
+def test_init_db_migrates_an_existing_store(tmp_path):
+    store = tmp_path / "bookings.db"
+    conn = db.connect(str(store))
+    conn.execute("CREATE TABLE bookings (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, "
+                 "datetime TEXT NOT NULL, reason TEXT, status TEXT, timestamp TEXT)")
+    conn.commit()
+    db.init_db(conn)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(bookings)")}
+    conn.close()
+    assert {"source", "external_id"} <= columns
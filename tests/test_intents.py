@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from config import Config
+from intents import EMERGENCY, FAREWELL, classify_intent
+from services import CallSession, LLMService, TurnFlags
+
+
+def _emergency_confidence(text):
+    match = classify_intent(text)
+    return match.confidence if match and match.intent == EMERGENCY else 0.0
+
+
+def _farewell_confidence(text, awaiting_close=False):
+    match = classify_intent(text, awaiting_close=awaiting_close)
+    return match.confidence if match and match.intent == FAREWELL else 0.0
+
+
+@pytest.mark.parametrize("text", [
+    "My husband collapsed and he's not breathing",
+    "I think my father is having a stroke",
+    "I have chest pain",
+    "I don't know, I have chest pain",
+    "It's not an emergency but I can't breathe",
+    "He had a heart attack and he's not breathing",
+    "J'ai mal à la poitrine",
+    "Ich habe starke Brustschmerzen",
+])
+def test_emergencies(text):
+    assert _emergency_confidence(text) >= Config.INTENT_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("text", [
+    "I'd like to book a follow-up after my stroke last year",
+    "I had chest pain last month and want a checkup",
+    "My son has a seizure disorder and needs his prescription renewed",
+    "I don't have chest pain",
+    "J'ai eu un AVC l'an dernier et je voudrais un contrôle",
+    "Ich hatte letztes Jahr einen Schlaganfall",
+    "Es ist kein Notfall",
+    "What a stroke of luck",
+])
+def test_history_and_negations_are_not_emergencies(text):
+    assert _emergency_confidence(text) < Config.INTENT_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("text", [
+    "Goodbye",
+    "No, that's all. Thank you.",
+    "Non merci, c'est tout",
+    "Nein danke, das war's.",
+])
+def test_farewells(text):
+    assert _farewell_confidence(text) >= Config.INTENT_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("text", [
+    "Yes, that's all right, see you Tuesday",
+    "That's all right",
+    "C'est tout à fait ça",
+    "Ja, das ist alles klar",
+    "No thanks, but can I also book for my son?",
+    "Bye the way, I need Monday",
+])
+def test_not_farewells(text):
+    assert _farewell_confidence(text, awaiting_close=True) < Config.INTENT_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("text", [
+    "I'm good", "No", "No thanks.", "That's it for today, thanks", "Nothing else",
+    "C'est bon", "Rien d'autre", "Alles gut", "Sonst nichts",
+])
+def test_closing_replies_need_the_closing_question(text):
+    assert _farewell_confidence(text) < Config.INTENT_CONFIDENCE_THRESHOLD
+    assert _farewell_confidence(text, awaiting_close=True) >= Config.INTENT_CONFIDENCE_THRESHOLD
+
+
+def test_intent_turn_language_reaches_the_session_on_commit():
+    session = CallSession("stream-1", None, booking_service=None)
+    match = classify_intent("Au revoir")
+    flags = TurnFlags()
+
+    async def speak():
+        responses = LLMService.get_intent_response(LLMService.__new__(LLMService), session, match, flags=flags)
+        return [chunk async for chunk in responses]
+
+    asyncio.run(speak())
+
+    # A speculative turn that is dropped leaves the session as it was
+    assert (flags.language, session.language) == ("fr", "en")
+    flags.commit(session)
+    assert session.language == "fr"
@@ -0,0 +1,75 @@
+import pytest
+
+from segmenter import SentenceSegmenter
+
+
+def _segments(text, language="en", chunk=3, **sizes):
+    """
+    Streams `text` in small chunks, like LLM tokens, and returns every segment.
+    """
+    segmenter = SentenceSegmenter(language, **sizes)
+    segments = []
+    for i in range(0, len(text), chunk):
+        segments += segmenter.push(text[i:i + chunk])
+    return segments + segmenter.flush()
+
+
+# Small sizes so every sentence boundary is a cut
+EVERY_SENTENCE = {"first_min_chars": 1, "min_chars": 1, "max_chars": 240}
+
+
+@pytest.mark.parametrize("language, text, kept", [
+    ("en", "Your appointment is at 10.30 tomorrow. See you then.", "10.30"),
+    ("en", "You will see Dr. Smith on Monday. Goodbye.", "Dr. Smith"),
+    ("de", "Bringen Sie z.B. Ihre Karte mit. Bis dann.", "z.B. Ihre"),
+    ("de", "Ihr Termin ist am 5. März um 9 Uhr. Bis dann.", "5. März"),
+    ("fr", "Vous verrez M. Dupont lundi. Au revoir.", "M. Dupont"),
+])
+def test_periods_that_do_not_end_a_sentence(language, text, kept):
+    segments = _segments(text, language, **EVERY_SENTENCE)
+    assert len(segments) == 2
+    assert kept in segments[0]
+
+
+def test_abbreviation_that_ends_a_sentence():
+    segments = _segments("Your appointment is at 9 a.m. See you then.", **EVERY_SENTENCE)
+    assert segments == ["Your appointment is at 9 a.m.", "See you then."]
+
+
+def test_first_segment_is_cut_at_a_long_enough_clause():
+    segmenter = SentenceSegmenter("en", first_min_chars=20, min_chars=60, max_chars=240)
+    # Too short a clause is not cut on its own
+    assert segmenter.push("Sure, ") == []
+    assert segmenter.push("I can help you with that, ") == ["Sure, I can help you with that,"]
+
+
+def test_later_segments_group_sentences_up_to_min_chars():
+    text = "Hello there. One. Two. Three. This sentence makes the group long enough. Bye now."
+    segments = _segments(text, first_min_chars=20, min_chars=60, max_chars=240)
+    assert segments == [
+        "Hello there.",
+        "One. Two. Three. This sentence makes the group long enough.",
+        "Bye now.",
+    ]
+
+
+def test_segments_never_exceed_max_chars():
+    text = " ".join(["word"] * 100)
+    segments = _segments(text, first_min_chars=20, min_chars=60, max_chars=50)
+    assert len(segments) > 1
+    assert all(len(s) <= 50 for s in segments)
+    assert " ".join(segments) == text
+
+
+def test_flush_returns_the_rest():
+    segmenter = SentenceSegmenter("en", first_min_chars=20, min_chars=60, max_chars=240)
+    assert segmenter.push("Thank you. See you on Tuesday") == ["Thank you."]
+    assert segmenter.flush() == ["See you on Tuesday"]
+    assert segmenter.flush() == []
+
+
+def test_flush_decides_a_period_at_the_end_of_the_stream():
+    segmenter = SentenceSegmenter("en", first_min_chars=20, min_chars=60, max_chars=240)
+    # Without more text the period after "Dr." could still be an abbreviation
+    assert segmenter.push("Please ask for Dr.") == []
+    assert segmenter.flush() == ["Please ask for Dr."]
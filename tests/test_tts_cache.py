@@ -0,0 +1,39 @@
+import asyncio
+import os
+
+from tts_cache import PhraseCache
+
+
+def _files(path):
+    return sorted(name for name in os.listdir(path) if name.endswith(".audio"))
+
+
+def test_only_persisted_phrases_are_written_to_disk(tmp_path):
+    cache = PhraseCache(str(tmp_path), max_memory_bytes=1024, max_disk_bytes=1024)
+
+    async def scenario():
+        await cache.put("greeting", b"a" * 10, persist=True)
+        await cache.put("thank-you-name", b"b" * 10)
+        return await cache.get("thank-you-name")
+
+    assert asyncio.run(scenario()) == b"b" * 10
+    assert _files(tmp_path) == ["greeting.audio"]
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = PhraseCache(str(tmp_path), max_memory_bytes=0, max_disk_bytes=25)
+
+    async def scenario():
+        await cache.put("pinned", b"p" * 10, persist=True)
+        cache.pin("pinned")
+        await cache.put("old", b"o" * 10, persist=True)
+        await cache.put("new", b"n" * 10, persist=True)
+
+    asyncio.run(scenario())
+    assert _files(tmp_path) == ["new.audio", "pinned.audio"]
+    assert cache.stats()["disk_bytes"] == 20
+
+    # A restart with a smaller budget trims the directory
+    restarted = PhraseCache(str(tmp_path), max_memory_bytes=0, max_disk_bytes=10)
+    assert len(_files(tmp_path)) == 1
+    assert restarted.stats()["disk_bytes"] == 10
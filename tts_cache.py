@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import os
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class PhraseCache:
+    """
+    Content-addressed, two-tier cache for synthesized phrases.
+    Tier 1 is an in-memory LRU bounded by a byte budget, tier 2 is a directory of raw
+    audio files that survives restarts, also an LRU bounded by a byte budget. Only
+    phrases put with `persist=True` (pre-warmed ones) go to disk, so per-call text
+    such as a patient's name never does. Disk I/O runs in a worker thread.
+    Pinned phrases (e.g. the emergency message) are never evicted.
+    """
+    def __init__(self, cache_dir: Optional[str], max_memory_bytes: int, max_disk_bytes: int = 0):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        # Size per file on disk, least recently used first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._pinned = set()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(model: str, encoding: str, sample_rate: int, text: str) -> str:
+        """
+        Builds the cache key from the voice parameters and the normalized text.
+        """
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        raw = f"{model}|{encoding}|{sample_rate}|{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return audio
+
+        if self.cache_dir and key in self._disk:
+            audio = await asyncio.to_thread(self._read_file, key)
+            if audio is not None:
+                self.disk_hits += 1
+                self._disk.move_to_end(key)
+                self._remember(key, audio)
+                return audio
+            # Removed behind our back
+            self._disk_bytes -= self._disk.pop(key, 0)
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, audio: bytes, persist: bool = False):
+        """
+        Caches `audio` in memory; with `persist` also on disk, evicting the least
+        recently used files beyond the disk budget.
+        """
+        self._remember(key, audio)
+        if not (persist and self.cache_dir) or len(audio) > self.max_disk_bytes:
+            return
+        try:
+            await asyncio.to_thread(self._write_file, key, audio)
+        except OSError as e:
+            print(f"[TTS Cache] Error writing {key}: {e}")
+            return
+        self._disk_bytes += len(audio) - self._disk.pop(key, 0)
+        self._disk[key] = len(audio)
+        victims = []
+        while self._disk_bytes > self.max_disk_bytes:
+            victim = next((k for k in self._disk if k not in self._pinned and k != key), None)
+            if victim is None:
+                break
+            self._disk_bytes -= self._disk.pop(victim)
+            victims.append(victim)
+        if victims:
+            await asyncio.to_thread(self._remove_files, victims)
+
+    def pin(self, key: str):
+        self._pinned.add(key)
+
+    def contains(self, key: str) -> bool:
+        return key in self._memory or key in self._disk
+
+    def stats(self) -> Dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "max_memory_bytes": self.max_memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+        }
+
+    def _remember(self, key: str, audio: bytes):
+        if len(audio) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.max_memory_bytes:
+            victim = next((k for k in self._memory if k not in self._pinned), None)
+            if victim is None:
+                break
+            self._memory_bytes -= len(self._memory.pop(victim))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.audio")
+
+    def _load_disk_index(self):
+        """
+        Indexes the files left by earlier runs, least recently used first (reads touch
+        the file's mtime), and trims the directory to the disk budget.
+        """
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".audio"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-len(".audio")], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_bytes += size
+        victims = []
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            victims.append(key)
+        self._remove_files(victims)
+
+    def _remove_files(self, keys: List[str]):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _read_file(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)
+            return audio
+        except FileNotFoundError:
+            return None
+
+    def _write_file(self, key: str, audio: bytes):
+        # Write-then-rename so a crash never leaves a truncated clip behind
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
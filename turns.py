@@ -0,0 +1,215 @@
+import re
+from collections import deque
+from statistics import median
+from typing import Deque, Dict, List, NamedTuple, Optional
+from config import Config
+from intents import FAREWELL, classify_intent
+from metrics import metrics
+from phrases import detect_language
+from speculation import normalize_utterance
+
+# Words an unfinished sentence ends on ("I'd like to book for ...", "my name is ...")
+_TRAILING = {
+    "en": {"and", "or", "but", "so", "because", "the", "a", "an", "to", "at", "on", "in", "for", "with",
+           "of", "my", "is", "its", "um", "uh", "er", "erm", "like", "maybe", "about", "next", "this"},
+    "fr": {"et", "ou", "mais", "donc", "parce", "le", "la", "les", "un", "une", "de", "du", "des", "à",
+           "au", "pour", "avec", "mon", "ma", "mes", "est", "euh", "heu", "ben", "vers", "ce", "cette"},
+    "de": {"und", "oder", "aber", "also", "weil", "der", "die", "das", "den", "dem", "ein", "eine", "zu",
+           "am", "um", "im", "für", "mit", "mein", "meine", "ist", "äh", "ähm", "ehm", "nächsten", "diesen"},
+}
+
+# Questions answered by a yes or a no, and the short answers that settle them
+_YES_NO_QUESTION = re.compile(
+    r"^(is|are|do|does|did|would|could|can|shall|should|will|have|has|may"
+    r"|est-ce|voulez|souhaitez|pouvez|puis-je|avez|êtes"
+    r"|möchten|wollen|können|kann|soll|sollen|ist|sind|haben|hätten|passt)\b"
+    r"|anything else|autre chose|sonst noch",
+    re.IGNORECASE
+)
+_YES_NO_ANSWER = re.compile(
+    r"^(yes|yeah|yep|yup|sure|okay|ok|correct|right|exactly|perfect|that works|sounds good|no|nope|not really"
+    r"|oui|ouais|daccord|exactement|parfait|ça marche|volontiers|non|pas vraiment"
+    r"|ja|jawohl|genau|gerne|richtig|perfekt|passt|nein|eher nicht)"
+    r"( (please|thanks|thank you|thats right|merci|sil vous plaît|cest parfait|danke|bitte|gerne|genau))*$"
+)
+
+# Questions asking for a day or a time, and answers that contain one
+_DATE_QUESTION = re.compile(
+    r"\b(what|which) (day|date|time)\b|\bwhen\b|\bquel(le)? (jour|date|heure)\b|\bquand\b"
+    r"|\b(welche[mnrs]?) (tag|datum|uhrzeit)\b|\bwann\b",
+    re.IGNORECASE
+)
+_DATE_ANSWER = re.compile(
+    r"\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday|today|tomorrow"
+    r"|lundi|mardi|mercredi|jeudi|vendredi|samedi|dimanche|aujourdhui|demain"
+    r"|montag|dienstag|mittwoch|donnerstag|freitag|samstag|sonntag|heute|morgen"
+    r"|noon|midi|mittag)\b|\b\d{1,2}( ?(am|pm|uhr)\b|h(\d{2})?\b|\d{2}\b)"
+)
+
+# "Which one suits you?" after the assistant offered days or times
+_CHOICE_QUESTION = re.compile(r"\bwhich one\b|\blequel\b|\blaquelle\b|\bwelche[rs]?\b", re.IGNORECASE)
+
+# Questions for a name: names are often spelled out with long pauses
+_NAME_QUESTION = re.compile(r"\bname\b|\bnom\b|\bnamen?\b", re.IGNORECASE)
+
+
+class TurnDecision(NamedTuple):
+    wait: float     # seconds to wait after speech_final before committing the turn
+    reason: str
+
+
+class TurnDetector:
+    """
+    Decides, per call, how long to wait after Deepgram's speech_final before the turn
+    is committed. Deepgram endpoints early (STT_ENDPOINTING_MS); the detector then:
+
+    * commits at once when the utterance settles the question just asked (a yes/no,
+      a day or time), is a clear farewell or asks a question itself;
+    * waits up to TURN_MAX_GAP_MS when it looks unfinished (trailing "and", "um",
+      a comma) or the caller is spelling a name or number;
+    * otherwise waits for the caller's usual mid-turn pause, learned from the
+      pauses after which this caller carried on (TURN_BASELINE_GAP_MS until known,
+      less for a caller who has not paused mid-turn so far).
+
+    Callers cut off by an early commit (they resumed within the baseline gap) stop
+    getting early commits after TURN_MAX_CUT_OFFS. Gaps are compared with the fixed
+    baseline to report the turn-gap savings.
+    """
+    def __init__(self, endpointing: float = Config.STT_ENDPOINTING_MS / 1000,
+                 baseline: float = Config.TURN_BASELINE_GAP_MS / 1000,
+                 max_gap: float = Config.TURN_MAX_GAP_MS / 1000,
+                 enabled: bool = Config.TURN_ADAPTIVE):
+        self.endpointing = endpointing
+        self.baseline = baseline
+        self.max_gap = max(max_gap, endpointing)
+        self.enabled = enabled
+        self.pauses: Deque[float] = deque(maxlen=20)
+        self.gaps: List[float] = []
+        self.reasons: Dict[str, int] = {}
+        self.resumed = 0
+        self.cut_offs = 0
+        self._speech_end: Optional[float] = None   # audio time of the last committed word
+        self._early_commit = False
+
+    def caller_gap(self) -> float:
+        """
+        Total silence that ends a neutral turn: just above the caller's long mid-turn pauses.
+        """
+        if not self.pauses and len(self.gaps) >= 2:
+            # A few turns without a single mid-turn pause: a fluent caller
+            return max(self.endpointing, (self.endpointing + self.baseline) / 2)
+        if len(self.pauses) < 3:
+            return max(self.baseline, self.endpointing)
+        pauses = sorted(self.pauses)
+        p90 = pauses[min(len(pauses) - 1, int(0.9 * len(pauses)))]
+        return min(self.max_gap, max(self.endpointing, p90 + 0.15))
+
+    def confident_gap(self) -> float:
+        """
+        Silence that ends a turn that looks complete: Deepgram's endpointing, unless
+        this caller has already carried on after such pauses.
+        """
+        if len(self.pauses) < 2:
+            return self.endpointing
+        return min(self.caller_gap(), max(self.endpointing, median(self.pauses) + 0.1))
+
+    def decide(self, text: str, last_reply: Optional[str] = None) -> TurnDecision:
+        """
+        `text` is the utterance so far, `last_reply` the assistant's previous message.
+        """
+        if not self.enabled:
+            return TurnDecision(0.0, "fixed")
+        reason = self._classify(text, last_reply)
+        if reason in ("answer", "farewell", "question") and self.cut_offs >= Config.TURN_MAX_CUT_OFFS:
+            reason = "caller"
+        if reason in ("answer", "farewell", "question"):
+            gap = self.confident_gap()
+        elif reason in ("incomplete", "spelling"):
+            gap = self.max_gap
+        elif reason == "name":
+            gap = max(self.caller_gap(), self.baseline)
+        else:
+            gap = self.caller_gap()
+        return TurnDecision(max(0.0, gap - self.endpointing), reason)
+
+    def _classify(self, text: str, last_reply: Optional[str]) -> str:
+        stripped = text.strip()
+        normalized = normalize_utterance(stripped)
+        words = normalized.split()
+        if not words:
+            return "caller"
+        language = detect_language(stripped) or "en"
+        if stripped.endswith((",", "...", "…", "-")) or words[-1] in _TRAILING.get(language, _TRAILING["en"]):
+            return "incomplete"
+        if len(words) >= 3 and all(len(w) == 1 or w.isdigit() for w in words[-3:]):
+            return "spelling"
+        if stripped.endswith("?"):
+            return "question"
+        farewell = classify_intent(stripped, language)
+        if farewell and farewell.intent == FAREWELL and farewell.confidence >= Config.INTENT_CONFIDENCE_THRESHOLD:
+            return "farewell"
+        question = _last_question(last_reply)
+        if question:
+            if _YES_NO_QUESTION.search(question) and _YES_NO_ANSWER.match(normalized):
+                return "answer"
+            asks_date = _DATE_QUESTION.search(question) or (
+                _CHOICE_QUESTION.search(question) and _DATE_ANSWER.search(normalize_utterance(last_reply))
+            )
+            if asks_date and _DATE_ANSWER.search(normalized):
+                return "answer"
+            if _NAME_QUESTION.search(question) and len(words) <= 4:
+                return "name"
+        return "caller"
+
+    def committed(self, decision: TurnDecision, speech_end: Optional[float]):
+        """
+        Records a committed turn; `speech_end` is the audio time its last word ended.
+        """
+        gap = self.endpointing + decision.wait
+        self.gaps.append(gap)
+        self.reasons[decision.reason] = self.reasons.get(decision.reason, 0) + 1
+        self._speech_end = speech_end
+        self._early_commit = gap < self.baseline
+        metrics.histogram("voice_turn_gap_seconds", "Silence before a turn was committed",
+                          f'reason="{decision.reason}"').observe(gap)
+
+    def speech_resumed(self, speech_start: Optional[float], pending: bool, speech_end: Optional[float] = None):
+        """
+        Called when the caller speaks again. `pending` is True when the turn had not
+        been committed yet (the wait absorbed the pause); otherwise the pause follows
+        the last committed turn and, if shorter than the baseline, it was cut off.
+        """
+        end = speech_end if pending else self._speech_end
+        if speech_start is None or end is None:
+            return
+        pause = speech_start - end
+        if pause <= 0:
+            return
+        if pending:
+            self.resumed += 1
+            self.pauses.append(pause)
+        elif self._early_commit and pause < self.baseline:
+            self.cut_offs += 1
+            self.pauses.append(pause)
+            metrics.inc("voice_turn_cut_offs_total", "Early commits followed by more speech within the baseline gap")
+        self._speech_end = None
+
+    def summary(self) -> str:
+        if not self.gaps:
+            return "no turns"
+        gap = median(self.gaps)
+        saved = median(self.baseline - g for g in self.gaps)
+        reasons = ", ".join(f"{r} {n}" for r, n in sorted(self.reasons.items()))
+        return (f"{len(self.gaps)} turns, median gap {gap * 1000:.0f} ms, median saving "
+                f"{saved * 1000:.0f} ms vs {self.baseline * 1000:.0f} ms ({reasons}; "
+                f"resumed {self.resumed}, cut off {self.cut_offs})")
+
+
+def _last_question(reply: Optional[str]) -> Optional[str]:
+    """
+    The last question of the assistant's reply ("... 10:30 or 11:00. Which one suits you?").
+    """
+    if not reply or "?" not in reply:
+        return None
+    head = reply[:reply.rfind("?") + 1]
+    return re.split(r"(?<=[.!?])\s+", head.strip())[-1]